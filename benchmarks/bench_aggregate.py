@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the streaming analytics pass
+Generates a synthetic archive and reports throughput and peak RSS
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from enough.aggregate import (LatestSession, MemoryCeiling, Totals, WeeklyStreak,
+                              aggregate, date_key, iter_day_records, peak_rss)
+from enough.models import DaySubmission, Session
+
+STEMS = [
+    "Right now I am aware...",
+    "I am becoming aware...",
+    "I am not aware...",
+    "I want to be aware...",
+]
+
+
+def generate_archive(directory: str, files: int):
+    """Write one day file per day per exercise until `files` exist"""
+    exercises = ["nathaniel_branden", "custom_morning", "custom_afternoon"]
+    start = date(2000, 1, 3)
+    for i in range(files):
+        day = start + timedelta(days=i // len(exercises))
+        exercise = exercises[i % len(exercises)]
+        session = Session(f"{day.isoformat()}T07:42:10", f"{day.isoformat()}T08:03:52", 21.7)
+        submissions = {stem: [f"completion {n} for day {i}" for n in range(6)] for stem in STEMS}
+        DaySubmission(exercise, day.strftime("%Y%m%d"), 1, 1, session, submissions).dump(
+            os.path.join(directory, f"{exercise}_{day.strftime('%y%m%d')}.yaml")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming aggregation")
+    parser.add_argument("--files", type=int, default=5000, help="number of day files to generate")
+    parser.add_argument("--memory-limit", type=float, default=None, help="memory ceiling in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"🔄 Generating {args.files} day files...")
+        generate_archive(directory, args.files)
+        baseline = peak_rss()
+
+        names = sorted((f for f in os.listdir(directory) if f.endswith(".yaml")), key=date_key)
+        records = iter_day_records(names, lambda name: DaySubmission.load(os.path.join(directory, name)))
+        totals, streak, latest = Totals(), WeeklyStreak(), LatestSession()
+        ceiling = MemoryCeiling(args.memory_limit) if args.memory_limit else None
+
+        started = time.perf_counter()
+        count = aggregate(records, [totals, streak, latest], ceiling)
+        elapsed = time.perf_counter() - started
+
+    print(f"Files aggregated:  {count}")
+    print(f"Completions:       {totals.completions}")
+    print(f"Elapsed:           {elapsed:.2f} s ({count / elapsed:.0f} files/s)")
+    print(f"Peak RSS:          {peak_rss() / 1024 / 1024:.1f} MB (after generation: {baseline / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark for near-duplicate lookups
+Builds a synthetic signature index and reports the cost of one check
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from enough.repeats import RepeatIndex, minhash
+
+
+def completion(rng: random.Random, vocabulary, weights) -> str:
+    return " ".join(rng.choices(vocabulary, weights, k=rng.randint(4, 12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate detection")
+    parser.add_argument("--completions", type=int, default=100000, help="number of indexed completions")
+    parser.add_argument("--checks", type=int, default=1000, help="number of lookups to time")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    # Zipf-like word frequencies, a few words show up in most answers
+    vocabulary = [f"word{i}" for i in range(3000)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"🔄 Indexing {args.completions} completions...")
+        index = RepeatIndex(directory)
+        texts = []
+        started = time.perf_counter()
+        for i in range(args.completions):
+            text = completion(rng, vocabulary, weights)
+            texts.append(text)
+            index._add([f"day{i // 60}.yaml", "20250106", "bench", f"stem {i % 6}", text], minhash(text))
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index.save()
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        index = RepeatIndex.load(directory)
+        loaded = time.perf_counter() - started
+
+        queries = [rng.choice(texts) if i % 2 else completion(rng, vocabulary, weights) for i in range(args.checks)]
+        started = time.perf_counter()
+        hits = sum(1 for text in queries if index.matches(text, "stem 1"))
+        elapsed = time.perf_counter() - started
+
+    print(f"Indexed:           {len(index)} completions in {built:.1f} s")
+    print(f"Save / load:       {saved:.2f} s / {loaded:.2f} s")
+    print(f"Checks:            {args.checks} ({hits} with a match)")
+    print(f"Per check:         {elapsed / args.checks * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
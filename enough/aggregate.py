@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Streaming aggregation over day files with fixed-size accumulators
+"""
+
+import gc
+import os
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .archive import PackedArchive
+from .models import DaySubmission, DaySummary, Session
+
+
+@dataclass
+class DayRecord:
+    __slots__ = ("name", "date", "day")
+    name: str
+    date: Optional[date]
+    # A DaySummary when only totals and sessions are needed
+    day: Union[DaySubmission, DaySummary]
+
+
+def date_key(filename: str) -> Tuple[str, str]:
+    """Sort key putting day files in calendar order: exercisename_YYMMDD.yaml"""
+    datelike = filename.rsplit('_', 1)[-1].replace('.yaml', '')
+    return (datelike if len(datelike) == 6 and datelike.isdigit() else "", filename)
+
+
+def _file_date(filename: str) -> Optional[date]:
+    datelike = date_key(filename)[0]
+    if not datelike:
+        return None
+    try:
+        return datetime.strptime(datelike, "%y%m%d").date()
+    except ValueError:
+        return None
+
+
+def iter_day_records(names: Iterable[str], read: Callable[[str], Union[DaySubmission, DaySummary, None]],
+                     on_error: Optional[Callable[[str, Exception], None]] = None) -> Iterator[DayRecord]:
+    """Yield one parsed day at a time, nothing is kept once it is consumed"""
+    for name in names:
+        try:
+            day = read(name)
+        except Exception as e:
+            if on_error:
+                on_error(name, e)
+            continue
+        if day is not None:
+            yield DayRecord(name, _file_date(name), day)
+
+
+class DaySource:
+    """Reads day files from submissions/, falling back to the packed archive"""
+
+    def __init__(self, submissions_dir: str, archive_path: Optional[str] = None):
+        self.submissions_dir = submissions_dir
+        self.archive = PackedArchive.open(archive_path) if archive_path else None
+
+    def names(self) -> List[str]:
+        try:
+            names = set(f for f in os.listdir(self.submissions_dir) if f.endswith('.yaml'))
+        except FileNotFoundError:
+            # Created with the first day written
+            names = set()
+        if self.archive:
+            names.update(self.archive.names())
+        return sorted(names, key=date_key)
+
+    def signature(self, name: str) -> str:
+        """Cheap change marker: stat of the loose file, or the packed entry"""
+        try:
+            st = os.stat(os.path.join(self.submissions_dir, name))
+            return f"{st.st_mtime_ns}:{st.st_size}"
+        except OSError:
+            return "packed:" + ":".join(str(part) for part in self.archive.date_time(name)) + f":{self.archive.size(name)}"
+
+    def read(self, name: str) -> Optional[DaySubmission]:
+        filepath = os.path.join(self.submissions_dir, name)
+        if os.path.exists(filepath):
+            return DaySubmission.load(filepath)
+        if self.archive:
+            data = self.archive.read(name)
+            if data is not None:
+                return DaySubmission.parse(data)
+        return None
+
+    def close(self):
+        if self.archive:
+            self.archive.close()
+
+
+class Totals:
+    __slots__ = ("sessions", "stems", "completions", "minutes")
+
+    def __init__(self):
+        self.sessions = 0
+        self.stems = 0
+        self.completions = 0
+        self.minutes = 0.0
+
+    def add(self, record: DayRecord):
+        self.sessions += 1
+        self.stems += record.day.stem_count
+        self.completions += record.day.completion_count
+        if record.day.session:
+            self.minutes += record.day.session.duration_minutes
+
+
+class WeeklyStreak:
+    """Longest run of weeks with 6+ sessions, records must arrive in date order"""
+    __slots__ = ("week", "count", "current", "best")
+
+    def __init__(self):
+        self.week: Optional[date] = None
+        self.count = 0
+        self.current = 0
+        self.best = 0
+
+    def add(self, record: DayRecord):
+        if record.date:
+            self.add_date(record.date)
+
+    def add_date(self, day: date):
+        week = date.fromordinal(day.toordinal() - day.weekday())
+        if week != self.week:
+            self._close_week()
+            self.week = week
+            self.count = 0
+        self.count += 1
+
+    def _close_week(self):
+        if self.week is None:
+            return
+        if self.count >= 6:  # 6+ sessions per week
+            self.current += 1
+            self.best = max(self.best, self.current)
+        else:
+            self.current = 0
+
+    @property
+    def longest(self) -> int:
+        best = self.best
+        if self.week is not None and self.count >= 6:
+            best = max(best, self.current + 1)
+        return best
+
+
+class LatestSession:
+    """Session of the most recent day, records must arrive in date order"""
+    __slots__ = ("date", "session")
+
+    def __init__(self):
+        self.date: Optional[date] = None
+        self.session: Optional[Session] = None
+
+    def add(self, record: DayRecord):
+        if record.date and (self.date is None or record.date > self.date):
+            self.date = record.date
+            self.session = record.day.session
+
+
+class MemoryCeiling:
+    """Stops an aggregation before it grows past limit_mb of resident memory"""
+
+    def __init__(self, limit_mb: float):
+        self.limit_bytes = int(limit_mb * 1024 * 1024)
+
+    @classmethod
+    def from_env(cls) -> Optional["MemoryCeiling"]:
+        """ENOUGH_MEMORY_LIMIT_MB sets the ceiling, unset means no limit"""
+        value = os.environ.get("ENOUGH_MEMORY_LIMIT_MB")
+        if not value:
+            return None
+        try:
+            return cls(float(value))
+        except ValueError:
+            print(f"❌ Ignoring invalid ENOUGH_MEMORY_LIMIT_MB={value!r}")
+            return None
+
+    def check(self):
+        if current_rss() <= self.limit_bytes:
+            return
+        gc.collect()
+        if current_rss() > self.limit_bytes:
+            raise MemoryError(f"aggregation exceeded the {self.limit_bytes // (1024 * 1024)} MB memory ceiling")
+
+
+def current_rss() -> int:
+    """Resident set size in bytes, falls back to the peak where not available"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def aggregate(records: Iterable[DayRecord], accumulators: List, ceiling: Optional[MemoryCeiling] = None,
+              check_every: int = 256) -> int:
+    """Feed every record to every accumulator in a single pass, returns the record count"""
+    count = 0
+    for record in records:
+        for accumulator in accumulators:
+            accumulator.add(record)
+        count += 1
+        if ceiling and count % check_every == 0:
+            ceiling.check()
+    return count
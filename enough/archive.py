@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Single-file packed archive of day files with random access through mmap
+"""
+
+import os
+import mmap
+import struct
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+# Local file header layout, see zipfile.structFileHeader
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_SIGNATURE = b"PK\003\004"
+
+
+class PackedArchive:
+    """A zip of day files written with ZIP_STORED
+
+    Members are never compressed, so each one is a contiguous byte range
+    of the file. The central directory is read once into an index of
+    name -> (offset, size) and every read is a slice of the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = self._read_index()
+        except Exception:
+            self._file.close()
+            raise
+
+    @classmethod
+    def open(cls, path: str) -> Optional["PackedArchive"]:
+        """Open the archive if it exists, None otherwise"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        return cls(path)
+
+    def _read_index(self) -> Dict[str, Tuple[int, int]]:
+        index = {}
+        self._times = {}
+        with zipfile.ZipFile(self._map) as zf:
+            for info in zf.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f"{info.filename} is compressed, archive was not written by enough pack")
+                index[info.filename] = (self._data_offset(info), info.file_size)
+                self._times[info.filename] = info.date_time
+        return index
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        start = info.header_offset
+        fields = _LOCAL_HEADER.unpack(self._map[start:start + _LOCAL_HEADER.size])
+        if fields[0] != _LOCAL_SIGNATURE:
+            raise ValueError(f"bad local header for {info.filename}")
+        name_length, extra_length = fields[10], fields[11]
+        return start + _LOCAL_HEADER.size + name_length + extra_length
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def names(self) -> List[str]:
+        return list(self._index)
+
+    def size(self, name: str) -> int:
+        return self._index[name][1]
+
+    def date_time(self, name: str) -> Tuple[int, int, int, int, int, int]:
+        return self._times[name]
+
+    def read(self, name: str) -> Optional[bytes]:
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        offset, size = entry
+        return self._map[offset:offset + size]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def pack(submissions_dir: str, archive_path: str, existing: Optional[PackedArchive] = None) -> List[str]:
+    """Write every day file, loose or already packed, into archive_path
+
+    Loose files win over packed copies of the same day. Returns the names
+    of the loose files that were packed.
+    """
+    loose = sorted(f for f in os.listdir(submissions_dir) if f.endswith('.yaml'))
+    loose_set = set(loose)
+    tmp_path = archive_path + ".tmp"
+
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+        if existing:
+            for name in sorted(existing.names()):
+                if name not in loose_set:
+                    info = zipfile.ZipInfo(name, existing.date_time(name))
+                    info.compress_type = zipfile.ZIP_STORED
+                    zf.writestr(info, existing.read(name))
+        for name in loose:
+            zf.write(os.path.join(submissions_dir, name), name)
+
+    if existing:
+        existing.close()
+    os.replace(tmp_path, archive_path)
+    return loose
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Single-file zipapp build with the bundled journals precompiled
+"""
+
+import os
+import sys
+import json
+import shutil
+import zipapp
+import argparse
+import tempfile
+import compileall
+import subprocess
+
+from .models import BUNDLED_JOURNALS, COMPILED_CATALOG, bundled_sources, compile_catalog
+
+DEPENDENCIES = ("PyYAML>=6.0.0",)
+
+MAIN = """\
+from enough.journaler import main
+
+main()
+"""
+
+
+def build(output: str = "enough.pyz", interpreter: str = "/usr/bin/env python3",
+          with_dependencies: bool = False, compress: bool = True) -> str:
+    """Write a runnable archive of the package, returns its path
+
+    Bytecode is compiled next to each module, which zipimport loads
+    without touching the sources. With dependencies, PyYAML is installed
+    into the archive too and runs on its pure Python loader.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as staging:
+        target = os.path.join(staging, "enough")
+        shutil.copytree(package_dir, target, ignore=shutil.ignore_patterns("__pycache__", "*.pyc", COMPILED_CATALOG))
+
+        compiled = compile_catalog(bundled_sources())
+        with open(os.path.join(target, BUNDLED_JOURNALS, COMPILED_CATALOG), 'w') as f:
+            f.write(json.dumps(compiled, separators=(',', ':'), ensure_ascii=False))
+
+        with open(os.path.join(staging, "__main__.py"), 'w') as f:
+            f.write(MAIN)
+
+        if with_dependencies:
+            subprocess.run([sys.executable, "-m", "pip", "install", "--quiet", "--no-compile",
+                            "--target", staging, *DEPENDENCIES], check=True)
+            # Extension modules cannot be imported from a zip archive
+            for root, _, files in os.walk(staging):
+                for name in files:
+                    if name.endswith((".so", ".pyd")):
+                        os.remove(os.path.join(root, name))
+
+        compileall.compile_dir(staging, legacy=True, quiet=1)
+        zipapp.create_archive(staging, output, interpreter, compressed=compress)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m enough.bundle",
+                                     description="Build a single-file zipapp of the journal")
+    parser.add_argument("-o", "--output", default="enough.pyz", help="archive to write (default: enough.pyz)")
+    parser.add_argument("--python", default="/usr/bin/env python3", help="interpreter line of the archive")
+    parser.add_argument("--with-deps", action="store_true", help="install PyYAML into the archive")
+    parser.add_argument("--no-compress", action="store_true", help="store files uncompressed")
+    args = parser.parse_args(argv)
+
+    try:
+        output = build(args.output, args.python, args.with_deps, not args.no_compress)
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+        return 1
+    print(f"✅ Wrote {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Clock and console the journal talks to, swapped out by the simulator
+"""
+
+import os
+import time
+from datetime import datetime
+
+
+class Clock:
+    """Wall clock time"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class Console:
+    """The terminal the user types into"""
+
+    def input(self, prompt: str = "") -> str:
+        return input(prompt)
+
+    def clear(self):
+        os.system('cls' if os.name == 'nt' else 'clear')
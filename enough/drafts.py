@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Draft journal for completions that have not been submitted yet
+"""
+
+import os
+import json
+import queue
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .vault import DraftCodec
+
+
+@dataclass
+class Draft:
+    __slots__ = ("exercise", "date", "stem", "completions", "path", "lines")
+    exercise: str
+    date: str
+    stem: str
+    completions: List[str]
+    path: str
+    # Completion lines in the file, unreadable ones included
+    lines: int
+
+
+class DraftWriter:
+    """Appends completions to draft files from a background thread
+
+    Every draft is a small JSON-lines file: a header line with the
+    exercise, date and stem followed by one line per completion. Writes
+    are queued and flushed in batches so input() never waits on disk.
+    With a codec every line is sealed and file names are keyed hashes.
+    """
+
+    def __init__(self, drafts_dir: str, flush_interval: float = 0.2, codec: Optional[DraftCodec] = None,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.drafts_dir = drafts_dir
+        self.flush_interval = flush_interval
+        self.codec = codec
+        # Write errors happen on the writer thread, whoever owns the terminal shows them
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        self._dropped = set()
+        # Completions queued into each draft file, so a late discard knows what it covers
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def key_path(self, exercise_id: str, date_str: str, stem: str) -> str:
+        if self.codec:
+            return os.path.join(self.drafts_dir, f"{self.codec.file_name(exercise_id, date_str, stem)}.jsonl")
+        digest = hashlib.sha1(stem.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.drafts_dir, f"{exercise_id}_{date_str}_{digest}.jsonl")
+
+    def append(self, exercise_id: str, date_str: str, stem: str, completion: str):
+        """Queue one completion, never blocks on disk"""
+        path = self.key_path(exercise_id, date_str, stem)
+        self._start()
+        with self._lock:
+            self._dropped.discard(path)
+            self._counts[path] = self._counts.get(path, 0) + 1
+            self._queue.put(("append", path, (exercise_id, date_str, stem), completion))
+
+    def mark(self, exercise_id: str, date_str: str, stem: str) -> int:
+        """How many completions the draft of a stem holds so far, for discard(upto=...)"""
+        with self._lock:
+            return self._counts.get(self.key_path(exercise_id, date_str, stem), 0)
+
+    def discard(self, exercise_id: str, date_str: str, stem: str, upto: Optional[int] = None):
+        """Drop the draft for a stem once it has been saved
+
+        With upto only the first upto completions go, a save that lands
+        late never takes lines typed after it was queued.
+        """
+        path = self.key_path(exercise_id, date_str, stem)
+        self._start()
+        with self._lock:
+            if upto is None or self._counts.get(path, 0) <= upto:
+                upto = None
+                self._dropped.add(path)
+                self._counts.pop(path, None)
+            else:
+                self._counts[path] -= upto
+            self._queue.put(("discard", path, upto, None))
+
+    def load(self, exercise_id: str, date_str: str, stem: str) -> Optional[Draft]:
+        if not os.path.isdir(self.drafts_dir):
+            return None
+        path = self.key_path(exercise_id, date_str, stem)
+        with self._lock:
+            if path in self._dropped:
+                return None
+        draft = self._read(path)
+        if draft:
+            with self._lock:
+                # Resumed completions are discarded with the ones typed next
+                self._counts.setdefault(path, draft.lines)
+        return draft
+
+    def pending(self) -> List[Draft]:
+        """All unfinished drafts left on disk, oldest first"""
+        if not os.path.isdir(self.drafts_dir):
+            return []
+        drafts = []
+        for filename in sorted(os.listdir(self.drafts_dir)):
+            if filename.endswith('.jsonl'):
+                draft = self._read(os.path.join(self.drafts_dir, filename))
+                if draft:
+                    drafts.append(draft)
+        return drafts
+
+    def remove(self, draft: Draft):
+        self.discard(draft.exercise, draft.date, draft.stem)
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="enough-drafts", daemon=True)
+            self._thread.start()
+
+    def _encode(self, line: str) -> str:
+        return self.codec.encode(line) if self.codec else line
+
+    def _decode(self, line: str) -> str:
+        return self.codec.decode(line) if self.codec else line
+
+    def _read(self, path: str) -> Optional[Draft]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [json.loads(self._decode(line.strip())) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return None
+        if not lines or not isinstance(lines[0], dict):
+            return None
+        header = lines[0]
+        completions = [line for line in lines[1:] if isinstance(line, str)]
+        if not completions:
+            return None
+        return Draft(header.get("exercise", ""), header.get("date", ""), header.get("stem", ""), completions, path,
+                     len(lines) - 1)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+                # Collect whatever else arrives within the flush window
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+            # Drain anything left behind a stop request
+            while stopping:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            self._flush(batch)
+
+    def _drop_lines(self, path: str, upto: Optional[int]):
+        """Remove the draft file, or only its first upto completions"""
+        if upto is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines = [line for line in f if line.strip()]
+            except FileNotFoundError:
+                return
+            # The header line, then the completions typed after the save was queued
+            if len(lines) > upto + 1:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(lines[0] + "".join(lines[upto + 1:]))
+                os.replace(tmp_path, path)
+                return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _flush(self, batch: List[Tuple]):
+        handles = {}
+        try:
+            for action, path, header, completion in batch:
+                if action == "discard":
+                    handle = handles.pop(path, None)
+                    if handle:
+                        handle.close()
+                    self._drop_lines(path, header)
+                    continue
+                handle = handles.get(path)
+                if handle is None:
+                    os.makedirs(self.drafts_dir, exist_ok=True)
+                    is_new = not os.path.exists(path)
+                    handle = handles[path] = open(path, 'a', encoding='utf-8')
+                    if is_new:
+                        exercise_id, date_str, stem = header
+                        handle.write(self._encode(json.dumps({"exercise": exercise_id, "date": date_str,
+                                                              "stem": stem})) + "\n")
+                handle.write(self._encode(json.dumps(completion)) + "\n")
+        except OSError as e:
+            if self.on_error is not None:
+                self.on_error(f"Error writing draft: {e}")
+            else:
+                print(f"❌ Error writing draft: {e}")
+        finally:
+            for handle in handles.values():
+                handle.flush()
+                os.fsync(handle.fileno())
+                handle.close()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Integrity checker for day files, the packed archive, journal definitions and progress files
+"""
+
+import os
+import re
+import json
+import yaml
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .jsonio import read_json, write_json
+from .models import DaySubmission, Exercise
+from .progress import EVENT_KINDS, LEGACY_PROGRESS_FILE, PROGRESS_DIR, PROGRESS_LOG_EXTENSION
+from .sync import Manifest
+
+FSCK_STATE_FILE = ".fsck.json"
+QUARANTINE_DIR = ".corrupt"
+DAY_FILE_PATTERN = re.compile(r"^(?P<journal>.+)_(?P<datelike>\d{6})\.yaml$")
+REQUIRED_DAY_KEYS = ("journal", "date", "week", "day", "session", "submissions")
+
+# Below this many files the process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+
+@dataclass
+class Issue:
+    __slots__ = ("message", "repairable")
+    message: str
+    repairable: bool
+
+
+def _expected_date(filename: str) -> Optional[str]:
+    match = DAY_FILE_PATTERN.match(filename)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group("datelike"), "%y%m%d").strftime("%Y%m%d")
+    except ValueError:
+        return None
+
+
+def _read_text(filepath: str) -> str:
+    with open(filepath, 'r') as f:
+        return f.read()
+
+
+def check_day_file(filepath: str) -> List[Issue]:
+    """Check one submissions/ file, returns the problems found"""
+    return check_day_text(os.path.basename(filepath), lambda: _read_text(filepath))
+
+
+def check_day_text(filename: str, read: Callable[[], str]) -> List[Issue]:
+    """Check one day, read() returns its text and may fail on unreadable bytes"""
+    issues = []
+
+    match = DAY_FILE_PATTERN.match(filename)
+    expected_date = _expected_date(filename)
+    if not match or not expected_date:
+        issues.append(Issue("filename is not <exercise>_YYMMDD.yaml", False))
+
+    try:
+        data = yaml.safe_load(read())
+    except (OSError, UnicodeDecodeError, yaml.YAMLError) as e:
+        return issues + [Issue(f"file does not parse: {str(e).splitlines()[0]}", True)]
+    if not isinstance(data, dict):
+        return issues + [Issue("top level is not a mapping", True)]
+
+    for key in REQUIRED_DAY_KEYS:
+        if key not in data:
+            issues.append(Issue(f"missing '{key}'", key in ("journal", "date", "submissions")))
+
+    if match and "journal" in data and str(data["journal"]) != match.group("journal"):
+        issues.append(Issue(f"journal '{data['journal']}' does not match filename", True))
+    if expected_date and "date" in data and str(data["date"]) != expected_date:
+        issues.append(Issue(f"date {data['date']} does not match filename ({expected_date})", True))
+    for key in ("week", "day"):
+        if key in data and not isinstance(data[key], int):
+            issues.append(Issue(f"'{key}' is not a number", False))
+
+    submissions = data.get("submissions")
+    if submissions is not None and not isinstance(submissions, dict):
+        issues.append(Issue("submissions is not a mapping of stems", False))
+    elif submissions:
+        for stem, completions in submissions.items():
+            if not isinstance(completions, list):
+                issues.append(Issue(f"responses for {stem!r} are not a list", True))
+
+    session = data.get("session")
+    if isinstance(session, dict):
+        issues.extend(_check_session(session, expected_date))
+    elif session is not None:
+        issues.append(Issue("session is not a mapping", False))
+
+    return issues
+
+
+def _session_times(session: Dict) -> Tuple[datetime, datetime]:
+    """Parsed started_at and ended_at, ValueError when either is not ISO 8601"""
+    return (datetime.fromisoformat(str(session.get("started_at"))),
+            datetime.fromisoformat(str(session.get("ended_at"))))
+
+
+def _mixed_offsets(started_at: datetime, ended_at: datetime) -> bool:
+    """One timestamp has a UTC offset and the other does not, they cannot be compared"""
+    return (started_at.utcoffset() is None) != (ended_at.utcoffset() is None)
+
+
+def _check_session(session: Dict, expected_date: Optional[str]) -> List[Issue]:
+    issues = []
+    try:
+        started_at, ended_at = _session_times(session)
+    except ValueError:
+        return [Issue("session timestamps are not ISO 8601", False)]
+
+    if _mixed_offsets(started_at, ended_at):
+        issues.append(Issue("only one session timestamp has a UTC offset", False))
+    elif ended_at < started_at:
+        issues.append(Issue("session ends before it starts", True))
+    if expected_date:
+        offset = abs((started_at.date() - datetime.strptime(expected_date, "%Y%m%d").date()).days)
+        if offset > 1:
+            issues.append(Issue(f"session starts on {started_at.date()}, {offset} days away from the file date", False))
+
+    duration = session.get("duration_minutes", 0)
+    if not isinstance(duration, (int, float)) or duration < 0:
+        issues.append(Issue(f"duration_minutes {duration!r} is not a positive number", True))
+    return issues
+
+
+def check_journal_file(filepath: str) -> List[Issue]:
+    """Check one journals/ definition"""
+    try:
+        with open(filepath, 'r') as f:
+            Exercise.from_dict(yaml.safe_load(f), os.path.basename(filepath))
+    except Exception as e:
+        return [Issue(str(e), False)]
+    return []
+
+
+def check_progress_file(filepath: str) -> List[Issue]:
+    if not os.path.exists(filepath):
+        return []
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+    except OSError as e:
+        return [Issue(f"cannot be read: {e}", False)]
+    except ValueError as e:
+        return [Issue(f"JSON does not parse: {e}", False)]
+    if not isinstance(data, dict):
+        return [Issue("top level is not an object", False)]
+    issues = []
+    for key in ("current_week", "current_day"):
+        if not isinstance(data.get(key), int):
+            issues.append(Issue(f"'{key}' is missing or not a number", False))
+    if "start_week" in data and not isinstance(data["start_week"], int):
+        issues.append(Issue("'start_week' is not a number", False))
+    for key in ("start_date", "last_completed"):
+        if data.get(key):
+            try:
+                datetime.strptime(data[key], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                issues.append(Issue(f"'{key}' is not a YYYY-MM-DD date", False))
+    return issues
+
+
+def check_progress_log(filepath: str) -> List[Issue]:
+    """Every event parses, has a known type and a seq above the one before"""
+    issues = []
+    last_seq = 0
+    with open(filepath, 'r') as f:
+        for number, line in enumerate(f, 1):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                issues.append(Issue(f"event on line {number} does not parse and is ignored", False))
+                continue
+            if not isinstance(event, dict) or event.get("type") not in EVENT_KINDS:
+                issues.append(Issue(f"line {number} is not a known progress event", False))
+                continue
+            if not isinstance(event.get("seq"), int) or event["seq"] <= last_seq:
+                issues.append(Issue(f"event on line {number} is out of order", False))
+                continue
+            last_seq = event["seq"]
+    return issues
+
+
+def repair_day_file(filepath: str) -> bool:
+    """Fix what can be fixed in place, quarantine what does not parse"""
+    filename = os.path.basename(filepath)
+    try:
+        data = yaml.safe_load(_read_text(filepath))
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        data = None
+    if not isinstance(data, dict):
+        quarantine = os.path.join(os.path.dirname(filepath), QUARANTINE_DIR)
+        os.makedirs(quarantine, exist_ok=True)
+        shutil.move(filepath, os.path.join(quarantine, filename))
+        return True
+
+    match = DAY_FILE_PATTERN.match(filename)
+    expected_date = _expected_date(filename)
+    if match:
+        data["journal"] = match.group("journal")
+    if expected_date:
+        data["date"] = expected_date
+
+    submissions = data.get("submissions")
+    if submissions is None:
+        submissions = data["submissions"] = {}
+    if isinstance(submissions, dict):
+        for stem, completions in list(submissions.items()):
+            if completions is None:
+                submissions[stem] = []
+            elif not isinstance(completions, list):
+                submissions[stem] = [str(completions)]
+
+    session = data.get("session")
+    if isinstance(session, dict):
+        try:
+            started_at, ended_at = _session_times(session)
+        except ValueError:
+            started_at = ended_at = None
+        # Mixed offsets are left for a person to decide on
+        if started_at and ended_at and not _mixed_offsets(started_at, ended_at):
+            if ended_at < started_at:
+                started_at, ended_at = ended_at, started_at
+                session["started_at"] = started_at.isoformat()
+                session["ended_at"] = ended_at.isoformat()
+            duration = session.get("duration_minutes", 0)
+            if not isinstance(duration, (int, float)) or duration < 0:
+                session["duration_minutes"] = round((ended_at - started_at).total_seconds() / 60, 1)
+
+    try:
+        DaySubmission.from_dict(data).dump(filepath)
+    except Exception:
+        return False
+    return True
+
+
+def check_archive(archive_path: str) -> Dict[str, List[Issue]]:
+    """CRCs of submissions.zip, then every packed day checked like a loose file
+
+    Problems of a packed day are keyed archive_path/name. They are never
+    repairable in place, unpack the day, repair it and pack again.
+    """
+    problems: Dict[str, List[Issue]] = {}
+    try:
+        with zipfile.ZipFile(archive_path) as zf:
+            bad = zf.testzip()
+            if bad is not None:
+                problems[archive_path] = [Issue(f"{bad} fails its CRC check", False)]
+            for info in zf.infolist():
+                issues = []
+                if info.compress_type != zipfile.ZIP_STORED:
+                    issues.append(Issue("member is compressed, the archive was not written by enough pack", False))
+                try:
+                    data = zf.read(info)
+                except (zipfile.BadZipFile, OSError) as e:
+                    # testzip() already named the first bad member
+                    if info.filename != bad or issues:
+                        problems[os.path.join(archive_path, info.filename)] = issues + [Issue(str(e), False)]
+                    continue
+                issues += [Issue(issue.message, False)
+                           for issue in check_day_text(info.filename, lambda: data.decode("utf-8"))]
+                if issues:
+                    problems[os.path.join(archive_path, info.filename)] = issues
+    except (OSError, zipfile.BadZipFile) as e:
+        problems[archive_path] = [Issue(f"archive cannot be read: {e}", False)]
+    return problems
+
+
+class FsckReport:
+    def __init__(self):
+        self.checked = 0
+        self.skipped = 0
+        self.problems: Dict[str, List[Issue]] = {}
+        self.repaired: List[str] = []
+
+    @property
+    def clean(self) -> bool:
+        return not self.problems
+
+
+def _run_checks(check: Callable[[str], List[Issue]], paths: List[str], jobs: Optional[int]) -> Dict[str, List[Issue]]:
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(paths) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(check, paths, chunksize=max(1, len(paths) // (jobs * 4)))
+            return dict(zip(paths, results))
+    return {path: check(path) for path in paths}
+
+
+def fsck(root: str = ".", repair: bool = False, full: bool = False, jobs: Optional[int] = None) -> FsckReport:
+    """Validate everything under root, re-checking only files that changed"""
+    report = FsckReport()
+    submissions_dir = os.path.join(root, "submissions")
+    journals_dir = os.path.join(root, "journals")
+    state_path = os.path.join(submissions_dir, FSCK_STATE_FILE)
+    state = {} if full else read_json(state_path)
+    new_state = {}
+
+    for section, directory, check in (
+        ("submissions", submissions_dir, check_day_file),
+        ("journals", journals_dir, check_journal_file)
+    ):
+        if not os.path.isdir(directory):
+            continue
+        manifest = Manifest(directory).refresh()
+        verified = state.get(section, {})
+        new_state[section] = {}
+
+        pending = []
+        for filename in sorted(manifest.entries):
+            digest = manifest.digest(filename)
+            if verified.get(filename) == digest:
+                new_state[section][filename] = digest
+                report.skipped += 1
+            else:
+                pending.append(os.path.join(directory, filename))
+
+        results = _run_checks(check, pending, jobs)
+        if repair and check is check_day_file:
+            for path, issues in results.items():
+                if any(issue.repairable for issue in issues) and repair_day_file(path):
+                    report.repaired.append(path)
+                    results[path] = check_day_file(path) if os.path.exists(path) else []
+            manifest.refresh()
+
+        for path, issues in results.items():
+            report.checked += 1
+            if issues:
+                report.problems[path] = issues
+            elif os.path.exists(path):
+                filename = os.path.basename(path)
+                new_state[section][filename] = manifest.digest(filename)
+
+        if section == "submissions":
+            manifest.save()
+
+    archive_path = os.path.join(root, "submissions.zip")
+    if os.path.exists(archive_path):
+        stat = os.stat(archive_path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if state.get("archive") == signature:
+            report.skipped += 1
+            new_state["archive"] = signature
+        else:
+            report.checked += 1
+            archive_problems = check_archive(archive_path)
+            report.problems.update(archive_problems)
+            if not archive_problems:
+                new_state["archive"] = signature
+
+    progress_dir = os.path.join(root, PROGRESS_DIR)
+    progress_paths = [os.path.join(root, LEGACY_PROGRESS_FILE)]
+    if os.path.isdir(progress_dir):
+        progress_paths += [os.path.join(progress_dir, f) for f in sorted(os.listdir(progress_dir))
+                           if f.endswith((".json", PROGRESS_LOG_EXTENSION))]
+    for progress_path in progress_paths:
+        if progress_path.endswith(PROGRESS_LOG_EXTENSION):
+            progress_issues = check_progress_log(progress_path)
+        else:
+            progress_issues = check_progress_file(progress_path)
+        if os.path.exists(progress_path):
+            report.checked += 1
+        if progress_issues:
+            report.problems[progress_path] = progress_issues
+
+    if os.path.isdir(submissions_dir):
+        write_json(state_path, new_state)
+    return report
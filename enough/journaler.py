@@ -5,158 +5,192 @@ Main application logic
 """
 
 import os
-import yaml
-import json
-import time
+import sys
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import calendar
+import argparse
 
-
-class ProgressTracker:
-    def __init__(self, progress_file: str = "progress.json"):
-        self.progress_file = progress_file
-        self.progress = self.load_progress()
-    
-    def load_progress(self) -> Dict:
-        if os.path.exists(self.progress_file):
-            try:
-                with open(self.progress_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {
-            "current_week": 1,
-            "current_day": 1,
-            "start_date": None,
-            "last_completed": None
-        }
-    
-    def save_progress(self):
-        with open(self.progress_file, 'w') as f:
-            json.dump(self.progress, f, indent=2)
-    
-    def update_progress(self, week: int, day: int):
-        self.progress["current_week"] = week
-        self.progress["current_day"] = day
-        self.save_progress()
+from .aggregate import (DayRecord, LatestSession, MemoryCeiling, Totals, WeeklyStreak,
+                        aggregate, date_key, iter_day_records)
+from .archive import PackedArchive
+from .console import Clock, Console
+from .drafts import Draft, DraftWriter
+from .models import (FRESH_REFLECTION_STEM, WEEK_REFLECTION_STEM, Catalog, DaySubmission, Exercise,
+                     Session, Week, load_catalog)
+from .paths import resolve_root
+from .pipeline import SessionPipeline
+from .plugins import PLUGIN_CACHE_DIR, PLUGINS_DIR, AnalyticsPlugin, discover_plugins, run_plugins
+from .progress import LEGACY_PROGRESS_FILE, ProgressStore, ProgressTracker, weeks_finished
+from .query import AGGREGATES, PERIODS, DateIndex
+from .repeats import THRESHOLD as REPEAT_THRESHOLD, RepeatIndex, minhash, similarity
+from .schedule import REFLECTION, REST, Schedule, ScheduleEntry
+from .stems import StemIndex
+from .storage import BACKENDS, SharedStorage, Storage, YamlStorage, configured_backend, day_name, open_storage
+from .timing import (DURATION_BINS, duration_histogram, duration_summary, exercise_trends, hour_histogram,
+                     load_timing, weekday_histogram)
+from .vault import VaultError
 
 
 class Journaler:
-    def __init__(self):
-        self.tracker = ProgressTracker()
-        self.exercises = self.load_exercises()
-        self.submissions_dir = "submissions"
+    def __init__(self, clock: Optional[Clock] = None, console: Optional[Console] = None, root: str = "."):
+        self.clock = clock or Clock()
+        self.console = console or Console()
+        # Everything the journal keeps lives under root, see paths.resolve_root
+        self.root = root
+        self.submissions_dir = os.path.join(root, "submissions")
+        self.storage = self.open_storage()
+        self.progress = ProgressStore(self.storage, os.path.join(root, LEGACY_PROGRESS_FILE), now=self.clock.now)
+        self.catalog = self.load_exercises()
+        self.exercises = self.catalog.exercises
+        if self.catalog.program:
+            self.progress.migrate(self.catalog.program.id)
         self.session_start_time = None
-        os.makedirs(self.submissions_dir, exist_ok=True)
+        self._schedules: Dict[str, tuple] = {}
+        self.plugins: Optional[List[AnalyticsPlugin]] = None
+        self.repeats: Optional[RepeatIndex] = None
+        self.repeats_changed = False
+        # Days written since the repetition index last caught up
+        self.written: set = set()
+        # The last day each save wrote and its signature, read back only if something else changed it
+        self.saved_days: Dict[str, Tuple[str, DaySubmission]] = {}
+        self.stems: Optional[StemIndex] = None
+        self.stems_changed = False
+        # Drafts and analytics caches stay in submissions/ whatever the backend, made when first written.
+        # An encrypted journal seals its drafts and keeps the caches in memory only.
+        # Saves and prefetches run here while the user types, their errors are shown at the next prompt
+        self.pipeline = SessionPipeline(on_error=self.report_error)
+        self.drafts = DraftWriter(os.path.join(self.submissions_dir, ".drafts"), codec=self.storage.draft_codec(),
+                                  on_error=self.pipeline.report)
     
     def clear_terminal(self):
         """Clear terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.console.clear()
     
-    def load_exercises(self) -> List[Dict]:
-        """Load all exercises from journals directory"""
-        exercises = []
-        journals_dir = "journals"
-        
-        if not os.path.exists(journals_dir):
-            print(f"❌ Journals directory '{journals_dir}' not found!")
-            return exercises
+    def load_exercises(self) -> Catalog:
+        """Load and validate the bundled journals and those in the journals directory"""
+        catalog = load_catalog(os.path.join(self.root, "journals"))
+        for filename, error in catalog.errors:
+            print(f"❌ Failed to load {filename}: {error}")
         
-        # Load all .yaml files from journals directory
-        for filename in os.listdir(journals_dir):
-            if filename.endswith('.yaml'):
-                filepath = os.path.join(journals_dir, filename)
-                
-                try:
-                    with open(filepath, 'r') as f:
-                        data = yaml.safe_load(f)
-                        
-                        if data.get('type') == 'branden':
-                            # This is a multi-week exercise
-                            exercise = {
-                                'name': data['name'],
-                                'description': data.get('description', ''),
-                                'type': 'branden',
-                                'weeks': data['total_weeks'],
-                                'weeks_data': data['weeks']  # Fixed: was trying to access 'weeks_data' later
-                            }
-                            exercises.append(exercise)
-                            
-                        elif data.get('type') == 'custom':
-                            # This is a custom exercise
-                            exercise = {
-                                'name': data['name'],
-                                'description': data.get('description', ''),
-                                'type': 'custom',
-                                'time': data['time'],
-                                'stems': data['stems']
-                            }
-                            exercises.append(exercise)
-                            
-                except Exception as e:
-                    print(f"❌ Failed to load {filename}: {e}")
-        
-        return exercises
+        return catalog
     
-    def get_current_exercise(self) -> Optional[Dict]:
-        """Get current exercise based on progress"""
-        if not self.exercises:
+    def reload_exercises(self):
+        """Pick up edits to journals/ without restarting"""
+        catalog = self.catalog.refresh()
+        if catalog is self.catalog:
+            return
+        for filename, error in catalog.errors:
+            print(f"❌ Failed to reload {filename}: {error}")
+        # Swap the whole catalog at once, running sessions keep their Exercise
+        self.catalog = catalog
+        self.exercises = catalog.exercises
+    
+    def open_storage(self) -> Storage:
+        """Open the backend named in storage.json, YAML files by default
+
+        The session writer thread uses it too, so it is wrapped to take
+        one call at a time.
+        """
+        backend = configured_backend(self.root)
+        try:
+            return SharedStorage(open_storage(self.root, backend))
+        except Exception as e:
+            if backend != YamlStorage.backend:
+                raise
+            # A damaged archive should not keep the loose day files from being used
+            print(f"❌ Failed to open archive submissions.zip: {e}")
+            return SharedStorage(YamlStorage(self.root, archive=False))
+    
+    def read_day(self, name: str) -> Optional[DaySubmission]:
+        """Read and validate a stored day, None if there is none"""
+        return self.storage.read(name)
+    
+    def signature(self, name: str) -> Optional[str]:
+        """Change marker of a stored day, None if there is no such day"""
+        try:
+            return self.storage.signature(name)
+        except (KeyError, AttributeError, OSError):
             return None
+    
+    def day_files(self) -> List[str]:
+        """Names of all stored days, in date order"""
+        return self.storage.names()
+    
+    def iter_days(self) -> Iterator[DayRecord]:
+        """Stream the summary of every readable day in date order, one at a time
+
+        Summaries are all analytics need, an encrypted journal serves them
+        from its index without opening the days.
+        """
+        def report(filename: str, error: Exception):
+            print(f"❌ Error reading analytics data: {error}")
         
-        current_week = self.tracker.progress["current_week"]
+        return iter_day_records(self.day_files(), self.storage.summary, report)
+    
+    def active_days(self) -> set:
+        """YYMMDD of every day that has at least one day file"""
+        return set(filename.split('_')[-1].replace('.yaml', '') for filename in self.day_files())
+    
+    def tracker(self, exercise_id: str) -> ProgressTracker:
+        """Progress of one exercise, read from disk the first time it is needed"""
+        return self.progress.get(exercise_id)
+    
+    def schedule(self, program: Exercise) -> Optional[Schedule]:
+        """Compiled schedule of a program run, rebuilt only when its inputs change"""
+        progress = self.tracker(program.id).progress
+        start_date = progress.get("start_date")
+        if not start_date:
+            return None
         
-        # Check if we have a start date to calculate proper week
-        if self.tracker.progress.get("start_date"):
-            start_date = datetime.strptime(self.tracker.progress["start_date"], "%Y-%m-%d")
-            today = datetime.now()
-            
-            # Calculate weekdays only (Monday-Friday)
-            days_since_start = 0
-            current_date = start_date
-            while current_date <= today:
-                if current_date.weekday() < 5:  # Monday = 0, Tuesday = 1, ..., Friday = 4
-                    days_since_start += 1
-                current_date += timedelta(days=1)
-            
-            # Calculate week based on weekdays only (6 weekdays per week)
-            calculated_week = (days_since_start // 6) + 1
+        start_week = progress.get("start_week", 1)
+        key = (program, start_date, start_week)
+        cached = self._schedules.get(program.id)
+        if cached is None or cached[0] != key:
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            cached = self._schedules[program.id] = (key, Schedule(program, start, start_week))
+        return cached[1]
+    
+    def scheduled_today(self, program: Exercise) -> Optional[ScheduleEntry]:
+        schedule = self.schedule(program)
+        return schedule.at(self.clock.now().date()) if schedule else None
+    
+    def get_current_exercise(self, program: Exercise) -> Optional[Week]:
+        """Get current week of a program based on its progress"""
+        tracker = self.tracker(program.id)
+        current_week = tracker.progress["current_week"]
+        
+        # With a start date the schedule decides where in the program today is
+        schedule = self.schedule(program)
+        if schedule:
+            today = self.clock.now().date()
+            entry = schedule.at(today)
+            if entry is None:
+                if today < schedule.start:
+                    print(f"Your program starts on {schedule.start.strftime('%Y-%m-%d')} ({schedule.start.strftime('%A')}).")
+                    return None
+                print(f"✅ Congratulations! You've completed all {program.total_weeks} weeks of the program.")
+                return None
             
-            # Use calculated week if it's different from stored week
-            if calculated_week != current_week:
-                self.tracker.progress["current_week"] = calculated_week
-                self.tracker.save_progress()
-                current_week = calculated_week
-        
-        # Find the current branden exercise (assuming it's the first one)
-        branden_exercise = None
-        for exercise in self.exercises:
-            if exercise.get('type') == 'branden':
-                branden_exercise = exercise
-                break
-        
-        if not branden_exercise:
-            print("❌ No branden exercise found in journals directory")
-            return None
+            if (entry.week, entry.day) != (current_week, tracker.progress["current_day"]):
+                tracker.update_progress(entry.week, entry.day)
+            current_week = entry.week
         
-        # Find the week data - fixed to use 'weeks_data' which contains the 'weeks' list
-        for week_data in branden_exercise['weeks_data']:
-            if week_data['week'] == current_week:
-                return {
-                    'week': current_week,
-                    'stems': week_data['stems']
-                }
+        week = program.week(current_week)
+        if week:
+            return week
         
         # If no exercise found for current week, check if we're beyond the program
-        if current_week > branden_exercise['weeks']:
-            print(f"✅ Congratulations! You've completed all {branden_exercise['weeks']} weeks of the program.")
+        if current_week > program.total_weeks:
+            print(f"✅ Congratulations! You've completed all {program.total_weeks} weeks of the program.")
             return None
         
         print(f"❌ No exercise found for week {current_week}")
         return None
     
-    def handle_first_time_user(self):
+    def handle_first_time_user(self, program: Exercise):
         """Handle first-time user setup"""
+        tracker = self.tracker(program.id)
         print("\n=========================================")
         print("        ENOUGH - Minimal Journal")
         print(" Inspired by Nathaniel Branden's Work")
@@ -171,11 +205,11 @@ class Journaler:
         print()
         
         while True:
-            choice = input("Enter your choice (1-3): ").strip()
+            choice = self.console.input("Enter your choice (1-3): ").strip()
             
             if choice == "1":
                 # Start from Week 1, Day 1
-                today = datetime.now()
+                today = self.clock.now()
                 
                 if today.weekday() >= 5:  # Weekend: Saturday = 5, Sunday = 6
                     print(f"\nYou chose to start from Week 1 | Day 1.")
@@ -187,22 +221,19 @@ class Journaler:
                     days_since_monday = today.weekday()
                     start_date = today - timedelta(days=days_since_monday)
                     
-                    self.tracker.progress["start_date"] = start_date.strftime("%Y-%m-%d")
-                    self.tracker.progress["current_week"] = 1
-                    self.tracker.progress["current_day"] = 1
-                    self.tracker.save_progress()
+                    tracker.start(start_date.strftime("%Y-%m-%d"), 1)
                     return True
                     
             elif choice == "2":
                 print("\nWhat week are you currently on? (1-30): ")
                 try:
-                    week = int(input().strip())
+                    week = int(self.console.input().strip())
                     if week < 1 or week > 30:
                         print("Please enter a week between 1 and 30.")
                         continue
                     
                     print("\nEnter a custom start date (YYYY-MM-DD): ")
-                    custom_date_str = input().strip()
+                    custom_date_str = self.console.input().strip()
                     
                     try:
                         custom_date = datetime.strptime(custom_date_str, "%Y-%m-%d")
@@ -223,10 +254,7 @@ class Journaler:
                         print(f"Starting from custom week {week}")
                         print(f"Start date calculated: {start_date.strftime('%Y-%m-%d')} ({start_date.strftime('%A')})")
                         
-                        self.tracker.progress["start_date"] = start_date.strftime("%Y-%m-%d")
-                        self.tracker.progress["current_week"] = week
-                        self.tracker.progress["current_day"] = 1
-                        self.tracker.save_progress()
+                        tracker.start(start_date.strftime("%Y-%m-%d"), week)
                         return True
                         
                     except ValueError:
@@ -241,132 +269,136 @@ class Journaler:
             else:
                 print("Please enter '1', '2', or '3'.")
     
-    def check_and_setup_user(self):
+    def check_and_setup_user(self, program: Exercise):
         """Check if user needs setup and handle it"""
-        # Check if there are any existing submissions for this exercise
-        current_week = self.tracker.progress["current_week"]
-        
-        # Generate exercise name based on actual exercise name
-        branden_exercise = None
-        for ex in self.exercises:
-            if ex.get('type') == 'branden':
-                branden_exercise = ex
-                break
-        
-        if not branden_exercise:
-            print("❌ No branden exercise found")
-            return False
-            
-        # Use sanitized exercise name for file naming
-        exercise_name = branden_exercise['name'].replace(' ', '_').replace('-', '_').lower()
-        exercise_name = ''.join(c for c in exercise_name if c.isalnum() or c == '_')
+        # A run already in progress needs no setup
+        if self.tracker(program.id).progress.get("start_date"):
+            return True
         
         # Check if any submission files exist for this exercise
         has_existing_submissions = False
-        for filename in os.listdir(self.submissions_dir):
-            if filename.startswith(f"{exercise_name}_") and filename.endswith(".yaml"):
+        for filename in self.day_files():
+            if filename.startswith(program.prefix):
                 has_existing_submissions = True
                 break
         
         if not has_existing_submissions:
-            return self.handle_first_time_user()
+            return self.handle_first_time_user(program)
         return True
     
     def save_submission(self, exercise_name: str, date_str: str, stem: str, completions: List[str]):
+        """Queue a stem for the session writer, the next prompt does not wait for the disk"""
+        progress = self.tracker(exercise_name).progress
+        # Counted now, a save that lands late keeps whatever is typed into the draft meanwhile
+        drafted = self.drafts.mark(exercise_name, date_str, stem)
+        self.pipeline.queue("Error saving submission, your completions are kept as a draft for next session",
+                            self.write_submission, exercise_name, date_str, stem, list(completions),
+                            self.session_start_time, self.clock.now(),
+                            progress["current_week"], progress["current_day"], drafted)
+    
+    def report_error(self, message: str):
+        print(f"❌ {message}")
+    
+    def warn(self, message: str):
+        """Show an error now, or at the next prompt when it happened on the session writer"""
+        if self.pipeline.on_worker():
+            self.pipeline.report(message)
+        else:
+            self.report_error(message)
+    
+    def write_submission(self, exercise_name: str, date_str: str, stem: str, completions: List[str],
+                         started: Optional[datetime], end_time: datetime, week: int, day_number: int,
+                         drafted: Optional[int] = None):
         """Save submission in standard format: exercisename_datelike210431"""
-        # Convert YYYYMMDD to datelike format (e.g., 210431 for 2021-04-31)
-        try:
-            date_obj = datetime.strptime(date_str, "%Y%m%d")
-            datelike = date_obj.strftime("%y%m%d")  # YYMMDD format
-        except:
-            datelike = date_str  # Fallback to original format
+        name = day_name(exercise_name, date_str)
         
-        filename = f"{exercise_name}_{datelike}.yaml"
-        filepath = os.path.join(self.submissions_dir, filename)
-        
-        # Load existing data if file exists
-        existing_data = {}
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r') as f:
-                    existing_data = yaml.safe_load(f) or {}
-            except Exception as e:
-                print(f"❌ Error reading existing submission file: {e}")
-                existing_data = {}
+        # Load existing data if the day was started already
+        existing = None
+        try:
+            saved = self.saved_days.get(name)
+            if saved and saved[0] == self.signature(name):
+                existing = saved[1]
+            else:
+                existing = self.read_day(name)
+        except Exception as e:
+            self.warn(f"Error reading existing submission file: {e}")
         
         # Calculate session timing
-        end_time = datetime.now()
         duration_minutes = 0
         
-        if self.session_start_time:
-            duration = end_time - self.session_start_time
+        if started:
+            duration = end_time - started
             duration_minutes = round(duration.total_seconds() / 60, 1)
         
-        # Prepare session data
-        session_data = {
-            "started_at": self.session_start_time.isoformat() if self.session_start_time else datetime.now().isoformat(),
-            "ended_at": end_time.isoformat(),
-            "duration_minutes": duration_minutes
-        }
+        session = Session(
+            started.isoformat() if started else end_time.isoformat(),
+            end_time.isoformat(),
+            duration_minutes
+        )
         
         # If we have existing session data, preserve start time but update end time
-        if "session" in existing_data:
-            session_data["started_at"] = existing_data["session"].get("started_at", session_data["started_at"])
+        if existing and existing.session:
+            session.started_at = existing.session.started_at
             # Add to existing duration
-            existing_duration = existing_data["session"].get("duration_minutes", 0)
-            session_data["duration_minutes"] = existing_duration + duration_minutes
-        
-        data = {
-            "journal": exercise_name,
-            "date": date_str,
-            "week": self.tracker.progress["current_week"],
-            "day": self.tracker.progress["current_day"],
-            "session": session_data,
-            "submissions": existing_data.get("submissions", {})
-        }
+            session.duration_minutes = existing.session.duration_minutes + duration_minutes
+        
+        stems = self.stem_index()
+        day = DaySubmission(
+            exercise_name,
+            date_str,
+            week,
+            day_number,
+            session,
+            dict(existing.submissions) if existing else {}
+        )
         
         # Add the new submission
-        data["submissions"][stem] = completions
+        day.submissions[stem] = completions
+        
+        # A failure is reported by the pipeline and the draft stays
+        self.storage.write(name, day)
+        signature = self.storage.signature(name)
+        self.saved_days[name] = (signature, day)
+        if self.repeats is not None:
+            # The next repeat_index() has nothing to read back
+            self.repeats.record(name, day, signature)
+            self.repeats_changed = True
+        else:
+            self.written.add(name)
+        if stems is not None:
+            try:
+                stems.record(name, day, signature)
+                self.stems_changed = True
+            except Exception as e:
+                self.warn(f"Error updating stem index: {e}")
         
-        try:
-            with open(filepath, 'w') as f:
-                yaml.dump(data, f, default_flow_style=False)
-        except Exception as e:
-            print(f"❌ Error saving submission: {e}")
+        # The stem is safely in the day file now, its draft is no longer needed
+        self.drafts.discard(exercise_name, date_str, stem, drafted)
     
     def get_week_submissions(self, exercise_name: str, week_start: str) -> Dict[str, List[str]]:
         """Get all submissions for a week"""
         submissions = {}
         try:
-            for i in range(7):
-                current_date = datetime.strptime(week_start, "%Y-%m-%d") + timedelta(days=i)
-                date_str = current_date.strftime("%Y%m%d")
-                
-                # Convert to datelike format for filename
-                try:
-                    date_obj = datetime.strptime(date_str, "%Y%m%d")
-                    datelike = date_obj.strftime("%y%m%d")  # YYMMDD format
-                except:
-                    datelike = date_str  # Fallback
-                
-                filename = f"{exercise_name}_{datelike}.yaml"
-                filepath = os.path.join(self.submissions_dir, filename)
-                
-                if os.path.exists(filepath):
-                    try:
-                        with open(filepath, 'r') as f:
-                            data = yaml.safe_load(f)
-                            if data and "submissions" in data:
-                                submissions.update(data["submissions"])
-                    except Exception as e:
-                        print(f"❌ Error reading submission file {filename}: {e}")
-        except Exception as e:
-            print(f"❌ Error processing week submissions: {e}")
+            start = datetime.strptime(week_start, "%Y-%m-%d")
+        except ValueError as e:
+            self.warn(f"Error processing week submissions: {e}")
+            return submissions
+        
+        for i in range(7):
+            name = day_name(exercise_name, (start + timedelta(days=i)).strftime("%Y%m%d"))
+            try:
+                day = self.read_day(name)
+                if day:
+                    submissions.update(day.submissions)
+            except Exception as e:
+                self.warn(f"Error reading submission file {name}: {e}")
         
         return submissions
     
     def show_menu(self):
         """Show dynamic menu based on available exercises"""
+        self.reload_exercises()
+        
         print("=========================================")
         print("        ENOUGH - Minimal Journal")
         print(" Inspired by Nathaniel Branden's Work")
@@ -376,7 +408,7 @@ class Journaler:
         
         # List all exercises dynamically
         for i, exercise in enumerate(self.exercises, 1):
-            print(f"{i}. {exercise['name']}")
+            print(f"{i}. {exercise.name}")
         
         print("X. Analytics & Progress Overview")
         print()
@@ -388,78 +420,51 @@ class Journaler:
         print("=========================================")
         print()
         
-        # Get basic stats
-        total_sessions = 0
-        total_stems = 0
-        total_duration = 0
+        # Get basic stats in a single streaming pass
+        totals = Totals()
+        latest = LatestSession()
+        try:
+            aggregate(self.iter_days(), [totals, latest], MemoryCeiling.from_env())
+        except MemoryError as e:
+            print(f"❌ {e}")
         current_streak = self.calculate_streak()
         
-        # Count submissions and calculate total time
-        for filename in os.listdir(self.submissions_dir):
-            if filename.endswith('.yaml'):
-                total_sessions += 1
-                filepath = os.path.join(self.submissions_dir, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        data = yaml.safe_load(f)
-                        if data and "submissions" in data:
-                            total_stems += len(data["submissions"])
-                        if data and "session" in data:
-                            total_duration += data["session"].get("duration_minutes", 0)
-                except Exception as e:
-                    print(f"❌ Error reading analytics data: {e}")
-        
         # Calculate time spent
-        hours = int(total_duration // 60)
-        minutes = int(total_duration % 60)
+        hours = int(totals.minutes // 60)
+        minutes = int(totals.minutes % 60)
         time_spent = f"{hours} hrs {minutes} mins" if hours > 0 else f"{minutes} mins"
         
         print(f"Journal: Nathaniel Branden - Sentence Completion Exercises")
         print()
-        print(f"Total Sessions Completed: {total_sessions}")
-        print(f"Total Sentence Stems Completed: {total_stems}")
+        print(f"Total Sessions Completed: {totals.sessions}")
+        print(f"Total Sentence Stems Completed: {totals.stems}")
         print(f"Total Time Spent Journaling: {time_spent}")
         print(f"Current Streak: {current_streak} weeks (6 days/week target)")
         
-        if self.tracker.progress.get("start_date"):
-            last_completed = self.tracker.progress.get("last_completed", "Never")
-            print(f"Last Completed: Week {self.tracker.progress['current_week']} | Day {self.tracker.progress['current_day']} ({last_completed})")
+        for program in self.catalog.programs:
+            progress = self.tracker(program.id).progress
+            if progress.get("start_date"):
+                last_completed = progress.get("last_completed", "Never")
+                label = f"{program.name}: " if len(self.catalog.programs) > 1 else ""
+                print(f"Last Completed: {label}Week {progress['current_week']} | Day {progress['current_day']} ({last_completed})")
+                finished = sorted(weeks_finished(self.tracker(program.id).history()).items())
+                if finished:
+                    print("Weeks Finished: " + ", ".join(f"Week {week} ({at[:10]})" for week, at in finished[-3:]))
         
         print()
         print("Recent Session Summary:")
-        if total_sessions > 0:
-            # Get the most recent session
-            submission_files = [f for f in os.listdir(self.submissions_dir) if f.endswith('.yaml')]
-            if submission_files:
-                # Sort by date (extract datelike part and convert back to sortable format)
-                def get_sort_key(filename):
-                    try:
-                        # Extract datelike part (e.g., "210431" from "exercisename_210431.yaml")
-                        datelike = filename.split('_')[-1].replace('.yaml', '')
-                        if len(datelike) == 6:  # YYMMDD format
-                            return datetime.strptime(datelike, "%y%m%d")
-                        return datetime.min  # Fallback for invalid format
-                    except:
-                        return datetime.min
+        if latest.session:
+            try:
+                started_at = datetime.fromisoformat(latest.session.started_at)
+                ended_at = datetime.fromisoformat(latest.session.ended_at)
                 
-                latest_file = max(submission_files, key=get_sort_key)
-                filepath = os.path.join(self.submissions_dir, latest_file)
-                try:
-                    with open(filepath, 'r') as f:
-                        data = yaml.safe_load(f)
-                        if data and "session" in data:
-                            session = data["session"]
-                            started_at = datetime.fromisoformat(session["started_at"])
-                            ended_at = datetime.fromisoformat(session["ended_at"])
-                            duration = session.get("duration_minutes", 0)
-                            
-                            print(f"- Last Session: {started_at.strftime('%Y-%m-%d')} ({started_at.strftime('%A')})")
-                            print(f"- Start Time: {started_at.strftime('%H:%M')}")
-                            print(f"- End Time: {ended_at.strftime('%H:%M')}")
-                            print(f"- Duration: {duration:.1f} mins")
-                except Exception as e:
-                    print("- Last Session: Recent")
-                    print("- Duration: Variable")
+                print(f"- Last Session: {started_at.strftime('%Y-%m-%d')} ({started_at.strftime('%A')})")
+                print(f"- Start Time: {started_at.strftime('%H:%M')}")
+                print(f"- End Time: {ended_at.strftime('%H:%M')}")
+                print(f"- Duration: {latest.session.duration_minutes:.1f} mins")
+            except ValueError:
+                print("- Last Session: Recent")
+                print("- Duration: Variable")
         
         # Show calendar with month selection
         print()
@@ -467,39 +472,17 @@ class Journaler:
         self.show_calendar_analytics()
         
         print()
-        input("Press Enter to continue...")
+        self.console.input("Press Enter to continue...")
     
     def show_calendar_analytics(self):
         """Show calendar with month selection and day viewing"""
-        current_month = datetime.now().month
-        current_year = datetime.now().year
+        current_month = self.clock.now().month
+        current_year = self.clock.now().year
         
         print(f"{calendar.month_name[current_month]} {current_year} Activity")
         print()
         
-        # Simple calendar representation
-        cal = calendar.monthcalendar(current_year, current_month)
-        print("Mon  Tue  Wed  Thu  Fri  Sat  Sun")
-        for week in cal:
-            for day in week:
-                if day == 0:
-                    print("     ", end="")
-                else:
-                    # Check if there's a submission for this day
-                    date_str = f"{current_year:04d}{current_month:02d}{day:02d}"
-                    # Convert to datelike format for filename matching
-                    try:
-                        date_obj = datetime.strptime(date_str, "%Y%m%d")
-                        datelike = date_obj.strftime("%y%m%d")  # YYMMDD format
-                    except:
-                        datelike = date_str
-                    
-                    has_submission = any(f"_{datelike}.yaml" in f for f in os.listdir(self.submissions_dir))
-                    if has_submission:
-                        print("  x  ", end="")
-                    else:
-                        print(f"  {day:2d} ", end="")
-            print()
+        self.print_month(current_year, current_month)
         
         print()
         print("Legend:")
@@ -512,47 +495,126 @@ class Journaler:
         print("Options:")
         print("1. View different month")
         print("2. View specific day's submissions")
-        print("3. Back to main menu")
+        print("3. View session timing")
+        print("4. More analytics")
+        print("5. Repeated completions")
+        print("6. Back to main menu")
         
-        choice = input("Enter choice (1-3): ").strip()
+        choice = self.console.input("Enter choice (1-6): ").strip()
         
         if choice == "1":
             self.select_month_view()
         elif choice == "2":
             self.view_day_submissions()
+        elif choice == "3":
+            self.show_timing_analytics()
+        elif choice == "4":
+            self.show_plugin_analytics()
+        elif choice == "5":
+            self.show_repeat_analytics()
+    
+    def show_plugin_analytics(self):
+        """Results of every analytics plugin, computed in one shared pass"""
+        if self.plugins is None:
+            self.plugins = discover_plugins(os.path.join(self.root, PLUGINS_DIR))
+        
+        try:
+            kinds = {exercise.id: exercise.type for exercise in self.exercises}
+            results = run_plugins(self.plugins, self.storage, kinds,
+                                  os.path.join(self.submissions_dir, PLUGIN_CACHE_DIR))
+        except Exception as e:
+            print(f"❌ Error running analytics plugins: {e}")
+            return
+        
+        for plugin in self.plugins:
+            if plugin.name not in results:
+                continue
+            print(f"\n{plugin.title or plugin.name}")
+            print("-" * 41)
+            try:
+                lines = plugin.render(results[plugin.name]) if results[plugin.name] is not None else []
+            except Exception as e:
+                print(f"❌ Analytics plugin {plugin.name} failed: {e}")
+                continue
+            for line in lines or ["No data yet."]:
+                print(line)
+    
+    def show_timing_analytics(self):
+        """Duration distribution, time-of-day and weekday histograms, trends per exercise"""
+        try:
+            store = load_timing(self.submissions_dir, self.storage)
+        except Exception as e:
+            print(f"❌ Error reading session timing: {e}")
+            return
+        
+        print("\n=========================================")
+        print("            Session Timing")
+        print("=========================================")
+        if not len(store):
+            print("\nNo timed sessions yet.")
+            return
+        
+        def bar(count: int, largest: int) -> str:
+            return "#" * max(1, round(count * 30 / largest)) if count else ""
+        
+        summary = duration_summary(store)
+        print(f"\nSessions: {len(store)}")
+        print(f"Average: {summary['mean']:.1f} mins | Median: {summary['median']:.1f} mins | "
+              f"90th percentile: {summary['p90']:.1f} mins | Longest: {summary['longest']:.1f} mins")
+        
+        print("\nDuration")
+        durations = duration_histogram(store)
+        bounds = (0,) + DURATION_BINS
+        for i, count in enumerate(durations):
+            label = f"{bounds[i]}-{bounds[i + 1]}" if i < len(DURATION_BINS) else f"{bounds[i]}+"
+            print(f"{label:>6} mins  {count:4d} {bar(count, max(durations))}")
+        
+        print("\nTime of day")
+        hours = hour_histogram(store)
+        for hour, count in enumerate(hours):
+            if count:
+                print(f"{hour:02d}:00  {count:4d} {bar(count, max(hours))}")
+        
+        print("\nWeekday")
+        weekdays = weekday_histogram(store)
+        for weekday, count in enumerate(weekdays):
+            print(f"{calendar.day_abbr[weekday]}  {count:4d} {bar(count, max(weekdays))}")
+        
+        print("\nLast 8 weeks per exercise (sessions / average mins, oldest first)")
+        for exercise_id, weeks in exercise_trends(store, self.clock.now()).items():
+            exercise = self.catalog.get(exercise_id)
+            print(f"\n{exercise.name if exercise else exercise_id}")
+            print("  " + "  ".join(f"{count}/{average:.0f}" if count else "-" for count, average in weeks))
+    
+    def print_month(self, year: int, month: int):
+        """Simple calendar representation marking days with submissions"""
+        # Collect active days once instead of listing the directory per day
+        active_days = self.active_days()
+        
+        cal = calendar.monthcalendar(year, month)
+        print("Mon  Tue  Wed  Thu  Fri  Sat  Sun")
+        for week in cal:
+            for day in week:
+                if day == 0:
+                    print("     ", end="")
+                elif f"{year % 100:02d}{month:02d}{day:02d}" in active_days:
+                    print("  x  ", end="")
+                else:
+                    print(f"  {day:2d} ", end="")
+            print()
     
     def select_month_view(self):
         """Allow user to select a different month to view"""
         print("\nEnter month (1-12) and year (YYYY):")
         try:
-            month = int(input("Month: ").strip())
-            year = int(input("Year: ").strip())
+            month = int(self.console.input("Month: ").strip())
+            year = int(self.console.input("Year: ").strip())
             
             if 1 <= month <= 12 and 2020 <= year <= 2030:
                 print(f"\n{calendar.month_name[month]} {year} Activity")
                 print()
                 
-                cal = calendar.monthcalendar(year, month)
-                print("Mon  Tue  Wed  Thu  Fri  Sat  Sun")
-                for week in cal:
-                    for day in week:
-                        if day == 0:
-                            print("     ", end="")
-                        else:
-                            date_str = f"{year:04d}{month:02d}{day:02d}"
-                            # Convert to datelike format for filename matching
-                            try:
-                                date_obj = datetime.strptime(date_str, "%Y%m%d")
-                                datelike = date_obj.strftime("%y%m%d")  # YYMMDD format
-                            except:
-                                datelike = date_str
-                            
-                            has_submission = any(f"_{datelike}.yaml" in f for f in os.listdir(self.submissions_dir))
-                            if has_submission:
-                                print("  x  ", end="")
-                            else:
-                                print(f"  {day:2d} ", end="")
-                    print()
+                self.print_month(year, month)
             else:
                 print("❌ Invalid month or year")
         except ValueError:
@@ -562,42 +624,37 @@ class Journaler:
         """View submissions for a specific day"""
         print("\nEnter date (YYYY-MM-DD):")
         try:
-            date_str = input().strip()
+            date_str = self.console.input().strip()
             target_date = datetime.strptime(date_str, "%Y-%m-%d")
-            file_date_str = target_date.strftime("%Y%m%d")
             
-            # Convert to datelike format for filename
-            try:
-                date_obj = datetime.strptime(file_date_str, "%Y%m%d")
-                datelike = date_obj.strftime("%y%m%d")  # YYMMDD format
-            except:
-                datelike = file_date_str
+            # What the program asked for on that date
+            for program in self.catalog.programs:
+                schedule = self.schedule(program)
+                entry = schedule.at(target_date.date()) if schedule else None
+                if entry:
+                    planned = f'"{entry.stem}"' if entry.stem else entry.kind
+                    label = f"{program.name} - " if len(self.catalog.programs) > 1 else ""
+                    print(f"\nScheduled: {label}Week {entry.week} | Day {entry.day} - {planned}")
             
-            # Find submission file for this date
-            submission_file = None
-            for filename in os.listdir(self.submissions_dir):
-                if filename.endswith('.yaml') and f"_{datelike}.yaml" in filename:
-                    submission_file = filename
-                    break
+            # Find the stored day for this date
+            names = DateIndex(self.day_files()).on(target_date.date())
+            submission_file = names[0] if names else None
             
             if submission_file:
-                filepath = os.path.join(self.submissions_dir, submission_file)
                 try:
-                    with open(filepath, 'r') as f:
-                        data = yaml.safe_load(f)
-                        if data and "submissions" in data:
-                            print(f"\nSubmissions for {date_str}:")
-                            print("=" * 50)
-                            for stem, completions in data["submissions"].items():
-                                print(f"\nStem: {stem}")
-                                for i, completion in enumerate(completions, 1):
-                                    print(f"{i}. {completion}")
-                            
-                            if "session" in data:
-                                session = data["session"]
-                                print(f"\nSession Duration: {session.get('duration_minutes', 0):.1f} minutes")
-                        else:
-                            print("❌ No submissions found for this date")
+                    day = self.read_day(submission_file)
+                    if day and day.submissions:
+                        print(f"\nSubmissions for {date_str}:")
+                        print("=" * 50)
+                        for stem, completions in day.submissions.items():
+                            print(f"\nStem: {stem}")
+                            for i, completion in enumerate(completions, 1):
+                                print(f"{i}. {completion}")
+                        
+                        if day.session:
+                            print(f"\nSession Duration: {day.session.duration_minutes:.1f} minutes")
+                    else:
+                        print("❌ No submissions found for this date")
                 except Exception as e:
                     print(f"❌ Error reading submission file: {e}")
             else:
@@ -605,21 +662,36 @@ class Journaler:
         except ValueError:
             print("❌ Invalid date format. Use YYYY-MM-DD")
     
-    def get_user_completions(self, stem: str) -> List[str]:
-        """Get user completions with proper UX"""
+    def get_user_completions(self, stem: str, exercise_name: Optional[str] = None,
+                             date_str: Optional[str] = None) -> List[str]:
+        """Get user completions with proper UX, autosaving each one to a draft"""
         completions = []
+        autosave = exercise_name is not None and date_str is not None
+        draft, earlier = self.pipeline.take(("stem", stem, exercise_name, date_str),
+                                            self.prepare_stem, stem, exercise_name, date_str)
+        if draft:
+            completions = draft.completions[:10]
+        elif earlier:
+            self.offer_stem_history(stem, earlier, day_name(exercise_name, date_str) if autosave else None)
+        # Caught up with the save just queued, needed once the first completion is typed
+        repeats = self.pipeline.submit(self.repeat_index)
+        
         print(f"\n{stem}")
         print("Enter at least 6 responses (or type submit to continue when ready):")
         
         # Wait 2 seconds, then clear terminal
-        time.sleep(2)
+        self.clock.sleep(2)
         self.clear_terminal()
         
         print(f"\n{stem}")
         print("Enter at least 6 responses (or type submit to continue when ready):")
         
+        # Show what was recovered from an interrupted session
+        for i, completion in enumerate(completions, 1):
+            print(f"{i}. {completion}")
+        
         while len(completions) < 10:
-            completion = input(f"{len(completions) + 1}. ").strip()
+            completion = self.console.input(f"{len(completions) + 1}. ").strip()
             
             if completion == "submit":  # No quotes, exact match
                 if len(completions) >= 6:
@@ -629,62 +701,172 @@ class Journaler:
                     continue
             
             if completion:
+                self.show_repeat(completion, stem, completions, repeats.result())
                 completions.append(completion)
+                if autosave:
+                    self.drafts.append(exercise_name, date_str, stem, completion)
         
         print("✔️ Submission accepted. Proceeding to next sentence stem...")
-        time.sleep(2)
+        self.clock.sleep(2)
         self.clear_terminal()
         
         return completions
     
-    def handle_weekend_reflection(self, exercise: Dict, week_start: str):
+    def stem_index(self) -> Optional[StemIndex]:
+        """Where every stem was answered, caught up with the day files on first use
+
+        After that save_submission keeps it current as days are written.
+        """
+        if self.stems is None:
+            try:
+                stems = StemIndex.load(self.submissions_dir)
+                if stems.refresh(self.storage):
+                    self.stems_changed = True
+                self.stems = stems
+            except Exception as e:
+                self.warn(f"Error updating stem index: {e}")
+        return self.stems
+    
+    def prepare_stem(self, stem: str, exercise_name: Optional[str] = None,
+                     date_str: Optional[str] = None) -> Tuple[Optional[Draft], List[list]]:
+        """A draft to resume and the earlier days of a stem, what its prompt needs first"""
+        if exercise_name is not None and date_str is not None:
+            draft = self.drafts.load(exercise_name, date_str, stem)
+            if draft:
+                return draft, []
+            today = day_name(exercise_name, date_str)
+        else:
+            today = None
+        index = self.stem_index()
+        return None, [entry for entry in index.days(stem) if entry[0] != today] if index else []
+    
+    def prefetch_stem(self, stem: str, exercise_name: str, date_str: str):
+        """Prepare a later prompt on the session writer while the user types"""
+        self.pipeline.prefetch(("stem", stem, exercise_name, date_str),
+                               self.prepare_stem, stem, exercise_name, date_str)
+    
+    def offer_stem_history(self, stem: str, days: List[list], today: Optional[str] = None, limit: int = 5):
+        """Offer earlier answers to a stem before it is answered again"""
+        latest = days[0][1]
+        print(f"\n📜 You have answered \"{stem}\" on {len(days)} earlier day(s), last on "
+              f"{latest[:4]}-{latest[4:6]}-{latest[6:]}.")
+        if self.console.input("Show your earlier answers first? (y/N): ").strip().lower() != "y":
+            return
+        
+        # Read on the session writer, behind any save still queued
+        for answer in self.pipeline.call(self.stems.history, self.storage, stem, limit, today):
+            exercise = self.catalog.get(answer.exercise)
+            print(f"\n{answer.date[:4]}-{answer.date[4:6]}-{answer.date[6:]}  "
+                  f"{exercise.name if exercise else answer.exercise}")
+            for i, completion in enumerate(answer.completions, 1):
+                print(f"{i}. {completion}")
+        if len(days) > limit:
+            print(f"\n... and {len(days) - limit} earlier day(s), see python -m enough query --stem")
+        print()
+        self.console.input("Press Enter to start...")
+    
+    def repeat_index(self, full: bool = False) -> Optional[RepeatIndex]:
+        """Signature index of every completion so far, caught up with the day files
+
+        Once loaded only the day files this session wrote are looked at
+        again, unless a full refresh is asked for.
+        """
+        try:
+            names = None if full or self.repeats is None else self.written
+            if self.repeats is None:
+                self.repeats = RepeatIndex.load(self.submissions_dir)
+            # Saved once on close, a session refreshes it after every stem
+            if self.repeats.refresh(self.storage, names):
+                self.repeats_changed = True
+            self.written = set()
+        except Exception as e:
+            self.warn(f"Error updating repetition index: {e}")
+        return self.repeats
+    
+    def show_repeat(self, completion: str, stem: str, earlier: List[str], repeats: Optional[RepeatIndex]):
+        """Point out a completion that is close to something already written"""
+        signature = minhash(completion)
+        if not signature:
+            return
+        for i, text in enumerate(earlier, 1):
+            other = minhash(text)
+            if other and similarity(signature, other) >= REPEAT_THRESHOLD:
+                print(f"   ↺ Close to your answer {i} above")
+                return
+        
+        matches = repeats.matches(completion, stem, limit=1) if repeats else []
+        if matches:
+            match = matches[0]
+            try:
+                when = datetime.strptime(match.date, "%Y%m%d").strftime("%Y-%m-%d")
+            except ValueError:
+                when = match.date
+            where = "for this stem" if match.stem == stem else f'for "{match.stem}"'
+            print(f'   ↺ You wrote something similar {where} on {when}: "{match.text}"')
+    
+    def show_repeat_analytics(self):
+        """Groups of near-identical completions across the whole history"""
+        index = self.repeat_index(full=True)
+        if index is None:
+            return
+        
+        print("\n=========================================")
+        print("          Repeated Completions")
+        print("=========================================")
+        clusters = index.clusters()
+        if not clusters:
+            print(f"\nNo repeats found in {len(index)} completions.")
+            return
+        
+        print(f"\n{len(clusters)} groups of similar completions in {len(index)} completions")
+        for rows in clusters[:10]:
+            entries = [index.entries[row] for row in rows]
+            stems = set(entry[3] for entry in entries)
+            scope = "same stem" if len(stems) == 1 else f"{len(stems)} stems"
+            print(f"\n{len(entries)} times ({scope}):")
+            for _, date, _, stem, text in sorted(entries, key=lambda entry: entry[1])[:5]:
+                print(f'- {date[:4]}-{date[4:6]}-{date[6:]}  "{text}"  ({stem})')
+    
+    def handle_weekend_reflection(self, program: Exercise, exercise: Week, week_start: str):
         """Handle weekend reflection - one of the main features"""
         # Start session timing
-        self.session_start_time = datetime.now()
+        self.session_start_time = self.clock.now()
         
-        current_week = self.tracker.progress["current_week"]
-        current_day = self.tracker.progress["current_day"]
+        tracker = self.tracker(program.id)
+        current_week = tracker.progress["current_week"]
+        current_day = tracker.progress["current_day"]
         
         print(f"\nWeek {current_week} | Day {current_day}")
         print()
         print("Reflect on this weeks submissions.")
         print("Enter at least 6 responses (or type submit to continue when ready):")
         
+        # Read the week and prepare the reflection prompts during the pause
+        exercise_name = program.id
+        week_submissions = self.pipeline.submit(self.get_week_submissions, exercise_name, week_start)
+        current_date = self.clock.now().strftime("%Y%m%d")
+        for stem in (WEEK_REFLECTION_STEM, FRESH_REFLECTION_STEM):
+            self.prefetch_stem(stem, exercise_name, current_date)
+        
         # Wait 2 seconds, then clear terminal
-        time.sleep(2)
+        self.clock.sleep(2)
         self.clear_terminal()
         
-        # Generate exercise name based on actual exercise name
-        branden_exercise = None
-        for ex in self.exercises:
-            if ex.get('type') == 'branden':
-                branden_exercise = ex
-                break
-        
-        if not branden_exercise:
-            print("❌ No branden exercise found")
-            return
-            
-        # Use sanitized exercise name for file naming
-        exercise_name = branden_exercise['name'].replace(' ', '_').replace('-', '_').lower()
-        exercise_name = ''.join(c for c in exercise_name if c.isalnum() or c == '_')
-        
-        submissions = self.get_week_submissions(exercise_name, week_start)
+        submissions = week_submissions.result()
         
         if not submissions:
             print("No submissions found for this week. Starting fresh reflection...")
-            reflection_stem = "If I reflect on my week..."
+            reflection_stem = FRESH_REFLECTION_STEM
             print(f'"{reflection_stem}"')
             print()
-            reflection_completions = self.get_user_completions(reflection_stem)
+            current_date = self.clock.now().strftime("%Y%m%d")
+            reflection_completions = self.get_user_completions(reflection_stem, exercise_name, current_date)
             
             # Save weekend reflection
-            current_date = datetime.now().strftime("%Y%m%d")
             self.save_submission(exercise_name, current_date, reflection_stem, reflection_completions)
             
             # Update last completed
-            self.tracker.progress["last_completed"] = datetime.now().strftime("%Y-%m-%d")
-            self.tracker.save_progress()
+            tracker.complete_stem(self.clock.now().strftime("%Y-%m-%d"), reflection_stem)
             return
         
         # Handle partial weeks - compile whatever exists
@@ -702,149 +884,181 @@ class Journaler:
                 print(f"{i}. {completion}")
             
             print()
-            reflection_stem = "If any of what I have been writing this week is true..."
+            reflection_stem = WEEK_REFLECTION_STEM
             print(f'"{reflection_stem}"')
             print()
-            reflection_completions = self.get_user_completions(reflection_stem)
+            current_date = self.clock.now().strftime("%Y%m%d")
+            reflection_completions = self.get_user_completions(reflection_stem, exercise_name, current_date)
             
             # Save weekend reflection
-            current_date = datetime.now().strftime("%Y%m%d")
             self.save_submission(exercise_name, current_date, reflection_stem, reflection_completions)
+            # The next reflection is the same stem: its draft was just saved and its history already offered
+            self.pipeline.provide(("stem", reflection_stem, exercise_name, current_date), (None, []))
         
         # Update last completed
-        self.tracker.progress["last_completed"] = datetime.now().strftime("%Y-%m-%d")
-        self.tracker.save_progress()
+        tracker.complete_stem(self.clock.now().strftime("%Y-%m-%d"), WEEK_REFLECTION_STEM)
     
-    def run_custom_exercise(self, exercise: Dict):
+    def run_custom_exercise(self, exercise: Exercise):
         """Run a custom exercise"""
         # Start session timing
-        self.session_start_time = datetime.now()
+        self.session_start_time = self.clock.now()
         
-        print(f"\n{exercise['name']}")
+        print(f"\n{exercise.name}")
         print("=" * 50)
         
-        exercise_name = f"custom_{exercise['time']}"
-        current_date = datetime.now().strftime("%Y%m%d")
+        exercise_name = exercise.id
+        current_date = self.clock.now().strftime("%Y%m%d")
         
         # Run all stems for custom exercises
-        for i, stem in enumerate(exercise["stems"], 1):
+        for i, stem in enumerate(exercise.stems, 1):
+            if i < len(exercise.stems):
+                # Ready before this stem is submitted
+                self.prefetch_stem(exercise.stems[i], exercise_name, current_date)
             print(f"\nStem {i}: {stem}")
-            completions = self.get_user_completions(stem)
+            completions = self.get_user_completions(stem, exercise_name, current_date)
             
             # Save submission
             self.save_submission(exercise_name, current_date, stem, completions)
         
-        print(f"\n✅ Completed {exercise['name']}")
+        print(f"\n✅ Completed {exercise.name}")
         
         # Update last completed
-        self.tracker.progress["last_completed"] = datetime.now().strftime("%Y-%m-%d")
-        self.tracker.save_progress()
+        self.tracker(exercise.id).complete_stem(self.clock.now().strftime("%Y-%m-%d"))
 
-    def run_exercise(self, exercise: Dict):
-        """Run the main branden exercise"""
-        current_week = self.tracker.progress["current_week"]
-        current_day = self.tracker.progress["current_day"]
+    def run_exercise(self, program: Exercise, exercise: Week):
+        """Run the current day of a multi-week program"""
+        tracker = self.tracker(program.id)
+        current_week = tracker.progress["current_week"]
+        current_day = tracker.progress["current_day"]
         
         # Start session timing
-        self.session_start_time = datetime.now()
+        self.session_start_time = self.clock.now()
         
         print(f"\nWeek {current_week} | Day {current_day}")
         
-        # Generate exercise name based on actual exercise name
-        branden_exercise = None
-        for ex in self.exercises:
-            if ex.get('type') == 'branden':
-                branden_exercise = ex
-                break
+        exercise_name = program.id
         
-        if not branden_exercise:
-            print("❌ No branden exercise found")
-            return
+        today = self.clock.now()
+        current_date = today.strftime("%Y%m%d")
+        entry = self.scheduled_today(program)
+        
+        if entry is None:
+            # No start date yet, fall back to working through the week in order
+            if today.weekday() >= 5:  # Weekend: Saturday = 5, Sunday = 6
+                week_start = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
+                self.handle_weekend_reflection(program, exercise, week_start)
+                return
             
-        # Use sanitized exercise name for file naming
-        exercise_name = branden_exercise['name'].replace(' ', '_').replace('-', '_').lower()
-        exercise_name = ''.join(c for c in exercise_name if c.isalnum() or c == '_')
+            current_stem_index = (current_day - 1) % len(exercise.stems)
+            stem = exercise.stems[current_stem_index]
+            completions = self.get_user_completions(stem, exercise_name, current_date)
+            self.save_submission(exercise_name, current_date, stem, completions)
+            self.advance_program(program, exercise, current_stem_index)
+            return
         
-        # Check if it's weekend
-        today = datetime.now()
-        if today.weekday() >= 5:  # Weekend: Saturday = 5, Sunday = 6
+        if entry.kind == REFLECTION:
             week_start = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
-            self.handle_weekend_reflection(exercise, week_start)
+            self.handle_weekend_reflection(program, exercise, week_start)
             return
         
-        # Handle regular weekday
-        stems = exercise["stems"]
-        current_stem_index = (current_day - 1) % len(stems)
+        if entry.kind == REST:
+            print("Today is a rest day. Come back tomorrow.")
+            return
         
-        if current_stem_index < len(stems):
-            stem = stems[current_stem_index]
-            completions = self.get_user_completions(stem)
-            
-            # Save submission
-            current_date = datetime.now().strftime("%Y%m%d")
-            self.save_submission(exercise_name, current_date, stem, completions)
-            
-            # Update progress and last completed
-            self.tracker.progress["last_completed"] = datetime.now().strftime("%Y-%m-%d")
+        # Regular stem day, the schedule says which stem
+        try:
+            done = self.read_day(day_name(exercise_name, current_date))
+        except Exception:
+            done = None
+        if done and entry.stem in done.submissions:
+            print("✅ You've already completed today's stem. Come back tomorrow for the next one.")
+            return
+        
+        completions = self.get_user_completions(entry.stem, exercise_name, current_date)
+        self.save_submission(exercise_name, current_date, entry.stem, completions)
+        tracker.complete_stem(today.strftime("%Y-%m-%d"), entry.stem)
+    
+    def advance_program(self, program: Exercise, week: Week, stem_index: int):
+        """Update progress and last completed after a program stem"""
+        tracker = self.tracker(program.id)
+        current_week = tracker.progress["current_week"]
+        current_day = tracker.progress["current_day"]
+        tracker.complete_stem(self.clock.now().strftime("%Y-%m-%d"), week.stems[stem_index])
+        
+        if stem_index == len(week.stems) - 1:
+            # Move to next week
+            tracker.update_progress(current_week + 1, 1)
+        else:
+            # Move to next day
+            tracker.update_progress(current_week, current_day + 1)
+    
+    def resume_drafts(self):
+        """Offer to finish completions left behind by an interrupted session"""
+        drafts = self.drafts.pending()
+        if not drafts:
+            return
+        
+        print(f"📝 Found {len(drafts)} unfinished draft(s) from an interrupted session.")
+        for draft in drafts:
+            exercise = self.catalog.get(draft.exercise)
+            name = exercise.name if exercise else draft.exercise
+            print(f'\n{name} ({draft.date}): "{draft.stem}" - {len(draft.completions)} responses saved')
+            choice = self.console.input("Resume this draft? (y = resume, n = keep for later, d = discard): ").strip().lower()
             
-            if current_stem_index == len(stems) - 1:
-                # Move to next week
-                self.tracker.update_progress(current_week + 1, 1)
-            else:
-                # Move to next day
-                self.tracker.update_progress(current_week, current_day + 1)
+            if choice == "d":
+                self.drafts.remove(draft)
+            elif choice == "y":
+                self.session_start_time = self.clock.now()
+                completions = self.get_user_completions(draft.stem, draft.exercise, draft.date)
+                self.save_submission(draft.exercise, draft.date, draft.stem, completions)
+                tracker = self.tracker(draft.exercise)
+                
+                if exercise and exercise.is_program and not self.schedule(exercise):
+                    # Only move on if the program is still waiting for this stem
+                    week = exercise.week(tracker.progress["current_week"])
+                    if week:
+                        stem_index = (tracker.progress["current_day"] - 1) % len(week.stems)
+                        if week.stems[stem_index] == draft.stem:
+                            self.advance_program(exercise, week, stem_index)
+                            continue
+                tracker.complete_stem(self.clock.now().strftime("%Y-%m-%d"), draft.stem)
     
     def calculate_streak(self) -> int:
         """Calculate current streak based on submission patterns"""
-        if not self.tracker.progress.get("start_date"):
+        if not any(self.tracker(program.id).progress.get("start_date") for program in self.catalog.programs):
             return 0
         
-        start_date = datetime.strptime(self.tracker.progress["start_date"], "%Y-%m-%d")
-        today = datetime.now()
-        
-        # Get all submission files
-        submission_files = []
-        for filename in os.listdir(self.submissions_dir):
-            if filename.endswith('.yaml'):
-                submission_files.append(filename)
-        
-        if not submission_files:
-            return 0
-        
-        # Sort files by date
-        submission_files.sort()
-        
-        # Calculate weeks with sufficient sessions (6+ per week)
-        current_streak = 0
-        max_streak = 0
+        # Day files sorted by date let the streak be counted in one pass
+        streak = WeeklyStreak()
+        for filename in sorted(self.day_files(), key=date_key):
+            datelike = date_key(filename)[0]
+            if datelike:
+                try:
+                    streak.add_date(datetime.strptime(datelike, "%y%m%d").date())
+                except ValueError:
+                    continue
         
-        # Group submissions by week
-        week_submissions = {}
-        for filename in submission_files:
+        return streak.longest
+    
+    def close(self):
+        """Finish queued saves, flush drafts and the stem and repetition indexes before exiting"""
+        self.pipeline.close()
+        self.drafts.close()
+        # Shows what the last draft flush reported
+        self.pipeline.drain()
+        if self.stems is not None and self.stems_changed and not self.storage.private:
             try:
-                # Extract date from filename (format: exercisename_YYMMDD.yaml)
-                date_part = filename.split('_')[-1].replace('.yaml', '')
-                if len(date_part) == 6:  # YYMMDD format
-                    file_date = datetime.strptime(date_part, "%y%m%d")
-                    week_start = file_date - timedelta(days=file_date.weekday())
-                    week_key = week_start.strftime("%Y-%m-%d")
-                    
-                    if week_key not in week_submissions:
-                        week_submissions[week_key] = 0
-                    week_submissions[week_key] += 1
-            except:
-                continue
-        
-        # Calculate streak
-        sorted_weeks = sorted(week_submissions.keys())
-        for week in sorted_weeks:
-            if week_submissions[week] >= 6:  # 6+ sessions per week
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 0
-        
-        return max_streak
+                self.stems.save()
+            except OSError as e:
+                print(f"❌ Error saving stem index: {e}")
+            self.stems_changed = False
+        if self.repeats is not None and self.repeats_changed and not self.storage.private:
+            try:
+                self.repeats.save()
+            except OSError as e:
+                print(f"❌ Error saving repetition index: {e}")
+            self.repeats_changed = False
+        self.storage.close()
     
     def main(self):
         """Main application loop"""
@@ -854,10 +1068,18 @@ class Journaler:
             print("Please ensure you have .yaml files in the 'journals' directory.")
             return
         
+        try:
+            self.resume_drafts()
+        except KeyboardInterrupt:
+            print("\n\nGoodbye! 👋")
+            return
+        
         while True:
             try:
+                # Everything from the last session is stored before the menu reads it
+                self.pipeline.drain()
                 self.show_menu()
-                choice = input("Enter your choice: ").strip().upper()
+                choice = self.console.input("Enter your choice: ").strip().upper()
                 
                 if choice == "X":
                     self.handle_analytics()
@@ -868,14 +1090,14 @@ class Journaler:
                     if 1 <= choice_num <= len(self.exercises):
                         selected_exercise = self.exercises[choice_num - 1]
                         
-                        if selected_exercise.get('type') == 'branden':
+                        if selected_exercise.is_program:
                             # Check if user needs setup for this specific exercise
-                            if not self.check_and_setup_user():
+                            if not self.check_and_setup_user(selected_exercise):
                                 continue
                             
-                            exercise = self.get_current_exercise()
+                            exercise = self.get_current_exercise(selected_exercise)
                             if exercise:
-                                self.run_exercise(exercise)
+                                self.run_exercise(selected_exercise, exercise)
                             else:
                                 print("No exercise found for current week")
                         else:
@@ -883,6 +1105,8 @@ class Journaler:
                             self.run_custom_exercise(selected_exercise)
                     else:
                         print("Invalid choice. Please try again.")
+                except VaultError as e:
+                    print(f"❌ {e}")
                 except ValueError:
                     print("Invalid choice. Please try again.")
             except KeyboardInterrupt:
@@ -893,9 +1117,259 @@ class Journaler:
                 print("Please try again.")
 
 
-def main():
-    journaler = Journaler()
-    journaler.main()
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="enough", description="ENOUGH - Minimal Journal")
+    parser.add_argument("--root", help="data directory (default: $ENOUGH_DATA_DIR, else the current directory "
+                                       "if it holds a journal, else $XDG_DATA_HOME/enough)")
+    parser.add_argument("--profile", help="separate journal kept under profiles/NAME in the data directory "
+                                          "(default: $ENOUGH_PROFILE)")
+    commands = parser.add_subparsers(dest="command")
+    
+    sync_parser = commands.add_parser("sync", help="sync submissions and progress with a shared directory")
+    sync_parser.add_argument("path", help="mounted directory or USB drive to sync with")
+    
+    pack_parser = commands.add_parser("pack", help="pack all day files into a single archive")
+    pack_parser.add_argument("--output", help="archive file (default: submissions.zip in the data directory)")
+    pack_parser.add_argument("--remove", action="store_true", help="delete loose day files once they are packed")
+    
+    fsck_parser = commands.add_parser("fsck", help="check submissions, journals and progress for corruption")
+    fsck_parser.add_argument("--repair", action="store_true", help="fix recoverable problems in day files")
+    fsck_parser.add_argument("--full", action="store_true", help="re-check every file, not only changed ones")
+    fsck_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    
+    report_parser = commands.add_parser("report", help="render Markdown or HTML reports of weeks and months")
+    selection = report_parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--week", type=int, help="program week to report on")
+    selection.add_argument("--month", help="calendar month to report on (YYYY-MM)")
+    selection.add_argument("--all", action="store_true", help="every week and month with submissions")
+    report_parser.add_argument("--format", choices=["markdown", "html"], default="markdown", help="output format (default: markdown)")
+    report_parser.add_argument("--output", help="directory for the reports (default: reports in the data directory)")
+    report_parser.add_argument("--jobs", type=int, default=None, help="worker processes for --all (default: CPU count)")
+    report_parser.add_argument("--force", action="store_true", help="render again even if nothing changed")
+    
+    convert_parser = commands.add_parser("convert", help="move submissions and progress to another storage backend")
+    convert_parser.add_argument("--to", dest="backend", required=True, choices=sorted(BACKENDS),
+                                help="backend to switch to")
+    
+    query_parser = commands.add_parser("query", help="print completions and sessions in a date range, or totals")
+    query_parser.add_argument("--from", dest="start", help="first day to include (YYYY-MM-DD)")
+    query_parser.add_argument("--to", dest="end", help="last day to include (YYYY-MM-DD)")
+    query_parser.add_argument("--exercise", help="exercise id, e.g. custom_morning")
+    query_parser.add_argument("--stem", help="text or glob pattern the stem must match")
+    query_parser.add_argument("--week", type=int, help="program week")
+    query_parser.add_argument("--aggregate", choices=AGGREGATES, help="totals instead of completions")
+    query_parser.add_argument("--per", choices=PERIODS, default="week", help="aggregate period (default: week)")
+    query_parser.add_argument("--format", choices=["table", "json"], default="table", help="output format (default: table)")
+    
+    return parser
+
+
+def yaml_storage_only(root: str, command: str) -> bool:
+    """sync, pack and fsck work on the day files themselves"""
+    try:
+        backend = configured_backend(root)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    if backend != YamlStorage.backend:
+        print(f"❌ enough {command} needs YAML day files, this journal is stored in {backend}")
+        print("Run 'enough convert --to yaml' first.")
+        return False
+    return True
+
+
+def run_sync(root: str, path: str) -> int:
+    """Two-way sync with a shared directory"""
+    from .sync import sync
+    
+    if not yaml_storage_only(root, "sync"):
+        return 1
+    if not os.path.isdir(path):
+        print(f"❌ Sync target '{path}' is not a directory")
+        return 1
+    
+    result = sync(root, path)
+    print(f"✅ Sync complete: {result.summary()}")
+    if result.progress_changed:
+        print("- progress reconciled")
+    for filename in result.conflicts:
+        print(f"- ⚠️ {filename} left unmerged")
+    return 1 if result.conflicts else 0
+
+
+def run_pack(root: str, output: Optional[str], remove: bool) -> int:
+    """Pack submissions/ into one stored zip for long-term storage"""
+    from .archive import pack
+    
+    if not yaml_storage_only(root, "pack"):
+        return 1
+    submissions_dir = os.path.join(root, "submissions")
+    output = output or os.path.join(root, "submissions.zip")
+    if not os.path.isdir(submissions_dir):
+        print(f"❌ Submissions directory '{submissions_dir}' not found!")
+        return 1
+    
+    try:
+        packed = pack(submissions_dir, output, PackedArchive.open(output))
+    except Exception as e:
+        print(f"❌ Failed to pack archive: {e}")
+        return 1
+    
+    if remove:
+        for filename in packed:
+            os.remove(os.path.join(submissions_dir, filename))
+    print(f"✅ Packed {len(packed)} day files into {output}")
+    return 0
+
+
+def run_fsck(root: str, repair: bool, full: bool, jobs: Optional[int]) -> int:
+    """Validate the archive and report every problem found"""
+    from .fsck import fsck
+    
+    if not yaml_storage_only(root, "fsck"):
+        return 1
+    report = fsck(root, repair=repair, full=full, jobs=jobs)
+    for path in report.repaired:
+        print(f"🔧 Repaired {path}")
+    for path, issues in report.problems.items():
+        print(f"❌ {path}")
+        for issue in issues:
+            hint = " (repairable with --repair)" if issue.repairable and not repair else ""
+            print(f"   - {issue.message}{hint}")
+    
+    print(f"Checked {report.checked} files, {report.skipped} unchanged since the last check.")
+    if report.clean:
+        print("✅ No problems found")
+        return 0
+    return 1
+
+
+def run_report(root: str, args: argparse.Namespace) -> int:
+    """Render reports of program weeks or calendar months"""
+    from .report import build_reports
+    
+    try:
+        backend = configured_backend(root)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if backend == YamlStorage.backend and not os.path.isdir(os.path.join(root, "submissions")):
+        print("❌ Submissions directory 'submissions' not found!")
+        return 1
+    
+    if args.all:
+        selection = {"all": True}
+    elif args.week is not None:
+        selection = {"week": args.week}
+    else:
+        try:
+            month = datetime.strptime(args.month, "%Y-%m")
+        except ValueError:
+            print("❌ Invalid month format. Use YYYY-MM (e.g., 2025-01)")
+            return 1
+        selection = {"month": (month.year, month.month)}
+    
+    catalog = load_catalog(os.path.join(root, "journals"))
+    exercise_names = {exercise.id: exercise.name for exercise in catalog.exercises}
+    program_ids = [program.id for program in catalog.programs]
+    
+    try:
+        result = build_reports(root, selection, exercise_names, program_ids, args.format,
+                               args.output, args.jobs, args.force)
+    except Exception as e:
+        print(f"❌ Failed to build reports: {e}")
+        return 1
+    
+    if not result.written and not result.unchanged:
+        print("❌ No submissions found for this report")
+        return 1
+    for path in result.written:
+        print(f"📝 {path}")
+    print(f"✅ Wrote {len(result.written)} reports, {len(result.unchanged)} unchanged since the last run")
+    return 0
+
+
+def run_convert(root: str, backend: str) -> int:
+    """Stream every day and progress document into another backend and switch to it"""
+    from .storage import convert
+    
+    try:
+        result = convert(root, backend)
+    except Exception as e:
+        print(f"❌ Failed to convert storage: {e}")
+        return 1
+    
+    print(f"✅ Moved {result.days} days and the progress of {result.progress} exercises "
+          f"from {result.source} to {result.target}")
+    if result.removed:
+        print(f"- removed {result.removed} days left in {result.target} by an earlier conversion")
+    print(f"- the {result.source} copy is left in place, delete it once you no longer need it")
+    return 0
+
+
+def run_query(root: str, args: argparse.Namespace) -> int:
+    """Print matching days, or their totals per week or month"""
+    from .query import QueryFilter, aggregate_days, find_days, format_aggregate, format_days
+    
+    try:
+        start = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+        end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else None
+    except ValueError:
+        print("❌ Invalid date format. Use YYYY-MM-DD")
+        return 1
+    
+    query = QueryFilter(start, end, args.exercise, args.stem, args.week)
+    try:
+        storage = open_storage(root)
+    except Exception as e:
+        print(f"❌ Failed to open storage: {e}")
+        return 1
+    def report(name: str, error: Exception):
+        # stderr, so --format json output stays parseable
+        print(f"❌ Skipping {name}: {error}", file=sys.stderr)
+    
+    try:
+        days = find_days(storage, query, report)
+        if args.aggregate:
+            print(format_aggregate(aggregate_days(days, args.per), args.per, args.aggregate, args.format))
+        else:
+            print(format_days(days, args.format))
+    finally:
+        storage.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    try:
+        root = resolve_root(args.root, args.profile)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if args.command == "sync":
+        sys.exit(run_sync(root, args.path))
+    if args.command == "pack":
+        sys.exit(run_pack(root, args.output, args.remove))
+    if args.command == "fsck":
+        sys.exit(run_fsck(root, args.repair, args.full, args.jobs))
+    if args.command == "report":
+        sys.exit(run_report(root, args))
+    if args.command == "convert":
+        sys.exit(run_convert(root, args.backend))
+    if args.command == "query":
+        sys.exit(run_query(root, args))
+    
+    try:
+        journaler = Journaler(root=root)
+    except VaultError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    try:
+        journaler.main()
+    finally:
+        # Make sure queued draft completions reach the disk before exiting
+        journaler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Small JSON state files: manifests, caches and check results
+"""
+
+import os
+import json
+from typing import Dict
+
+
+def read_json(filepath: str) -> Dict:
+    """The mapping stored in filepath, empty if it is missing or unreadable"""
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(filepath: str, data: Dict):
+    """Replace filepath atomically with compact JSON"""
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, filepath)
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Domain model for exercises, weeks and day submissions
+"""
+
+import os
+import json
+import yaml
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+# libyaml's loader and dumper are several times faster and handle the same documents
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Stems the weekend reflection saves alongside the week's own stems
+WEEK_REFLECTION_STEM = "If any of what I have been writing this week is true..."
+FRESH_REFLECTION_STEM = "If I reflect on my week..."
+REFLECTION_STEMS = (WEEK_REFLECTION_STEM, FRESH_REFLECTION_STEM)
+
+# Journals shipped inside the package, and their precompiled form in single-file builds
+BUNDLED_JOURNALS = "journals"
+COMPILED_CATALOG = "catalog.json"
+COMPILED_VERSION = 1
+
+
+class SchemaError(ValueError):
+    """Raised when a journal definition or day file has an unexpected shape"""
+
+
+def sanitize_name(name: str) -> str:
+    """Turn an exercise name into the prefix used for submission files"""
+    name = name.replace(' ', '_').replace('-', '_').lower()
+    return ''.join(c for c in name if c.isalnum() or c == '_')
+
+
+def _require(data: Dict, key: str, kind, where: str):
+    if key not in data:
+        raise SchemaError(f"{where}: missing '{key}'")
+    value = data[key]
+    if not isinstance(value, kind):
+        raise SchemaError(f"{where}: '{key}' has unexpected type {type(value).__name__}")
+    return value
+
+
+DAY_KINDS = ("stem", "reflection", "rest")
+
+
+def default_pattern(stem_days: int) -> List[str]:
+    """What each weekday is for, Monday to Sunday, when a program declares no schedule
+
+    One stem day for every stem of the longest week, the rest of the
+    week is for reflection.
+    """
+    return ["stem"] * stem_days + ["reflection"] * (7 - stem_days)
+
+
+def _schedule_pattern(data: Dict, weeks: Dict[int, "Week"], where: str) -> List[str]:
+    stem_days = max((len(week.stems) for week in weeks.values()), default=1)
+    schedule = data.get('schedule')
+    if schedule is None:
+        if stem_days > 7:
+            raise SchemaError(f"{where}: a week has {stem_days} stems, more than the days of a week")
+        return default_pattern(stem_days)
+    if not isinstance(schedule, dict):
+        raise SchemaError(f"{where}: 'schedule' must be a mapping")
+    pattern = schedule.get('pattern', default_pattern(min(stem_days, 7)))
+    if not isinstance(pattern, list) or len(pattern) != 7:
+        raise SchemaError(f"{where}: schedule pattern must list 7 days, Monday to Sunday")
+    for kind in pattern:
+        if kind not in DAY_KINDS:
+            raise SchemaError(f"{where}: unknown schedule day {kind!r}, use one of {', '.join(DAY_KINDS)}")
+    if "stem" not in pattern:
+        raise SchemaError(f"{where}: schedule pattern needs at least one stem day")
+    # Fewer stem days than stems would leave the last stems of a week unasked
+    for number, week in sorted(weeks.items()):
+        if len(week.stems) > pattern.count("stem"):
+            raise SchemaError(f"{where}: week {number} has {len(week.stems)} stems but the schedule pattern "
+                              f"has only {pattern.count('stem')} stem days")
+    return list(pattern)
+
+
+def _stem_list(value, where: str) -> List[str]:
+    if not isinstance(value, list) or not value:
+        raise SchemaError(f"{where}: stems must be a non-empty list")
+    for stem in value:
+        if not isinstance(stem, str):
+            raise SchemaError(f"{where}: stems must be strings")
+    return list(value)
+
+
+@dataclass
+class Week:
+    __slots__ = ("number", "stems")
+    number: int
+    stems: List[str]
+
+
+@dataclass
+class Exercise:
+    """A journal definition loaded from journals/*.yaml"""
+    __slots__ = ("id", "name", "description", "type", "total_weeks", "time", "stems", "weeks", "pattern", "source",
+                 "prefix")
+    id: str
+    name: str
+    description: str
+    type: str
+    total_weeks: int
+    time: str
+    stems: List[str]
+    weeks: Dict[int, Week]
+    pattern: List[str]
+    source: str
+
+    def __post_init__(self):
+        # Day files of this exercise are named <prefix>YYMMDD.yaml
+        self.prefix = f"{self.id}_"
+
+    @property
+    def is_program(self) -> bool:
+        return self.type == 'branden'
+
+    def week(self, number: int) -> Optional[Week]:
+        return self.weeks.get(number)
+
+    @classmethod
+    def from_dict(cls, data, source: str = "") -> "Exercise":
+        """Validate a parsed journal file and build an Exercise from it"""
+        where = source or "journal"
+        if not isinstance(data, dict):
+            raise SchemaError(f"{where}: expected a mapping at the top level")
+
+        name = _require(data, 'name', str, where)
+        description = data.get('description', '') or ''
+        kind = data.get('type')
+
+        if kind == 'branden':
+            # This is a multi-week exercise
+            total_weeks = _require(data, 'total_weeks', int, where)
+            weeks = {}
+            for entry in _require(data, 'weeks', list, where):
+                if not isinstance(entry, dict):
+                    raise SchemaError(f"{where}: every week must be a mapping")
+                number = _require(entry, 'week', int, where)
+                if number in weeks:
+                    raise SchemaError(f"{where}: week {number} is defined twice")
+                weeks[number] = Week(number, _stem_list(entry.get('stems'), f"{where} week {number}"))
+            pattern = _schedule_pattern(data, weeks, where)
+            return cls(sanitize_name(name), name, description, 'branden', total_weeks, '', [], weeks, pattern, source)
+
+        if kind == 'custom':
+            # This is a custom exercise, files are named after its time of day
+            time_of_day = _require(data, 'time', str, where)
+            stems = _stem_list(data.get('stems'), where)
+            return cls(f"custom_{time_of_day}", name, description, 'custom', 0, time_of_day, stems, {}, [], source)
+
+        raise SchemaError(f"{where}: unknown journal type {kind!r}")
+
+
+@dataclass
+class Session:
+    __slots__ = ("started_at", "ended_at", "duration_minutes")
+    started_at: str
+    ended_at: str
+    duration_minutes: float
+
+    @classmethod
+    def from_dict(cls, data) -> "Session":
+        if not isinstance(data, dict):
+            raise SchemaError("session must be a mapping")
+        started_at = data.get("started_at")
+        ended_at = data.get("ended_at", started_at)
+        duration = data.get("duration_minutes", 0) or 0
+        if not isinstance(started_at, str) or not isinstance(ended_at, str):
+            raise SchemaError("session timestamps must be ISO 8601 strings")
+        if not isinstance(duration, (int, float)):
+            raise SchemaError("session duration_minutes must be a number")
+        return cls(started_at, ended_at, duration)
+
+    def to_dict(self) -> Dict:
+        return {
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "duration_minutes": self.duration_minutes
+        }
+
+
+@dataclass
+class DaySubmission:
+    """Everything written for one exercise on one day"""
+    __slots__ = ("journal", "date", "week", "day", "session", "submissions")
+    journal: str
+    date: str
+    week: int
+    day: int
+    session: Optional[Session]
+    submissions: Dict[str, List[str]]
+
+    @classmethod
+    def from_dict(cls, data) -> "DaySubmission":
+        if not isinstance(data, dict):
+            raise SchemaError("day file must be a mapping")
+        submissions = data.get("submissions") or {}
+        if not isinstance(submissions, dict):
+            raise SchemaError("submissions must map stems to responses")
+        for stem, completions in submissions.items():
+            if not isinstance(completions, list):
+                raise SchemaError(f"responses for {stem!r} must be a list")
+        session = Session.from_dict(data["session"]) if data.get("session") else None
+        return cls(
+            str(data.get("journal", "")),
+            str(data.get("date", "")),
+            data.get("week", 0),
+            data.get("day", 0),
+            session,
+            submissions
+        )
+
+    @classmethod
+    def parse(cls, text) -> Optional["DaySubmission"]:
+        """Validate the YAML text of a day file, None if it is empty"""
+        data = yaml.load(text, Loader=SafeLoader)
+        if not data:
+            return None
+        return cls.from_dict(data)
+
+    @classmethod
+    def load(cls, filepath: str) -> Optional["DaySubmission"]:
+        """Read and validate a day file, None if it does not exist or is empty"""
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, 'r') as f:
+            return cls.parse(f)
+
+    def dump(self, filepath: str):
+        with open(filepath, 'w') as f:
+            yaml.dump(self.to_dict(), f, Dumper=SafeDumper, default_flow_style=False)
+
+    def to_dict(self) -> Dict:
+        data = {
+            "journal": self.journal,
+            "date": self.date,
+            "week": self.week,
+            "day": self.day,
+            "submissions": self.submissions
+        }
+        if self.session:
+            data["session"] = self.session.to_dict()
+        return data
+
+    @property
+    def stem_count(self) -> int:
+        return len(self.submissions)
+
+    @property
+    def completion_count(self) -> int:
+        return sum(len(completions) for completions in self.submissions.values())
+
+
+@dataclass
+class DaySummary:
+    """What the calendar and analytics need of a day, without its completions"""
+    __slots__ = ("journal", "date", "week", "day", "session", "stem_count", "completion_count")
+    journal: str
+    date: str
+    week: int
+    day: int
+    session: Optional[Session]
+    stem_count: int
+    completion_count: int
+
+    @classmethod
+    def of(cls, day: DaySubmission) -> "DaySummary":
+        return cls(day.journal, day.date, day.week, day.day, day.session, day.stem_count, day.completion_count)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DaySummary":
+        session = Session.from_dict(data["session"]) if data.get("session") else None
+        return cls(data["journal"], data["date"], data["week"], data["day"], session,
+                   data["stems"], data["completions"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "journal": self.journal,
+            "date": self.date,
+            "week": self.week,
+            "day": self.day,
+            "session": self.session.to_dict() if self.session else None,
+            "stems": self.stem_count,
+            "completions": self.completion_count
+        }
+
+
+class Catalog:
+    """All loaded exercises, indexed by id
+
+    A catalog is never modified once built. refresh() returns a new one
+    when journal files changed on disk, so a session that holds on to an
+    Exercise keeps the definition it started with.
+    """
+
+    def __init__(self, journals_dir: Optional[str] = None, bundled: Tuple[Exercise, ...] = ()):
+        self.journals_dir = journals_dir
+        # Shipped with the package, they never change while running
+        self.bundled = bundled
+        self.exercises: List[Exercise] = []
+        self.by_id: Dict[str, Exercise] = {}
+        self.program: Optional[Exercise] = None
+        self.programs: List[Exercise] = []
+        self.errors: List[Tuple[str, Exception]] = []
+        # filename -> ((mtime_ns, size), last good definition)
+        self._files: Dict[str, Tuple[Tuple[int, int], Optional[Exercise]]] = {}
+
+    def add(self, exercise: Exercise):
+        self.exercises.append(exercise)
+        self.by_id[exercise.id] = exercise
+        if exercise.is_program:
+            self.programs.append(exercise)
+            # The first multi-week program owns a progress.json from before per-exercise progress
+            if self.program is None:
+                self.program = exercise
+
+    def get(self, exercise_id: str) -> Optional[Exercise]:
+        return self.by_id.get(exercise_id)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stamps = {}
+        if self.journals_dir and os.path.isdir(self.journals_dir):
+            with os.scandir(self.journals_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.yaml') and entry.is_file():
+                        stat = entry.stat()
+                        stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _parse(self, filename: str, previous: Optional[Exercise]) -> Optional[Exercise]:
+        try:
+            with open(os.path.join(self.journals_dir, filename), 'r') as f:
+                return Exercise.from_dict(yaml.load(f, Loader=SafeLoader), filename)
+        except Exception as e:
+            self.errors.append((filename, e))
+            # Keep serving the last definition that validated
+            return previous
+
+    def _build(self, previous: Dict[str, Tuple[Tuple[int, int], Optional[Exercise]]],
+               stamps: Dict[str, Tuple[int, int]]):
+        # Known files keep their menu position, new ones go to the end
+        names = [name for name in previous if name in stamps]
+        names += [name for name in stamps if name not in previous]
+        user = []
+        for name in names:
+            stamp, exercise = previous.get(name, (None, None))
+            if stamp != stamps[name]:
+                exercise = self._parse(name, exercise)
+            self._files[name] = (stamps[name], exercise)
+            if exercise:
+                user.append(exercise)
+
+        # A user journal with the id of a bundled one takes its place in the menu
+        overrides = {exercise.id: exercise for exercise in user}
+        for exercise in self.bundled:
+            self.add(overrides.get(exercise.id, exercise))
+        bundled_ids = set(exercise.id for exercise in self.bundled)
+        for exercise in user:
+            if exercise.id not in bundled_ids:
+                self.add(exercise)
+
+    @classmethod
+    def load(cls, journals_dir: Optional[str], bundled: Tuple[Exercise, ...] = ()) -> "Catalog":
+        """Load and validate every .yaml file in journals_dir, after the bundled journals"""
+        catalog = cls(journals_dir, bundled)
+        catalog._build({}, catalog._scan())
+        return catalog
+
+    def refresh(self) -> "Catalog":
+        """Re-parse only journals whose mtime or size changed
+
+        Returns self when nothing changed, otherwise a new catalog that
+        reuses the unchanged definitions.
+        """
+        stamps = self._scan()
+        if stamps == {name: entry[0] for name, entry in self._files.items()}:
+            return self
+        catalog = Catalog(self.journals_dir, self.bundled)
+        catalog._build(self._files, stamps)
+        return catalog
+
+
+def _bundled_root():
+    """The package's journals directory, inside a zip archive too, None without one"""
+    try:
+        from importlib.resources import files
+    except ImportError:
+        # Python 3.8 has no files(), only an unpacked install can be read
+        root = Path(__file__).with_name(BUNDLED_JOURNALS)
+    else:
+        root = files(__package__) / BUNDLED_JOURNALS
+    return root if root.is_dir() else None
+
+
+def bundled_sources() -> List[Tuple[str, bytes]]:
+    """(filename, contents) of every journal shipped with the package"""
+    root = _bundled_root()
+    if root is None:
+        return []
+    return sorted((entry.name, entry.read_bytes()) for entry in root.iterdir()
+                  if entry.name.endswith('.yaml') and entry.is_file())
+
+
+def sources_digest(sources: List[Tuple[str, bytes]]) -> str:
+    digest = hashlib.sha256()
+    for name, data in sources:
+        digest.update(name.encode() + b"\0" + data + b"\0")
+    return digest.hexdigest()
+
+
+def compile_catalog(sources: List[Tuple[str, bytes]]) -> Dict:
+    """Parsed journal documents tagged with the digest of the YAML they came from"""
+    journals = []
+    for name, data in sources:
+        document = yaml.load(data, Loader=SafeLoader)
+        Exercise.from_dict(document, name)
+        if json.loads(json.dumps(document)) != document:
+            raise SchemaError(f"{name}: does not survive a round trip through JSON")
+        journals.append([name, document])
+    return {"version": COMPILED_VERSION, "digest": sources_digest(sources), "journals": journals}
+
+
+def _compiled_documents(root, sources: List[Tuple[str, bytes]]) -> Optional[Dict]:
+    """Documents of a precompiled catalog, None when there is none or it is stale"""
+    try:
+        compiled = root / COMPILED_CATALOG
+        if not compiled.is_file():
+            return None
+        data = json.loads(compiled.read_bytes())
+        if data.get("version") != COMPILED_VERSION or data.get("digest") != sources_digest(sources):
+            return None
+        return dict(data["journals"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=1)
+def bundled_exercises() -> Tuple[Tuple[Exercise, ...], Tuple[Tuple[str, Exception], ...]]:
+    """Exercises shipped with the package and the errors loading them, read once per process
+
+    A precompiled catalog matching the shipped YAML is used instead of
+    parsing it.
+    """
+    sources = bundled_sources()
+    documents = _compiled_documents(_bundled_root(), sources) if sources else None
+    exercises, errors = [], []
+    for name, data in sources:
+        try:
+            document = documents[name] if documents is not None else yaml.load(data, Loader=SafeLoader)
+            exercises.append(Exercise.from_dict(document, name))
+        except Exception as e:
+            errors.append((name, e))
+    return tuple(exercises), tuple(errors)
+
+
+def load_catalog(journals_dir: Optional[str]) -> Catalog:
+    """The bundled journals merged with the user's own in journals_dir"""
+    bundled, errors = bundled_exercises()
+    catalog = Catalog.load(journals_dir, bundled)
+    catalog.errors[:0] = errors
+    return catalog
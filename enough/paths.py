@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Where the journal keeps its data: flag, environment, or the XDG data directory
+"""
+
+import os
+from typing import Optional
+
+from .progress import LEGACY_PROGRESS_FILE, PROGRESS_DIR
+from .storage import JSONL_FILE, SQLITE_FILE, STORAGE_FILE
+
+APP_NAME = "enough"
+DATA_DIR_ENV = "ENOUGH_DATA_DIR"
+PROFILE_ENV = "ENOUGH_PROFILE"
+PROFILES_DIR = "profiles"
+
+# What a directory used as the journal before data roots existed contains
+LEGACY_MARKERS = ("submissions", "submissions.zip", PROGRESS_DIR, LEGACY_PROGRESS_FILE, STORAGE_FILE,
+                  SQLITE_FILE, JSONL_FILE)
+
+
+def data_home() -> str:
+    """$XDG_DATA_HOME, ~/.local/share when unset, %APPDATA% on Windows"""
+    if os.name == "nt" and os.environ.get("APPDATA"):
+        return os.environ["APPDATA"]
+    value = os.environ.get("XDG_DATA_HOME", "")
+    # The spec says relative values are invalid and must be ignored
+    if os.path.isabs(value):
+        return value
+    return os.path.join(os.path.expanduser("~"), ".local", "share")
+
+
+def has_journal_data(directory: str) -> bool:
+    return any(os.path.exists(os.path.join(directory, marker)) for marker in LEGACY_MARKERS)
+
+
+def resolve_root(root: Optional[str] = None, profile: Optional[str] = None) -> str:
+    """Absolute data root of the journal, nothing is created
+
+    The first of: the --root flag, $ENOUGH_DATA_DIR, the current
+    directory if it already holds a journal, $XDG_DATA_HOME/enough.
+    A profile (--profile or $ENOUGH_PROFILE) is a separate journal in
+    profiles/<name> under that root.
+    """
+    base = root or os.environ.get(DATA_DIR_ENV)
+    if not base:
+        base = "." if has_journal_data(".") else os.path.join(data_home(), APP_NAME)
+    base = os.path.expanduser(base)
+
+    profile = profile or os.environ.get(PROFILE_ENV)
+    if profile:
+        if profile in (".", "..") or any(sep and sep in profile for sep in (os.sep, os.altsep)):
+            raise ValueError(f"invalid profile name {profile!r}")
+        base = os.path.join(base, PROFILES_DIR, profile)
+    return os.path.abspath(base)
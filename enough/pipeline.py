@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Background worker that saves stems and prefetches what the next prompt needs
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class SessionPipeline:
+    """One worker thread running session disk work in the order it was queued
+
+    Saves are queued as the user submits a stem and the next prompt is
+    shown straight away. Because there is a single worker, anything
+    queued after a save sees it: a prefetch never reads a day before the
+    save that changed it. Work nobody waits on is queued with queue(),
+    its failures, and errors other threads report(), go to on_error at
+    the next drain(), take() or close(), between two prompts.
+    """
+
+    def __init__(self, on_error: Optional[Callable[[str], None]] = None):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._worker: Optional[threading.Thread] = None
+        self._prefetched: Dict[Hashable, Future] = {}
+        self.on_error = on_error
+        self._failed: List[str] = []
+        self._lock = threading.Lock()
+
+    def _start(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enough-session",
+                                                initializer=self._register)
+        return self._executor
+
+    def _register(self):
+        self._worker = threading.current_thread()
+
+    def on_worker(self) -> bool:
+        return self._worker is not None and threading.current_thread() is self._worker
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queue fn behind everything already queued"""
+        if self.on_worker():
+            # Already in order, queueing again would wait on itself
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._start().submit(fn, *args)
+
+    def queue(self, failure: str, fn: Callable, *args):
+        """Queue fn without waiting on it, a failure is reported later as failure and the error"""
+        def collect(future: Future):
+            error = future.exception()
+            if error is not None:
+                self.report(f"{failure}: {error}")
+
+        self.submit(fn, *args).add_done_callback(collect)
+
+    def report(self, message: str):
+        """Keep an error of a background thread for the next drain(), take() or close()"""
+        with self._lock:
+            self._failed.append(message)
+
+    def _report(self):
+        """Hand the kept errors to on_error, on the calling thread"""
+        with self._lock:
+            failed, self._failed = self._failed, []
+        for message in failed:
+            if self.on_error is not None:
+                self.on_error(message)
+
+    def call(self, fn: Callable, *args) -> Any:
+        """Run fn after everything queued and wait for its result"""
+        return self.submit(fn, *args).result()
+
+    def prefetch(self, key: Hashable, fn: Callable, *args):
+        """Start work whose result a later take(key) will want"""
+        if key not in self._prefetched:
+            self._prefetched[key] = self.submit(fn, *args)
+
+    def provide(self, key: Hashable, value: Any):
+        """Hand take(key) a result that is already known"""
+        future = Future()
+        future.set_result(value)
+        self._prefetched[key] = future
+
+    def take(self, key: Hashable, fn: Callable, *args) -> Any:
+        """The prefetched result for key, or fn's result run now in queue order"""
+        future = self._prefetched.pop(key, None)
+        if future is None:
+            future = self.submit(fn, *args)
+        try:
+            return future.result()
+        finally:
+            self._report()
+
+    def drain(self):
+        """Wait until everything queued so far has run"""
+        if self._executor is not None and not self.on_worker():
+            self._executor.submit(lambda: None).result()
+        self._prefetched.clear()
+        self._report()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._worker = None
+        self._prefetched.clear()
+        self._report()
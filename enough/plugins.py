@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Analytics plugins run together in one cached pass over the day files
+"""
+
+import os
+import sys
+import hashlib
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from .aggregate import DayRecord, iter_day_records
+from .jsonio import read_json, write_json
+from .storage import Storage
+
+ENTRY_POINT_GROUP = "enough.analytics"
+PLUGINS_DIR = "plugins"
+PLUGIN_CACHE_DIR = ".plugins"
+
+
+class AnalyticsPlugin(ABC):
+    """Base class for analytics shown under Analytics & Progress
+
+    map() turns one day into a small JSON-serializable value and reduce()
+    combines the values of every day into the plugin's result. Both are
+    cached: a day is only mapped again when its file changes, and the
+    result is only reduced again when any of its inputs changed.
+
+    consumes lists the journal types the plugin wants to see ('branden',
+    'custom'), None means every day file.
+    """
+    name = ""
+    title = ""
+    consumes: Optional[tuple] = None
+    # Bump when map() changes so cached values are thrown away
+    version = 1
+
+    @abstractmethod
+    def map(self, record: DayRecord) -> Any:
+        ...
+
+    @abstractmethod
+    def reduce(self, values: List[Any]) -> Any:
+        ...
+
+    @abstractmethod
+    def render(self, result: Any) -> List[str]:
+        ...
+
+
+class StemCounts(AnalyticsPlugin):
+    name = "stem_counts"
+    title = "Most answered stems"
+
+    def map(self, record: DayRecord) -> Any:
+        return {stem: len(completions) for stem, completions in record.day.submissions.items()}
+
+    def reduce(self, values: List[Any]) -> Any:
+        totals: Dict[str, List[int]] = {}
+        for day in values:
+            for stem, count in day.items():
+                entry = totals.setdefault(stem, [0, 0])
+                entry[0] += 1
+                entry[1] += count
+        return sorted(([stem] + entry for stem, entry in totals.items()), key=lambda row: (-row[2], row[0]))[:10]
+
+    def render(self, result: Any) -> List[str]:
+        return [f"{completions:4d} completions over {days:3d} days  {stem}" for stem, days, completions in result]
+
+
+class CompletionLength(AnalyticsPlugin):
+    name = "completion_length"
+    title = "Average words per completion by month"
+
+    def map(self, record: DayRecord) -> Any:
+        if not record.date:
+            return None
+        words = [len(str(completion).split()) for completions in record.day.submissions.values()
+                 for completion in completions]
+        return [record.date.strftime("%Y-%m"), sum(words), len(words)]
+
+    def reduce(self, values: List[Any]) -> Any:
+        months: Dict[str, List[int]] = {}
+        for month, words, completions in values:
+            entry = months.setdefault(month, [0, 0])
+            entry[0] += words
+            entry[1] += completions
+        return [[month, words / completions] for month, (words, completions) in sorted(months.items()) if completions]
+
+    def render(self, result: Any) -> List[str]:
+        return [f"{month}  {average:5.1f}" for month, average in result[-12:]]
+
+
+BUILTIN_PLUGINS = (StemCounts, CompletionLength)
+
+
+def _plugin_classes(module) -> List[type]:
+    return [value for value in vars(module).values()
+            if isinstance(value, type) and issubclass(value, AnalyticsPlugin) and value is not AnalyticsPlugin
+            and value.__module__ == module.__name__]
+
+
+def _entry_points() -> Iterable:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    found = entry_points()
+    if hasattr(found, "select"):
+        return found.select(group=ENTRY_POINT_GROUP)
+    return found.get(ENTRY_POINT_GROUP, [])
+
+
+def discover_plugins(plugins_dir: str = PLUGINS_DIR) -> List[AnalyticsPlugin]:
+    """Built-in plugins, then installed entry points, then plugins/*.py"""
+    classes = list(BUILTIN_PLUGINS)
+
+    for entry_point in _entry_points():
+        try:
+            classes.append(entry_point.load())
+        except Exception as e:
+            print(f"❌ Failed to load analytics plugin {entry_point.name}: {e}")
+
+    if os.path.isdir(plugins_dir):
+        for filename in sorted(os.listdir(plugins_dir)):
+            if not filename.endswith(".py") or filename.startswith("_"):
+                continue
+            module_name = f"enough_plugin_{filename[:-3]}"
+            try:
+                spec = importlib.util.spec_from_file_location(module_name, os.path.join(plugins_dir, filename))
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                spec.loader.exec_module(module)
+            except Exception as e:
+                print(f"❌ Failed to load plugin {filename}: {e}")
+                continue
+            classes.extend(_plugin_classes(module))
+
+    plugins = []
+    names = set()
+    for cls in classes:
+        try:
+            # A plugin missing map(), reduce() or render() is abstract and fails here
+            plugin = cls()
+        except Exception as e:
+            print(f"❌ Failed to start analytics plugin {getattr(cls, '__name__', cls)}: {e}")
+            continue
+        if not plugin.name or plugin.name in names:
+            print(f"❌ Skipping analytics plugin {cls.__name__}: missing or duplicate name")
+            continue
+        names.add(plugin.name)
+        plugins.append(plugin)
+    return plugins
+
+
+class PluginCache:
+    """Mapped values per day file and the last reduced result of one plugin"""
+
+    def __init__(self, cache_dir: str, plugin: AnalyticsPlugin):
+        self.path = os.path.join(cache_dir, f"{plugin.name}.json")
+        data = read_json(self.path)
+        if data.get("version") != plugin.version:
+            data = {}
+        self.version = plugin.version
+        # name -> [signature, mapped value]
+        self.files: Dict[str, list] = data.get("files", {})
+        self.digest: Optional[str] = data.get("digest")
+        self.result: Any = data.get("result")
+        self.changed = False
+
+    def inputs_digest(self) -> str:
+        digest = hashlib.sha256(str(self.version).encode())
+        for name in sorted(self.files):
+            digest.update(f"\0{name}\0{self.files[name][0]}".encode())
+        return digest.hexdigest()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json(self.path, {"version": self.version, "files": self.files,
+                               "digest": self.digest, "result": self.result})
+
+
+def run_plugins(plugins: List[AnalyticsPlugin], source: Storage, kinds: Dict[str, str],
+                cache_dir: str) -> Dict[str, Any]:
+    """Bring every plugin up to date in one pass over new and changed day files
+
+    kinds maps exercise ids to journal types for the consumes filter.
+    Returns each plugin's reduced result by plugin name.
+    """
+    caches = {plugin.name: PluginCache(cache_dir, plugin) for plugin in plugins}
+    current = {name: source.signature(name) for name in source.names()}
+
+    # Files any plugin has not mapped at their current version
+    stale = [name for name, signature in current.items()
+             if any(cache.files.get(name, (None,))[0] != signature for cache in caches.values())]
+
+    def report(name: str, error: Exception):
+        print(f"❌ Error reading {name} for analytics: {error}")
+
+    for record in iter_day_records(stale, source.read, report):
+        kind = kinds.get(record.day.journal)
+        for plugin in plugins:
+            cache = caches[plugin.name]
+            signature = current[record.name]
+            if cache.files.get(record.name, (None,))[0] == signature:
+                continue
+            value = None
+            if plugin.consumes is None or kind in plugin.consumes:
+                try:
+                    value = plugin.map(record)
+                except Exception as e:
+                    print(f"❌ Analytics plugin {plugin.name} failed on {record.name}: {e}")
+            cache.files[record.name] = [signature, value]
+            cache.changed = True
+
+    results = {}
+    for plugin in plugins:
+        cache = caches[plugin.name]
+        for name in [name for name in cache.files if name not in current]:
+            del cache.files[name]
+            cache.changed = True
+
+        digest = cache.inputs_digest()
+        if digest != cache.digest:
+            values = [cache.files[name][1] for name in sorted(cache.files) if cache.files[name][1] is not None]
+            try:
+                cache.result = plugin.reduce(values)
+            except Exception as e:
+                print(f"❌ Analytics plugin {plugin.name} failed: {e}")
+                continue
+            cache.digest = digest
+            cache.changed = True
+        # Mapped values can quote completions, a private backend keeps them in memory
+        if cache.changed and not source.private:
+            cache.save()
+        results[plugin.name] = cache.result
+    return results
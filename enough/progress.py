@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Per-exercise progress, an event log with periodic snapshots
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .vault import VaultError
+
+PROGRESS_DIR = "progress"
+# Event log next to each progress/<exercise_id>.json snapshot
+PROGRESS_LOG_EXTENSION = ".log"
+LEGACY_PROGRESS_FILE = "progress.json"
+
+
+def default_progress() -> Dict:
+    return {
+        "current_week": 1,
+        "current_day": 1,
+        "start_date": None,
+        "last_completed": None
+    }
+
+
+# Event kinds of the progress log
+STARTED = "started"
+STEM_COMPLETED = "stem_completed"
+ADVANCED = "advanced"
+RESET = "reset"
+# Merged with another copy of the journal by sync, the event holds the state agreed on
+SYNCED = "synced"
+EVENT_KINDS = (STARTED, STEM_COMPLETED, ADVANCED, RESET, SYNCED)
+# A snapshot is written after this many events, loading replays at most this many
+SNAPSHOT_EVERY = 32
+
+
+def read_progress_file(path: str) -> Optional[Dict]:
+    """Progress saved at path, None if there is no file"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_progress_file(path: str, progress: Dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(progress, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+
+def apply_event(progress: Dict, event: Dict) -> Dict:
+    """State after one event, the snapshot plus every later event gives the current state"""
+    kind = event.get("type")
+    if kind == STARTED:
+        progress["start_date"] = event["start_date"]
+        progress["start_week"] = event["start_week"]
+        progress["current_week"] = event["start_week"]
+        progress["current_day"] = 1
+    elif kind == STEM_COMPLETED:
+        progress["last_completed"] = event["date"]
+    elif kind == ADVANCED:
+        progress["current_week"] = event["week"]
+        progress["current_day"] = event["day"]
+    elif kind == RESET:
+        progress = default_progress()
+    elif kind == SYNCED:
+        progress = dict(event["state"])
+    progress["seq"] = event["seq"]
+    return progress
+
+
+def weeks_finished(events: List[Dict]) -> Dict[int, str]:
+    """Program week -> when the program moved past it, the latest run only"""
+    finished = {}
+    for event in events:
+        if event.get("type") in (STARTED, RESET):
+            finished = {}
+        elif event.get("type") == ADVANCED and event.get("from_week") and event["week"] > event["from_week"]:
+            for week in range(event["from_week"], event["week"]):
+                finished.setdefault(week, event["at"])
+    return finished
+
+
+class ProgressTracker:
+    """Progress of a single exercise as an append-only event log
+
+    Every change is one small event appended through the storage backend.
+    A compact snapshot of the state is saved every SNAPSHOT_EVERY events,
+    loading reads it and replays only the events after it.
+    """
+
+    def __init__(self, storage, exercise_id: str, now: Callable[[], datetime] = datetime.now):
+        self.storage = storage
+        self.exercise_id = exercise_id
+        self.now = now
+        self.progress = self.load_progress()
+
+    def load_progress(self) -> Dict:
+        try:
+            progress = self.storage.load_progress(self.exercise_id) or default_progress()
+            for event in self.storage.progress_events(self.exercise_id, progress.get("seq", 0)):
+                progress = apply_event(progress, event)
+            return progress
+        except VaultError:
+            # Starting fresh would write new events over the sealed log
+            raise
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Could not read progress of {self.exercise_id}, starting fresh (run enough fsck): {e}")
+        return default_progress()
+
+    @property
+    def seq(self) -> int:
+        return self.progress.get("seq", 0)
+
+    def record(self, kind: str, **fields):
+        event = {"seq": self.seq + 1, "type": kind, "at": self.now().isoformat(timespec="seconds")}
+        event.update(fields)
+        self.storage.append_progress_events(self.exercise_id, [event])
+        self.progress = apply_event(self.progress, event)
+        if self.seq % SNAPSHOT_EVERY == 0:
+            self.save_progress()
+
+    def save_progress(self):
+        """Write a snapshot of the current state"""
+        self.storage.save_progress(self.exercise_id, self.progress)
+
+    def start(self, start_date: str, start_week: int = 1):
+        self.record(STARTED, start_date=start_date, start_week=start_week)
+
+    def complete_stem(self, date: str, stem: Optional[str] = None):
+        if stem is None:
+            self.record(STEM_COMPLETED, date=date)
+        else:
+            self.record(STEM_COMPLETED, date=date, stem=stem)
+
+    def update_progress(self, week: int, day: int):
+        """Move the program to a week and day"""
+        self.record(ADVANCED, week=week, day=day, from_week=self.progress.get("current_week"))
+
+    def reset(self):
+        self.record(RESET)
+
+    def synced(self, state: Dict):
+        """Take over progress merged with another copy, under this log's own next seq"""
+        self.record(SYNCED, state={key: value for key, value in state.items() if key != "seq"})
+        self.save_progress()
+
+    def history(self) -> List[Dict]:
+        """Every event of this exercise, oldest first"""
+        return self.storage.progress_events(self.exercise_id)
+
+
+class ProgressStore:
+    """Progress of every exercise, one event log per exercise
+
+    A tracker is only read the first time its exercise is asked for, and
+    recording one exercise's progress never touches another one's.
+    """
+
+    def __init__(self, storage, legacy_file: Optional[str] = LEGACY_PROGRESS_FILE,
+                 now: Callable[[], datetime] = datetime.now):
+        self.storage = storage
+        self.legacy_file = legacy_file
+        self.now = now
+        self._trackers: Dict[str, ProgressTracker] = {}
+
+    def get(self, exercise_id: str) -> ProgressTracker:
+        tracker = self._trackers.get(exercise_id)
+        if tracker is None:
+            tracker = self._trackers[exercise_id] = ProgressTracker(self.storage, exercise_id, self.now)
+        return tracker
+
+    def exercise_ids(self) -> List[str]:
+        """Exercises with saved progress"""
+        return self.storage.progress_ids()
+
+    def snapshot(self):
+        """Bring every saved snapshot up to date, so they hold the whole state"""
+        for exercise_id in self.exercise_ids():
+            tracker = self.get(exercise_id)
+            if (self.storage.load_progress(exercise_id) or {}).get("seq", 0) != tracker.seq:
+                tracker.save_progress()
+
+    def migrate(self, program_id: str) -> bool:
+        """Move a single global progress.json over to the program it belonged to"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return False
+        try:
+            if self.storage.load_progress(program_id) is not None:
+                return False
+            legacy = read_progress_file(self.legacy_file)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not read {self.legacy_file}, leaving it in place (run enough fsck): {e}")
+            return False
+
+        tracker = self.get(program_id)
+        tracker.progress = dict(legacy or default_progress(), seq=tracker.seq)
+        tracker.save_progress()
+        # Keep the old file around instead of deleting anyone's history
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        return True
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Date-range queries over stored days, as rows or aggregated per week or month
+"""
+
+import json
+import fnmatch
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .aggregate import date_key
+from .models import DaySubmission
+from .storage import Storage
+
+PERIODS = ("week", "month")
+AGGREGATES = ("count", "duration")
+
+
+class DateIndex:
+    """Day names sorted by date, a range is two bisections instead of a scan"""
+
+    def __init__(self, names: List[str]):
+        dated = sorted((key, name) for key, name in ((date_key(name)[0], name) for name in names) if key)
+        self.keys = [key for key, _ in dated]
+        self.names = [name for _, name in dated]
+
+    def between(self, start: Optional[date] = None, end: Optional[date] = None) -> List[str]:
+        """Names of days from start to end, both included, open ended when None"""
+        low = bisect_left(self.keys, start.strftime("%y%m%d")) if start else 0
+        high = bisect_right(self.keys, end.strftime("%y%m%d")) if end else len(self.keys)
+        return self.names[low:high]
+
+    def on(self, day: date) -> List[str]:
+        return self.between(day, day)
+
+
+@dataclass
+class QueryFilter:
+    __slots__ = ("start", "end", "exercise", "stem", "week")
+    start: Optional[date]
+    end: Optional[date]
+    exercise: Optional[str]
+    stem: Optional[str]
+    week: Optional[int]
+
+    def stem_matches(self, stem: str) -> bool:
+        if not self.stem:
+            return True
+        pattern = self.stem.lower()
+        if not any(char in pattern for char in "*?["):
+            return pattern in stem.lower()
+        return fnmatch.fnmatchcase(stem.lower(), pattern)
+
+
+@dataclass
+class QueryDay:
+    __slots__ = ("name", "date", "day", "stems")
+    name: str
+    date: date
+    day: DaySubmission
+    # Stems that passed the stem filter, in the order they were written
+    stems: List[str]
+
+
+def _exercise_of(name: str) -> str:
+    return name.rsplit('_', 1)[0]
+
+
+def find_days(storage: Storage, query: QueryFilter,
+              on_error: Optional[Callable[[str, Exception], None]] = None) -> Iterator[QueryDay]:
+    """Matching days in date order, only days inside the range are read"""
+    index = DateIndex(storage.names())
+    for name in index.between(query.start, query.end):
+        if query.exercise and _exercise_of(name) != query.exercise:
+            continue
+        try:
+            day = storage.read(name)
+        except Exception as e:
+            if on_error:
+                on_error(name, e)
+            continue
+        if day is None or (query.week is not None and day.week != query.week):
+            continue
+        stems = [stem for stem in day.submissions if query.stem_matches(stem)]
+        if query.stem and not stems:
+            continue
+        yield QueryDay(name, datetime.strptime(date_key(name)[0], "%y%m%d").date(), day, stems)
+
+
+def period_of(day: date, per: str) -> str:
+    """ISO week (2025-W02) or month (2025-01) a day belongs to"""
+    if per == "week":
+        return day.strftime("%G-W%V")
+    return day.strftime("%Y-%m")
+
+
+def aggregate_days(days: Iterator[QueryDay], per: str) -> List[Dict]:
+    """Sessions, stems, completions and minutes per week or month, oldest first"""
+    periods: Dict[str, Dict] = {}
+    for found in days:
+        key = period_of(found.date, per)
+        row = periods.get(key)
+        if row is None:
+            row = periods[key] = {per: key, "sessions": 0, "stems": 0, "completions": 0, "minutes": 0.0}
+        row["sessions"] += 1
+        row["stems"] += len(found.stems)
+        row["completions"] += sum(len(found.day.submissions[stem]) for stem in found.stems)
+        if found.day.session:
+            row["minutes"] += found.day.session.duration_minutes
+    return [periods[key] for key in sorted(periods)]
+
+
+def day_document(found: QueryDay) -> Dict:
+    session = found.day.session
+    return {
+        "date": found.date.isoformat(),
+        "exercise": found.day.journal or _exercise_of(found.name),
+        "week": found.day.week,
+        "day": found.day.day,
+        "session": session.to_dict() if session else None,
+        "completions": [{"stem": stem, "number": number, "text": str(text)}
+                        for stem in found.stems for number, text in enumerate(found.day.submissions[stem], 1)],
+    }
+
+
+def format_days(days: Iterator[QueryDay], fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps([day_document(found) for found in days], indent=2, ensure_ascii=False)
+
+    lines = []
+    for found in days:
+        session = found.day.session
+        duration = f" - {session.duration_minutes:.1f} mins" if session else ""
+        lines.append(f"{found.date.isoformat()}  {found.day.journal or _exercise_of(found.name)}  "
+                     f"Week {found.day.week} | Day {found.day.day}{duration}")
+        for stem in found.stems:
+            lines.append(f"  {stem}")
+            for number, text in enumerate(found.day.submissions[stem], 1):
+                lines.append(f"    {number}. {text}")
+    return "\n".join(lines)
+
+
+def format_aggregate(rows: List[Dict], per: str, mode: str, fmt: str) -> str:
+    columns = [per, "sessions", "stems", "completions"] if mode == "count" else [per, "sessions", "minutes"]
+    rows = [{column: row[column] for column in columns} for row in rows]
+    if fmt == "json":
+        return json.dumps(rows, indent=2)
+
+    widths = [max([len(column)] + [len(_cell(row[column])) for row in rows]) for column in columns]
+    lines = ["  ".join(column.upper().ljust(width) for column, width in zip(columns, widths))]
+    for row in rows:
+        lines.append("  ".join(_cell(row[column]).rjust(width) if i else _cell(row[column]).ljust(width)
+                               for i, (column, width) in enumerate(zip(columns, widths))))
+    return "\n".join(lines)
+
+
+def _cell(value) -> str:
+    return f"{value:.1f}" if isinstance(value, float) else str(value)
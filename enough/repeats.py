@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Near-duplicate completions through MinHash signatures and LSH buckets
+"""
+
+import os
+import re
+import json
+import zlib
+import random
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import eq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import DaySubmission
+from .storage import Storage
+
+REPEATS_META_FILE = ".repeats.json"
+REPEATS_DATA_FILE = ".repeats.bin"
+REPEATS_VERSION = 1
+
+# 8 bands of 4 rows put the LSH threshold near a Jaccard similarity of 0.6
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.6
+# One or two word answers repeat by nature and are not worth pointing out
+MIN_WORDS = 3
+
+# Multiply-shift hashing: the top 32 bits of (a * x + b) mod 2**64, one (a, b) per permutation
+_MASK = (1 << 64) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def shingles(text: str) -> List[int]:
+    """Hashed words and word pairs, short completions make character n-grams too noisy"""
+    words = normalize(text)
+    if len(words) < MIN_WORDS:
+        return []
+    grams = set(words)
+    grams.update(f"{left} {right}" for left, right in zip(words, words[1:]))
+    return [zlib.crc32(gram.encode()) for gram in grams]
+
+
+# Words and word pairs recur across answers, each is permuted once
+@lru_cache(maxsize=65536)
+def _permuted(x: int) -> Tuple[int, ...]:
+    return tuple((a * x + b) & _MASK for a, b in _PERMUTATIONS)
+
+
+# A session hashes the same answers again when comparing and when re-indexing its day file
+@lru_cache(maxsize=4096)
+def minhash(text: str) -> Optional[Tuple[int, ...]]:
+    """NUM_PERM 32-bit minimums, None for text with nothing to compare"""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    return tuple(min(column) >> 32 for column in zip(*map(_permuted, hashes)))
+
+
+def similarity(left, right) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(map(eq, left, right)) / NUM_PERM
+
+
+def band_keys(signature) -> List[int]:
+    """One bucket key per band, completions sharing any key are candidates"""
+    return [hash((band,) + tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+@dataclass
+class Match:
+    __slots__ = ("similarity", "date", "exercise", "stem", "text")
+    similarity: float
+    date: str
+    exercise: str
+    stem: str
+    text: str
+
+
+class RepeatIndex:
+    """MinHash signature of every completion, bucketed by band for LSH lookups
+
+    Entries remember the day file they came from. A refresh only reads
+    files that are new or changed, dropping their old entries first.
+    """
+
+    def __init__(self, directory: str):
+        self.meta_path = os.path.join(directory, REPEATS_META_FILE)
+        self.data_path = os.path.join(directory, REPEATS_DATA_FILE)
+        self.files: Dict[str, str] = {}
+        # [day file, date, exercise, stem, text], None once the file changed
+        self.entries: List[Optional[list]] = []
+        self.signatures = array('I')
+        # Band keys are stored too so loading does not hash every signature again
+        self.bands = array('q')
+        self.by_file: Dict[str, List[int]] = {}
+        self.buckets: Dict[int, List[int]] = {}
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.entries) - self.dead
+
+    @classmethod
+    def load(cls, directory: str) -> "RepeatIndex":
+        index = cls(directory)
+        try:
+            with open(index.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get("version") != REPEATS_VERSION:
+                return index
+            rows = len(meta["entries"])
+            with open(index.data_path, 'rb') as f:
+                index.signatures.fromfile(f, rows * NUM_PERM)
+                index.bands.fromfile(f, rows * BANDS)
+        except (OSError, ValueError, KeyError, EOFError):
+            return cls(directory)
+        index.files = meta["files"]
+        index.entries = meta["entries"]
+        buckets, by_file, bands = index.buckets, index.by_file, index.bands
+        for row, entry in enumerate(index.entries):
+            by_file.setdefault(entry[0], []).append(row)
+            for key in bands[row * BANDS:(row + 1) * BANDS]:
+                buckets.setdefault(key, []).append(row)
+        return index
+
+    def save(self):
+        if self.dead:
+            self._compact()
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        tmp_path = self.data_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            self.signatures.tofile(f)
+            self.bands.tofile(f)
+        os.replace(tmp_path, self.data_path)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": REPEATS_VERSION, "files": self.files, "entries": self.entries},
+                               separators=(',', ':')))
+        os.replace(tmp_path, self.meta_path)
+
+    def _add(self, entry: list, signature, keys=None):
+        row = len(self.entries)
+        keys = keys or band_keys(signature)
+        self.entries.append(entry)
+        self.signatures.extend(signature)
+        self.bands.extend(keys)
+        self.by_file.setdefault(entry[0], []).append(row)
+        for key in keys:
+            self.buckets.setdefault(key, []).append(row)
+
+    def _drop_file(self, name: str):
+        for row in self.by_file.pop(name, []):
+            self.entries[row] = None
+            self.dead += 1
+
+    def _compact(self):
+        entries, signatures, bands = self.entries, self.signatures, self.bands
+        self.entries, self.signatures, self.bands = [], array('I'), array('q')
+        self.by_file, self.buckets, self.dead = {}, {}, 0
+        for row, entry in enumerate(entries):
+            if entry is not None:
+                self._add(entry, signatures[row * NUM_PERM:(row + 1) * NUM_PERM], bands[row * BANDS:(row + 1) * BANDS])
+
+    def record(self, name: str, day: Optional[DaySubmission], signature: str):
+        """Replace what the index knows about one day file"""
+        self._drop_file(name)
+        self.files[name] = signature
+        if day is None:
+            return
+        for stem, completions in day.submissions.items():
+            for completion in completions:
+                text = str(completion)
+                hashed = minhash(text)
+                if hashed:
+                    self._add([name, day.date, day.journal, stem, text], hashed)
+
+    def refresh(self, source: Storage, names: Optional[Iterable[str]] = None) -> int:
+        """Index new and changed day files, returns how many were read
+
+        With names only those files are checked, the rest are assumed current.
+        """
+        if names is None:
+            current = {name: source.signature(name) for name in source.names()}
+            gone = [name for name in self.files if name not in current]
+        else:
+            current = {}
+            for name in names:
+                try:
+                    current[name] = source.signature(name)
+                except Exception:
+                    # Neither loose nor packed any more
+                    pass
+            gone = [name for name in names if name in self.files and name not in current]
+        read = 0
+        for name in gone:
+            self._drop_file(name)
+            del self.files[name]
+
+        for name, signature in current.items():
+            if self.files.get(name) == signature:
+                continue
+            read += 1
+            try:
+                day = source.read(name)
+            except Exception:
+                day = None
+            self.record(name, day, signature)
+
+        # Keep tombstones from piling up in long sessions
+        if self.dead > len(self.entries) // 4:
+            self._compact()
+        return read
+
+    def candidates(self, signature) -> set:
+        rows = set()
+        for key in band_keys(signature):
+            rows.update(self.buckets.get(key, ()))
+        return rows
+
+    def matches(self, text: str, stem: Optional[str] = None, threshold: float = THRESHOLD,
+                limit: int = 3) -> List[Match]:
+        """Earlier completions similar to text, those under the same stem first"""
+        signature = minhash(text)
+        if not signature:
+            return []
+        found = []
+        for row in self.candidates(signature):
+            entry = self.entries[row]
+            if entry is None:
+                continue
+            score = similarity(signature, self.signatures[row * NUM_PERM:(row + 1) * NUM_PERM])
+            if score >= threshold:
+                found.append(Match(score, entry[1], entry[2], entry[3], entry[4]))
+        found.sort(key=lambda match: (match.stem != stem, -match.similarity, match.date))
+        return found[:limit]
+
+    def clusters(self, threshold: float = THRESHOLD) -> List[List[int]]:
+        """Groups of rows that are near-duplicates of each other, largest first"""
+        parent = list(range(len(self.entries)))
+
+        def find(row: int) -> int:
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        for rows in self.buckets.values():
+            live = [row for row in rows if self.entries[row] is not None]
+            for i, left in enumerate(live):
+                left_signature = self.signatures[left * NUM_PERM:(left + 1) * NUM_PERM]
+                for right in live[i + 1:]:
+                    if find(left) == find(right):
+                        continue
+                    if similarity(left_signature, self.signatures[right * NUM_PERM:(right + 1) * NUM_PERM]) >= threshold:
+                        parent[find(right)] = find(left)
+
+        groups: Dict[int, List[int]] = {}
+        for row, entry in enumerate(self.entries):
+            if entry is not None:
+                groups.setdefault(find(row), []).append(row)
+        return sorted((rows for rows in groups.values() if len(rows) > 1), key=lambda rows: (-len(rows), rows[0]))
+
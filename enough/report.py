@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Markdown and HTML reports of program weeks and calendar months
+"""
+
+import os
+import html
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from .aggregate import date_key
+from .jsonio import read_json, write_json
+from .models import REFLECTION_STEMS
+from .storage import Storage, open_storage
+
+REPORTS_DIR = "reports"
+REPORT_STATE_FILE = ".reports.json"
+# Bump when the templates change so every report is rendered again
+TEMPLATE_VERSION = 1
+
+FORMATS = {"markdown": ".md", "html": ".html"}
+
+# Compiled once at import, every worker process reuses them for all its reports
+TEMPLATES = {
+    "markdown": {
+        "page": Template("# $title\n\n$summary\n$days"),
+        "summary": Template("- Sessions: $sessions\n- Stems: $stems\n- Completions: $completions\n"
+                            "- Time spent: $time_spent\n- Average session: $average mins\n"),
+        "day": Template("\n## $date ($weekday) - $exercise\n\nWeek $week | Day $day - $duration mins\n$stems"),
+        "stem": Template("\n### $stem\n\n$completions"),
+        "reflection": Template("\n### Reflection: $stem\n\n$completions"),
+        "completion": Template("$number. $text\n"),
+    },
+    "html": {
+        "page": Template("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>$title</title>\n</head>\n"
+                         "<body>\n<h1>$title</h1>\n$summary$days</body>\n</html>\n"),
+        "summary": Template("<ul>\n<li>Sessions: $sessions</li>\n<li>Stems: $stems</li>\n"
+                            "<li>Completions: $completions</li>\n<li>Time spent: $time_spent</li>\n"
+                            "<li>Average session: $average mins</li>\n</ul>\n"),
+        "day": Template("<h2>$date ($weekday) - $exercise</h2>\n<p>Week $week | Day $day - $duration mins</p>\n$stems"),
+        "stem": Template("<h3>$stem</h3>\n<ol>\n$completions</ol>\n"),
+        "reflection": Template("<h3>Reflection: $stem</h3>\n<ol>\n$completions</ol>\n"),
+        "completion": Template("<li>$text</li>\n"),
+    },
+}
+
+
+@dataclass
+class ReportJob:
+    __slots__ = ("title", "names", "output", "format", "exercise_names")
+    title: str
+    names: List[str]
+    output: str
+    format: str
+    exercise_names: Dict[str, str]
+
+
+def format_time_spent(minutes: float) -> str:
+    hours = int(minutes // 60)
+    rest = int(minutes % 60)
+    return f"{hours} hrs {rest} mins" if hours > 0 else f"{rest} mins"
+
+
+def render(job: ReportJob, source: Storage) -> str:
+    """Render one report from its day files"""
+    templates = TEMPLATES[job.format]
+    escape = html.escape if job.format == "html" else str
+
+    sessions = stems = completions = 0
+    minutes = 0.0
+    days = []
+    for name in job.names:
+        try:
+            day = source.read(name)
+        except Exception as e:
+            print(f"❌ Skipping {name} in {job.title}: {e}")
+            continue
+        if day is None:
+            continue
+
+        duration = day.session.duration_minutes if day.session else 0.0
+        sessions += 1
+        minutes += duration
+        rendered_stems = []
+        for stem, answers in day.submissions.items():
+            stems += 1
+            completions += len(answers)
+            items = "".join(templates["completion"].substitute(number=i, text=escape(str(answer)))
+                            for i, answer in enumerate(answers, 1))
+            kind = "reflection" if stem in REFLECTION_STEMS else "stem"
+            rendered_stems.append(templates[kind].substitute(stem=escape(stem), completions=items))
+
+        try:
+            date = datetime.strptime(day.date, "%Y%m%d")
+            date_text, weekday = date.strftime("%Y-%m-%d"), date.strftime("%A")
+        except ValueError:
+            date_text, weekday = day.date, ""
+        days.append(templates["day"].substitute(
+            date=date_text, weekday=weekday,
+            exercise=escape(job.exercise_names.get(day.journal, day.journal)),
+            week=day.week, day=day.day, duration=f"{duration:.1f}",
+            stems="".join(rendered_stems)
+        ))
+
+    summary = templates["summary"].substitute(
+        sessions=sessions, stems=stems, completions=completions,
+        time_spent=format_time_spent(minutes),
+        average=f"{minutes / sessions:.1f}" if sessions else "0.0"
+    )
+    return templates["page"].substitute(title=escape(job.title), summary=summary, days="".join(days))
+
+
+# One reader per worker process, opened when the worker starts
+_worker_source: Optional[Storage] = None
+
+
+def _init_worker(root: str):
+    global _worker_source
+    _worker_source = open_storage(root)
+
+
+def _write_report(job: ReportJob, source: Storage) -> str:
+    tmp_path = job.output + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.write(render(job, source))
+    os.replace(tmp_path, job.output)
+    return job.output
+
+
+def _render_in_worker(job: ReportJob) -> str:
+    return _write_report(job, _worker_source)
+
+
+class ReportPlan:
+    """Which day files belong to which report, indexed once per run"""
+
+    def __init__(self, source: Storage, program_ids: List[str], state: Dict):
+        self.source = source
+        self.program_prefixes = tuple(f"{program_id}_" for program_id in program_ids)
+        self.signatures: Dict[str, str] = {}
+        # name -> [signature, program week or None], reused while the file is unchanged
+        known = state.get("files", {})
+        self.files: Dict[str, list] = {}
+        for name in source.names():
+            signature = source.signature(name)
+            self.signatures[name] = signature
+            entry = known.get(name)
+            if entry and entry[0] == signature:
+                self.files[name] = entry
+            else:
+                self.files[name] = [signature, self._program_week(name)]
+
+    def _program_week(self, name: str) -> Optional[int]:
+        if not name.startswith(self.program_prefixes):
+            return None
+        try:
+            day = self.source.summary(name)
+        except Exception:
+            return None
+        return day.week if day else None
+
+    def week(self, number: int) -> List[str]:
+        return [name for name, entry in self.files.items() if entry[1] == number]
+
+    def month(self, year: int, month: int) -> List[str]:
+        datelike = f"{year % 100:02d}{month:02d}"
+        return [name for name in self.files if date_key(name)[0][:4] == datelike]
+
+    def weeks(self) -> List[int]:
+        return sorted(set(entry[1] for entry in self.files.values() if entry[1] is not None))
+
+    def months(self) -> List[Tuple[int, int]]:
+        months = set()
+        for name in self.files:
+            datelike = date_key(name)[0]
+            if datelike:
+                months.add((2000 + int(datelike[:2]), int(datelike[2:4])))
+        return sorted(months)
+
+    def digest(self, job: ReportJob) -> str:
+        """Identity of a report's inputs, unchanged inputs mean an unchanged report"""
+        content = hashlib.sha256(f"{TEMPLATE_VERSION}:{job.format}:{job.title}".encode())
+        for name in job.names:
+            content.update(f"\0{name}\0{self.signatures[name]}".encode())
+        for exercise_id, name in sorted(job.exercise_names.items()):
+            content.update(f"\0{exercise_id}={name}".encode())
+        return content.hexdigest()
+
+
+class ReportResult:
+    def __init__(self):
+        self.written: List[str] = []
+        self.unchanged: List[str] = []
+
+
+def build_reports(root: str, selection: Dict, exercise_names: Dict[str, str], program_ids: List[str],
+                  fmt: str = "markdown", output_dir: Optional[str] = None, jobs: Optional[int] = None,
+                  force: bool = False) -> ReportResult:
+    """Render the selected reports, skipping those whose day files did not change
+
+    selection is {"week": N}, {"month": (year, month)} or {"all": True}.
+    """
+    output_dir = output_dir or os.path.join(root, REPORTS_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, REPORT_STATE_FILE)
+    state = read_json(state_path)
+    extension = FORMATS[fmt]
+
+    source = open_storage(root)
+    try:
+        plan = ReportPlan(source, program_ids, state)
+
+        weeks = plan.weeks() if selection.get("all") else ([selection["week"]] if "week" in selection else [])
+        months = plan.months() if selection.get("all") else ([selection["month"]] if "month" in selection else [])
+        candidates = []
+        for number in weeks:
+            candidates.append(ReportJob(f"Week {number}", plan.week(number),
+                                        os.path.join(output_dir, f"week-{number:02d}{extension}"), fmt, exercise_names))
+        for year, month in months:
+            candidates.append(ReportJob(f"{datetime(year, month, 1).strftime('%B %Y')}", plan.month(year, month),
+                                        os.path.join(output_dir, f"{year}-{month:02d}{extension}"), fmt, exercise_names))
+
+        candidates = [job for job in candidates if job.names]
+
+        result = ReportResult()
+        rendered = state.get("reports", {})
+        pending = []
+        for job in candidates:
+            digest = plan.digest(job)
+            key = os.path.basename(job.output)
+            if not force and rendered.get(key) == digest and os.path.exists(job.output):
+                result.unchanged.append(job.output)
+            else:
+                pending.append((job, key, digest))
+
+        workers = jobs or os.cpu_count() or 1
+        # Workers open the storage themselves, an encrypted journal would ask each one for the passphrase
+        if workers > 1 and len(pending) > 1 and not source.private:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker,
+                                     initargs=(root,)) as pool:
+                outputs = list(pool.map(_render_in_worker, [job for job, _, _ in pending]))
+        else:
+            outputs = [_write_report(job, source) for job, _, _ in pending]
+
+        for (job, key, digest), output in zip(pending, outputs):
+            rendered[key] = digest
+            result.written.append(output)
+
+        state["files"] = plan.files
+        state["reports"] = rendered
+        write_json(state_path, state)
+    finally:
+        source.close()
+    return result
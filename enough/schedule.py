@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Precomputed date -> program position table
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+
+from .models import Exercise
+
+STEM = "stem"
+REFLECTION = "reflection"
+REST = "rest"
+
+
+@dataclass
+class ScheduleEntry:
+    __slots__ = ("date", "week", "day", "stem", "kind")
+    date: date
+    week: int
+    day: int
+    stem: Optional[str]
+    kind: str
+
+
+class Schedule:
+    """Every day of a program run, from its start date to its last week
+
+    Weeks run Monday to Sunday and the program's schedule pattern decides
+    what each weekday is for. Stem days take the week's stems in order.
+    """
+
+    def __init__(self, exercise: Exercise, start: date, start_week: int = 1):
+        self.exercise = exercise
+        self.start = start
+        self.start_week = start_week
+        self.entries: List[ScheduleEntry] = []
+        self._ordinals: List[int] = []
+        self._compile()
+
+    def _compile(self):
+        monday = self.start - timedelta(days=self.start.weekday())
+        weeks = sorted(number for number in self.exercise.weeks if number >= self.start_week)
+        for offset, number in enumerate(weeks):
+            stems = self.exercise.weeks[number].stems
+            stem_days = 0
+            for weekday, kind in enumerate(self.exercise.pattern):
+                day = monday + timedelta(days=offset * 7 + weekday)
+                stem = None
+                if kind == STEM:
+                    stem = stems[stem_days % len(stems)]
+                    stem_days += 1
+                if day < self.start:
+                    continue
+                self.entries.append(ScheduleEntry(day, number, weekday + 1, stem, kind))
+                self._ordinals.append(day.toordinal())
+
+    @property
+    def end(self) -> Optional[date]:
+        return self.entries[-1].date if self.entries else None
+
+    def at(self, day: date) -> Optional[ScheduleEntry]:
+        """What the program asks for on a given date, None outside the run"""
+        ordinal = day.toordinal()
+        index = bisect_right(self._ordinals, ordinal) - 1
+        if index < 0 or self._ordinals[index] != ordinal:
+            return None
+        return self.entries[index]
+
+    def week_start(self, day: date) -> date:
+        return day - timedelta(days=day.weekday())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Replays a whole program against a temporary directory with a simulated clock
+"""
+
+import io
+import os
+import re
+import json
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from .console import Clock, Console
+from .journaler import Journaler
+from .storage import BACKENDS, STORAGE_FILE
+
+_COMPLETION_PROMPT = re.compile(r"^(\d+)\. $")
+OPEN_AT = datetime.min.time().replace(hour=7, minute=30)
+
+
+class SimulatedClock(Clock):
+    """A clock that only moves when someone sleeps or types"""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self) -> datetime:
+        return self.current
+
+    def sleep(self, seconds: float):
+        self.current += timedelta(seconds=seconds)
+
+
+class ScriptedConsole(Console):
+    """Answers every prompt the way a practising user would
+
+    The journal is left open at the menu overnight: every time the menu
+    asks for a choice the clock moves to 07:30 of the next planned day and
+    the program is opened again. On an interrupted day the user walks away
+    after a few completions, leaving a draft for the next launch.
+    """
+
+    def __init__(self, clock: SimulatedClock, program_choice: str, days: Iterator[Tuple[date, bool]],
+                 typing_seconds: float = 20.0, interrupt_after: int = 3):
+        self.clock = clock
+        self.program_choice = program_choice
+        self.days = days
+        self.typing_seconds = typing_seconds
+        self.interrupt_after = interrupt_after
+        self.interrupting = False
+        self.interrupted = False
+        self.finished = False
+        self.typed = 0
+
+    def input(self, prompt: str = "") -> str:
+        self.clock.sleep(self.typing_seconds)
+        if prompt == "Enter your choice: ":
+            day = next(self.days, None)
+            if day is None:
+                self.finished = True
+                raise KeyboardInterrupt
+            self.clock.current = datetime.combine(day[0], OPEN_AT)
+            self.interrupting = day[1]
+            self.typed = 0
+            return self.program_choice
+        if prompt.startswith("Enter your choice (1-3)"):
+            return "1"
+        if prompt.startswith("Resume this draft?"):
+            return "y"
+        if prompt.startswith("Show your earlier answers"):
+            return "n"
+        if prompt.startswith("Press Enter"):
+            return ""
+
+        match = _COMPLETION_PROMPT.match(prompt)
+        if match:
+            if int(match.group(1)) > 6:
+                return "submit"
+            if self.interrupting and self.typed >= self.interrupt_after:
+                self.interrupting = False
+                self.interrupted = True
+                raise KeyboardInterrupt
+            self.typed += 1
+            return f"on {self.clock.now():%A %d %B} I noticed thing number {self.typed}"
+        raise RuntimeError(f"simulated user does not know how to answer {prompt!r}")
+
+    def clear(self):
+        pass
+
+
+class SimulationResult:
+    def __init__(self):
+        self.days = 0
+        self.launches = 0
+        self.skipped = 0
+        self.resumed = 0
+        self.day_files = 0
+        self.streak = 0
+        self.progress = {}
+        self.elapsed = 0.0
+
+
+def plan_days(start: date, weeks: int, skip_rate: float, resume_rate: float, seed: int,
+              result: SimulationResult) -> Iterator[Tuple[date, bool]]:
+    """(day, interrupted) for every day the user shows up"""
+    rng = random.Random(seed)
+    for offset in range(weeks * 7):
+        result.days += 1
+        if rng.random() < skip_rate:
+            result.skipped += 1
+            continue
+        interrupted = rng.random() < resume_rate
+        if interrupted:
+            result.resumed += 1
+        yield start + timedelta(days=offset), interrupted
+
+
+def simulate(journals_dir: Optional[str] = None, weeks: int = 30, start: date = date(2025, 1, 6),
+             skip_rate: float = 0.1, resume_rate: float = 0.05, seed: int = 1,
+             backend: Optional[str] = None) -> SimulationResult:
+    """Live through `weeks` of practice in a temporary directory
+
+    The journal stays open from day to day like a terminal left running.
+    An interrupted session ends the process, and the next launch at
+    noon resumes the draft before carrying on.
+    """
+    result = SimulationResult()
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as root:
+        if journals_dir:
+            shutil.copytree(journals_dir, os.path.join(root, "journals"))
+        if backend:
+            with open(os.path.join(root, STORAGE_FILE), 'w') as f:
+                json.dump({"backend": backend}, f)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            clock = SimulatedClock(datetime.combine(start, OPEN_AT))
+            journaler = Journaler(clock, Console(), root)
+            journaler.close()
+            if not journaler.catalog.program:
+                raise ValueError(f"no branden program in {journals_dir or 'the bundled journals'}")
+            program_choice = str(journaler.exercises.index(journaler.catalog.program) + 1)
+            console = ScriptedConsole(clock, program_choice,
+                                      plan_days(start, weeks, skip_rate, resume_rate, seed, result))
+
+            while not console.finished:
+                journaler = Journaler(clock, console, root)
+                try:
+                    journaler.main()
+                    if console.finished:
+                        # Read while the storage is still open
+                        journaler.pipeline.drain()
+                        result.day_files = len(journaler.day_files())
+                        result.streak = journaler.calculate_streak()
+                        result.progress = dict(journaler.tracker(journaler.catalog.program.id).progress)
+                finally:
+                    journaler.close()
+                result.launches += 1
+                if console.interrupted:
+                    console.interrupted = False
+                    clock.current = clock.current.replace(hour=12, minute=0)
+                # Nothing but the last screen is worth keeping
+                output.seek(0)
+                output.truncate()
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m enough.simulate",
+                                     description="Replay a whole program against a temporary directory")
+    parser.add_argument("--journals", help="journal definitions to add to the bundled ones")
+    parser.add_argument("--weeks", type=int, default=30, help="weeks to simulate (default: 30)")
+    parser.add_argument("--start", default="2025-01-06", help="first simulated day (YYYY-MM-DD)")
+    parser.add_argument("--skip-rate", type=float, default=0.1, help="chance of skipping a day")
+    parser.add_argument("--resume-rate", type=float, default=0.05, help="chance of an interrupted session")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="storage backend (default: yaml)")
+    args = parser.parse_args(argv)
+
+    result = simulate(args.journals, args.weeks, datetime.strptime(args.start, "%Y-%m-%d").date(),
+                      args.skip_rate, args.resume_rate, args.seed, args.backend)
+    print(f"Simulated days:    {result.days} ({result.skipped} skipped, {result.resumed} resumed)")
+    print(f"Launches:          {result.launches}")
+    print(f"Day files:         {result.day_files}")
+    print(f"Longest streak:    {result.streak} weeks")
+    if result.progress:
+        print(f"Final position:    Week {result.progress.get('current_week')} | Day {result.progress.get('current_day')}")
+    print(f"Elapsed:           {result.elapsed:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
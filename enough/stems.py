@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Index of where every stem was answered, so its history reads only those days
+"""
+
+import os
+import re
+import json
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .models import DaySubmission
+from .storage import Storage
+
+STEMS_FILE = ".stems.json"
+STEMS_VERSION = 1
+
+_SPACES = re.compile(r"\s+")
+# "I am grateful for...", "I am grateful for…" and "i am grateful for" are one stem
+_TRAILING = re.compile(r"[\s.…:;,!?-]+$")
+
+
+def normalize_stem(stem: str) -> str:
+    return _TRAILING.sub("", _SPACES.sub(" ", stem.strip().lower()))
+
+
+def stem_key(stem: str) -> str:
+    return hashlib.blake2b(normalize_stem(stem).encode(), digest_size=8).hexdigest()
+
+
+@dataclass
+class StemAnswer:
+    __slots__ = ("name", "date", "exercise", "stem", "completions")
+    name: str
+    date: str
+    exercise: str
+    # The stem as it was written that day
+    stem: str
+    completions: List[str]
+
+
+class StemIndex:
+    """Normalized stem hash to the days that answered it
+
+    Each entry is [day file, date, exercise, stem as written, completions]
+    where completions is how many answers the day holds for the stem.
+    Day file signatures are kept so a refresh only reads what changed.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, STEMS_FILE)
+        self.files: Dict[str, str] = {}
+        self.stems: Dict[str, List[list]] = {}
+        # Stem keys each day file contributed to, rebuilt on load
+        self.by_file: Dict[str, List[str]] = {}
+
+    @classmethod
+    def load(cls, directory: str) -> "StemIndex":
+        index = cls(directory)
+        try:
+            with open(index.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") != STEMS_VERSION:
+                return index
+            index.files = data["files"]
+            index.stems = data["stems"]
+        except (OSError, ValueError, KeyError):
+            return cls(directory)
+        for key, entries in index.stems.items():
+            for entry in entries:
+                index.by_file.setdefault(entry[0], []).append(key)
+        return index
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": STEMS_VERSION, "files": self.files, "stems": self.stems},
+                               separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+    def _drop_file(self, name: str):
+        for key in set(self.by_file.pop(name, [])):
+            entries = [entry for entry in self.stems.get(key, []) if entry[0] != name]
+            if entries:
+                self.stems[key] = entries
+            else:
+                self.stems.pop(key, None)
+
+    def record(self, name: str, day: Optional[DaySubmission], signature: Optional[str] = None):
+        """Replace what the index knows about one day file"""
+        self._drop_file(name)
+        if signature is None:
+            self.files.pop(name, None)
+        else:
+            self.files[name] = signature
+        if day is None:
+            return
+        for stem, completions in day.submissions.items():
+            key = stem_key(stem)
+            self.stems.setdefault(key, []).append([name, day.date, day.journal, stem, len(completions)])
+            self.by_file.setdefault(name, []).append(key)
+
+    def refresh(self, source: Storage) -> int:
+        """Index new and changed day files, returns how many were read"""
+        current = {name: source.signature(name) for name in source.names()}
+        read = 0
+        for name in [name for name in self.files if name not in current]:
+            self.record(name, None)
+        for name, signature in current.items():
+            if self.files.get(name) == signature:
+                continue
+            read += 1
+            try:
+                day = source.read(name)
+            except Exception:
+                day = None
+            self.record(name, day, signature)
+        return read
+
+    def days(self, stem: str) -> List[list]:
+        """Entries for a stem, newest first"""
+        return sorted(self.stems.get(stem_key(stem), []), key=lambda entry: entry[1], reverse=True)
+
+    def history(self, source: Storage, stem: str, limit: Optional[int] = None,
+                exclude: Optional[str] = None) -> List[StemAnswer]:
+        """Earlier answers to a stem, newest first, reading only the days that have it"""
+        answers = []
+        for name, date, exercise, written, _ in self.days(stem):
+            if name == exclude:
+                continue
+            if limit is not None and len(answers) >= limit:
+                break
+            try:
+                day = source.read(name)
+            except Exception:
+                continue
+            completions = day.submissions.get(written) if day else None
+            if completions:
+                answers.append(StemAnswer(name, date, exercise, written, [str(text) for text in completions]))
+        return answers
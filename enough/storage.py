@@ -0,0 +1,833 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Storage backends for day submissions and progress, and conversion between them
+"""
+
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+import contextlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .aggregate import DaySource, date_key
+from .models import DaySubmission, DaySummary
+from .progress import PROGRESS_DIR, PROGRESS_LOG_EXTENSION, apply_event, read_progress_file, write_progress_file
+from .vault import VAULT_DIR, VAULT_FILE, Cipher, DraftCodec, VaultError, unlock
+
+STORAGE_FILE = "storage.json"
+SQLITE_FILE = "journal.db"
+JSONL_FILE = "journal.jsonl"
+DEFAULT_BACKEND = "yaml"
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def day_name(exercise_id: str, date_str: str) -> str:
+    """Name of the day for an exercise: exercisename_YYMMDD.yaml"""
+    # Convert YYYYMMDD to datelike format (e.g., 210431 for 2021-04-31)
+    try:
+        datelike = datetime.strptime(date_str, "%Y%m%d").strftime("%y%m%d")
+    except ValueError:
+        datelike = date_str  # Fallback to original format
+    return f"{exercise_id}_{datelike}.yaml"
+
+
+class Storage(ABC):
+    """Where day submissions and progress live
+
+    Days are addressed by their day file name whatever the backend, so
+    every cache keyed by name (timing, repeats, plugins, reports) works
+    unchanged. signature(name) changes whenever the day is rewritten.
+    """
+
+    backend = ""
+    # Private backends keep nothing readable on disk, the plaintext caches are not saved
+    private = False
+
+    @abstractmethod
+    def names(self) -> List[str]:
+        """Every stored day, in date order"""
+
+    @abstractmethod
+    def signature(self, name: str) -> str:
+        ...
+
+    @abstractmethod
+    def read(self, name: str) -> Optional[DaySubmission]:
+        ...
+
+    def summary(self, name: str) -> Optional[DaySummary]:
+        """Calendar and session fields of a day, backends with an index skip reading the day"""
+        day = self.read(name)
+        return DaySummary.of(day) if day else None
+
+    @abstractmethod
+    def write(self, name: str, day: DaySubmission):
+        ...
+
+    @abstractmethod
+    def delete(self, name: str):
+        ...
+
+    @abstractmethod
+    def progress_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        """Saved progress of an exercise, None if it has none"""
+
+    @abstractmethod
+    def save_progress(self, exercise_id: str, progress: Dict):
+        """Replace the progress snapshot of an exercise"""
+
+    @abstractmethod
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        """Logged progress events with a seq above after, in order"""
+
+    @abstractmethod
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        ...
+
+    @abstractmethod
+    def delete_progress(self, exercise_id: str):
+        """Drop the snapshot and the event log of an exercise"""
+
+    @contextlib.contextmanager
+    def bulk(self) -> Iterator["Storage"]:
+        """Group many writes, backends that can commit them together do"""
+        yield self
+
+    def draft_codec(self) -> Optional[DraftCodec]:
+        """How drafts of unsaved completions are sealed, None keeps them as plain JSON"""
+        return None
+
+    def close(self):
+        pass
+
+
+class YamlStorage(DaySource, Storage):
+    """One YAML file per day in submissions/, packed days in submissions.zip
+
+    This is the original layout, progress stays in progress/<exercise_id>.json.
+    """
+
+    backend = "yaml"
+
+    def __init__(self, root: str = ".", archive: bool = True):
+        DaySource.__init__(self, os.path.join(root, "submissions"),
+                           os.path.join(root, "submissions.zip") if archive else None)
+        self.progress_dir = os.path.join(root, PROGRESS_DIR)
+        # submissions/ is made by the first write, reading never creates it
+        self._created = False
+
+    def write(self, name: str, day: DaySubmission):
+        if not self._created:
+            os.makedirs(self.submissions_dir, exist_ok=True)
+            self._created = True
+        day.dump(os.path.join(self.submissions_dir, name))
+
+    def delete(self, name: str):
+        """Remove the loose file, packed copies stay in the archive"""
+        try:
+            os.remove(os.path.join(self.submissions_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _progress_path(self, exercise_id: str, extension: str) -> str:
+        return os.path.join(self.progress_dir, f"{exercise_id}{extension}")
+
+    def progress_ids(self) -> List[str]:
+        if not os.path.isdir(self.progress_dir):
+            return []
+        return sorted(set(os.path.splitext(f)[0] for f in os.listdir(self.progress_dir)
+                          if f.endswith((".json", PROGRESS_LOG_EXTENSION))))
+
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        return read_progress_file(self._progress_path(exercise_id, ".json"))
+
+    def save_progress(self, exercise_id: str, progress: Dict):
+        write_progress_file(self._progress_path(exercise_id, ".json"), progress)
+
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        events = []
+        try:
+            with open(self._progress_path(exercise_id, PROGRESS_LOG_EXTENSION), 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Cut short by a crash, the event never happened
+                        continue
+                    if event["seq"] > after:
+                        events.append(event)
+        except FileNotFoundError:
+            pass
+        return events
+
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        os.makedirs(self.progress_dir, exist_ok=True)
+        path = self._progress_path(exercise_id, PROGRESS_LOG_EXTENSION)
+        with open(path, 'a') as f:
+            if f.tell() and not _ends_with_newline(path):
+                f.write("\n")
+            f.write("".join(json.dumps(event, separators=(',', ':')) + "\n" for event in events))
+
+    def delete_progress(self, exercise_id: str):
+        for extension in (".json", PROGRESS_LOG_EXTENSION):
+            try:
+                os.remove(self._progress_path(exercise_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+class SqliteStorage(Storage):
+    """All days and progress in one SQLite database
+
+    Each day is a row holding its JSON document, so reading one day is
+    an indexed lookup instead of a file open, and listing is one query.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, root: str = "."):
+        self.path = os.path.join(root, SQLITE_FILE)
+        self._bulk = False
+        # Until the first write a journal without a database reads from an empty one in memory
+        self.created = os.path.exists(self.path)
+        self.db = self._connect(self.path if self.created else ":memory:")
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        # Callers from more than one thread go through SharedStorage, which serializes them
+        db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            # A commit per saved stem or progress event appends to the log instead of rewriting pages
+            db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS days ("
+                       "name TEXT PRIMARY KEY, updated INTEGER NOT NULL, data TEXT NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS progress (exercise TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS progress_events ("
+                       "exercise TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL, "
+                       "PRIMARY KEY (exercise, seq))")
+        return db
+
+    def _writer(self) -> sqlite3.Connection:
+        if not self.created:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.db.close()
+            self.db = self._connect(self.path)
+            self.created = True
+        return self.db
+
+    def _commit(self):
+        if not self._bulk:
+            self.db.commit()
+
+    def names(self) -> List[str]:
+        return sorted((row[0] for row in self.db.execute("SELECT name FROM days")), key=date_key)
+
+    def signature(self, name: str) -> str:
+        row = self.db.execute("SELECT updated, length(data) FROM days WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return f"sqlite:{row[0]}:{row[1]}"
+
+    def read(self, name: str) -> Optional[DaySubmission]:
+        row = self.db.execute("SELECT data FROM days WHERE name = ?", (name,)).fetchone()
+        return DaySubmission.from_dict(json.loads(row[0])) if row else None
+
+    def write(self, name: str, day: DaySubmission):
+        self._writer().execute("INSERT OR REPLACE INTO days (name, updated, data) VALUES (?, ?, ?)",
+                               (name, time.time_ns(), json.dumps(day.to_dict())))
+        self._commit()
+
+    def delete(self, name: str):
+        self._writer().execute("DELETE FROM days WHERE name = ?", (name,))
+        self._commit()
+
+    def progress_ids(self) -> List[str]:
+        return [row[0] for row in self.db.execute(
+            "SELECT exercise FROM progress UNION SELECT exercise FROM progress_events ORDER BY 1")]
+
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        row = self.db.execute("SELECT data FROM progress WHERE exercise = ?", (exercise_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_progress(self, exercise_id: str, progress: Dict):
+        self._writer().execute("INSERT OR REPLACE INTO progress (exercise, data) VALUES (?, ?)",
+                               (exercise_id, json.dumps(progress)))
+        self._commit()
+
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        return [json.loads(row[0]) for row in self.db.execute(
+            "SELECT data FROM progress_events WHERE exercise = ? AND seq > ? ORDER BY seq", (exercise_id, after))]
+
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        self._writer().executemany(
+            "INSERT OR REPLACE INTO progress_events (exercise, seq, data) VALUES (?, ?, ?)",
+            [(exercise_id, event["seq"], json.dumps(event)) for event in events])
+        self._commit()
+
+    def delete_progress(self, exercise_id: str):
+        self._writer().execute("DELETE FROM progress WHERE exercise = ?", (exercise_id,))
+        self.db.execute("DELETE FROM progress_events WHERE exercise = ?", (exercise_id,))
+        self._commit()
+
+    @contextlib.contextmanager
+    def bulk(self) -> Iterator["Storage"]:
+        self._bulk = True
+        try:
+            yield self
+            self.db.commit()
+        finally:
+            self._bulk = False
+
+    def close(self):
+        self.db.close()
+
+
+class JsonlStorage(Storage):
+    """An append-only log of JSON records, one per line
+
+    Writing a day appends its whole document, the latest record of a
+    name wins. Progress snapshots work the same way, progress events
+    are kept as they are. Opening reads the log once into name -> (offset, length),
+    after that every read is one seek. Superseded records are dropped by
+    rewriting the log once they outnumber the live ones. Opening only
+    reads, the log is repaired and rewritten before the first append.
+    """
+
+    backend = "jsonl"
+    # Do not bother rewriting small logs
+    COMPACT_MIN = 256
+
+    def __init__(self, root: str = "."):
+        self.path = os.path.join(root, JSONL_FILE)
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.progress: Dict[str, Dict] = {}
+        # Progress events are small and few, they are all kept in memory
+        self.events: Dict[str, List[Dict]] = {}
+        self.dead = 0
+        self.reader = None
+        # Where a line cut short by a crash starts, cut off before the next append
+        self.torn: Optional[int] = None
+        self._load()
+        # Opened by the first append, reading never creates or changes the log
+        self.log = None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    # A write cut short by a crash, the next append must start on a fresh line
+                    self.torn = offset
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    offset += length
+                    self.dead += 1
+                    continue
+                self._apply(record, offset, length)
+                offset += length
+
+    def _apply(self, record: Dict, offset: int, length: int):
+        if "event" in record:
+            self.events.setdefault(record["event"], []).append(record["data"])
+            return
+        if "progress" in record:
+            exercise_id = record["progress"]
+            if record.get("deleted"):
+                self.dead += 1 + (exercise_id in self.progress) + len(self.events.pop(exercise_id, []))
+                self.progress.pop(exercise_id, None)
+            else:
+                self.dead += exercise_id in self.progress
+                self.progress[exercise_id] = record["data"]
+            return
+        name = record["day"]
+        if name in self.index:
+            self.dead += 1
+        if record.get("deleted"):
+            self.index.pop(name, None)
+            self.dead += 1
+        else:
+            self.index[name] = (offset, length)
+
+    def _append(self, *records: Dict) -> Tuple[int, int]:
+        """Append records in one write, returns where the first one landed"""
+        lines = [(json.dumps(record, separators=(',', ':')) + "\n").encode("utf-8") for record in records]
+        if self.log is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self.torn is not None:
+                with open(self.path, 'rb+') as f:
+                    f.truncate(self.torn)
+                self.torn = None
+            if self.dead > max(self.COMPACT_MIN, len(self.index)):
+                self.compact()
+            self.log = open(self.path, 'ab')
+        offset = self.log.seek(0, os.SEEK_END)
+        self.log.write(b"".join(lines))
+        self.log.flush()
+        return offset, len(lines[0])
+
+    def compact(self):
+        """Rewrite the log with the latest record of every day and snapshot, events are all kept"""
+        tmp_path = self.path + ".tmp"
+        index = {}
+        with open(self.path, 'rb') as old, open(tmp_path, 'wb') as new:
+            for name, (offset, length) in self.index.items():
+                old.seek(offset)
+                index[name] = (new.tell(), length)
+                new.write(old.read(length))
+            for exercise_id, progress in self.progress.items():
+                new.write((json.dumps({"progress": exercise_id, "data": progress}, separators=(',', ':'))
+                           + "\n").encode("utf-8"))
+            for exercise_id, events in self.events.items():
+                for event in events:
+                    new.write((json.dumps({"event": exercise_id, "data": event}, separators=(',', ':'))
+                               + "\n").encode("utf-8"))
+        os.replace(tmp_path, self.path)
+        self.index = index
+        self.dead = 0
+        self.torn = None
+        # The handles point at the old file, the next read and append reopen the rewritten log
+        for handle in (self.reader, self.log):
+            if handle:
+                handle.close()
+        self.reader = self.log = None
+
+    def names(self) -> List[str]:
+        return sorted(self.index, key=date_key)
+
+    def signature(self, name: str) -> str:
+        offset, length = self.index[name]
+        return f"jsonl:{offset}:{length}"
+
+    def read(self, name: str) -> Optional[DaySubmission]:
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        if self.reader is None:
+            self.reader = open(self.path, 'rb')
+        self.reader.seek(entry[0])
+        return DaySubmission.from_dict(json.loads(self.reader.read(entry[1]))["data"])
+
+    def write(self, name: str, day: DaySubmission):
+        if name in self.index:
+            self.dead += 1
+        self.index[name] = self._append({"day": name, "data": day.to_dict()})
+
+    def delete(self, name: str):
+        if name in self.index:
+            self._append({"day": name, "deleted": True})
+            del self.index[name]
+            self.dead += 2
+
+    def progress_ids(self) -> List[str]:
+        return sorted(set(self.progress) | set(self.events))
+
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        progress = self.progress.get(exercise_id)
+        return dict(progress) if progress is not None else None
+
+    def save_progress(self, exercise_id: str, progress: Dict):
+        self._append({"progress": exercise_id, "data": progress})
+        self.dead += exercise_id in self.progress
+        self.progress[exercise_id] = dict(progress)
+
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        return [event for event in self.events.get(exercise_id, []) if event["seq"] > after]
+
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        if not events:
+            return
+        self._append(*({"event": exercise_id, "data": event} for event in events))
+        self.events.setdefault(exercise_id, []).extend(events)
+
+    def delete_progress(self, exercise_id: str):
+        if exercise_id in self.progress or exercise_id in self.events:
+            self._append({"progress": exercise_id, "deleted": True})
+            self.dead += 1 + (exercise_id in self.progress) + len(self.events.pop(exercise_id, []))
+            self.progress.pop(exercise_id, None)
+
+    def close(self):
+        if self.log:
+            self.log.close()
+        if self.reader:
+            self.reader.close()
+
+
+class EncryptedStorage(Storage):
+    """Days and progress sealed with a key derived from a passphrase
+
+    Every day is its own file in vault/days/, named by a keyed hash so
+    the names give nothing away. An encrypted index holds each day's
+    summary (date, exercise, week, counts, session), so listing days,
+    the calendar and totals are served without opening a single day.
+    Progress snapshots are sealed files, progress events are appended as
+    sealed lines. See vault.py for the key and the file format.
+    """
+
+    backend = "encrypted"
+    private = True
+    INDEX_LABEL = "index"
+
+    def __init__(self, root: str = "."):
+        self.dir = os.path.join(root, VAULT_DIR)
+        # name -> {"updated", "length", "summary"}
+        self.days: Dict[str, Dict] = {}
+        self.progress: set = set()
+        self._bulk = False
+        self._dirty = False
+        # Until the first write a journal without a vault is empty and needs no passphrase
+        self._cipher: Optional[Cipher] = None
+        if os.path.exists(os.path.join(self.dir, VAULT_FILE)):
+            data = self.cipher.read_file(self._index_path(), self.INDEX_LABEL)
+            if data is not None:
+                index = json.loads(data)
+                self.days = index["days"]
+                self.progress = set(index["progress"])
+
+    @property
+    def cipher(self) -> Cipher:
+        """Unlocks the vault, creating it on first write"""
+        if self._cipher is None:
+            self._cipher = unlock(self.dir)
+        return self._cipher
+
+    def _index_path(self) -> str:
+        return os.path.join(self.dir, "index.bin")
+
+    def _path(self, kind: str, key: str, extension: str = ".bin") -> str:
+        return os.path.join(self.dir, kind, self.cipher.file_id(kind, key) + extension)
+
+    def _writable(self, kind: str, key: str, extension: str = ".bin") -> str:
+        path = self._path(kind, key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _changed(self):
+        if self._bulk:
+            self._dirty = True
+            return
+        data = json.dumps({"days": self.days, "progress": sorted(self.progress)}, separators=(',', ':'))
+        self.cipher.write_file(self._index_path(), self.INDEX_LABEL, data.encode("utf-8"))
+        self._dirty = False
+
+    def names(self) -> List[str]:
+        return sorted(self.days, key=date_key)
+
+    def signature(self, name: str) -> str:
+        entry = self.days[name]
+        return f"encrypted:{entry['updated']}:{entry['length']}"
+
+    def read(self, name: str) -> Optional[DaySubmission]:
+        if name not in self.days:
+            return None
+        data = self.cipher.read_file(self._path("days", name), f"day:{name}")
+        return DaySubmission.from_dict(json.loads(data)) if data is not None else None
+
+    def summary(self, name: str) -> Optional[DaySummary]:
+        entry = self.days.get(name)
+        return DaySummary.from_dict(entry["summary"]) if entry else None
+
+    def write(self, name: str, day: DaySubmission):
+        data = json.dumps(day.to_dict(), separators=(',', ':')).encode("utf-8")
+        length = self.cipher.write_file(self._writable("days", name), f"day:{name}", data)
+        self.days[name] = {"updated": time.time_ns(), "length": length,
+                           "summary": DaySummary.of(day).to_dict()}
+        self._changed()
+
+    def delete(self, name: str):
+        if self.days.pop(name, None) is None:
+            return
+        try:
+            os.remove(self._path("days", name))
+        except FileNotFoundError:
+            pass
+        self._changed()
+
+    def progress_ids(self) -> List[str]:
+        return sorted(self.progress)
+
+    def _track_progress(self, exercise_id: str):
+        if exercise_id not in self.progress:
+            self.progress.add(exercise_id)
+            self._changed()
+
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        if exercise_id not in self.progress:
+            return None
+        data = self.cipher.read_file(self._path("progress", exercise_id), f"progress:{exercise_id}")
+        return json.loads(data) if data is not None else None
+
+    def save_progress(self, exercise_id: str, progress: Dict):
+        self.cipher.write_file(self._writable("progress", exercise_id), f"progress:{exercise_id}",
+                               json.dumps(progress).encode("utf-8"))
+        self._track_progress(exercise_id)
+
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        """Events of the sealed log, their numbers must go up from line to line
+
+        Each line is the seq in clear and the event sealed with the seq in
+        its label, so a line moved or repeated is caught. Only a last line
+        without its newline is skipped, a crash cut it short.
+        """
+        events = []
+        if exercise_id not in self.progress:
+            return events
+        try:
+            with open(self._path("progress", exercise_id, PROGRESS_LOG_EXTENSION), 'rb') as f:
+                lines = f.read().split(b"\n")
+        except FileNotFoundError:
+            return events
+        last = 0
+        # The part after the last newline is empty or a torn line
+        for number, line in enumerate(lines[:-1], 1):
+            seq, _, sealed = line.partition(b":")
+            if not seq.isdigit() or int(seq) <= last:
+                raise VaultError(f"progress events of {exercise_id}: line {number} is out of order, "
+                                 "events were reordered or replayed")
+            last = int(seq)
+            try:
+                blob = base64.b64decode(sealed, validate=True)
+            except ValueError:
+                raise VaultError(f"progress events of {exercise_id}: event {last} is damaged") from None
+            event = json.loads(self.cipher.open(self._event_label(exercise_id, last), blob))
+            if event["seq"] > after:
+                events.append(event)
+        return events
+
+    @staticmethod
+    def _event_label(exercise_id: str, seq: int) -> str:
+        return f"event:{exercise_id}:{seq}"
+
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        if not events:
+            return
+        path = self._writable("progress", exercise_id, PROGRESS_LOG_EXTENSION)
+        with open(path, 'ab') as f:
+            if f.tell() and not _ends_with_newline(path):
+                # Drop the line a crash cut short, the event never happened
+                with open(path, 'rb') as log:
+                    f.truncate(log.read().rfind(b"\n") + 1)
+            f.write(b"".join(b"%d:" % event["seq"] + base64.b64encode(self.cipher.seal(
+                self._event_label(exercise_id, event["seq"]),
+                json.dumps(event, separators=(',', ':')).encode("utf-8"))) + b"\n" for event in events))
+        self._track_progress(exercise_id)
+
+    def delete_progress(self, exercise_id: str):
+        if exercise_id not in self.progress:
+            return
+        for extension in (".bin", PROGRESS_LOG_EXTENSION):
+            try:
+                os.remove(self._path("progress", exercise_id, extension))
+            except FileNotFoundError:
+                pass
+        self.progress.discard(exercise_id)
+        self._changed()
+
+    @contextlib.contextmanager
+    def bulk(self) -> Iterator["Storage"]:
+        # A conversion sets the passphrase of a new vault before anything is copied
+        self.cipher
+        self._bulk = True
+        try:
+            yield self
+        finally:
+            self._bulk = False
+            if self._dirty:
+                self._changed()
+
+    def draft_codec(self) -> Optional[DraftCodec]:
+        return DraftCodec(lambda: self.cipher)
+
+
+class SharedStorage(Storage):
+    """A backend shared by the menu and the session writer thread
+
+    Every call holds one lock, so a day is never read halfway through
+    being written and a SQLite connection is only used by one thread at
+    a time.
+    """
+
+    def __init__(self, inner: Storage):
+        self.inner = inner
+        self.backend = inner.backend
+        self.private = inner.private
+        self.lock = threading.RLock()
+
+    def names(self) -> List[str]:
+        with self.lock:
+            return self.inner.names()
+
+    def signature(self, name: str) -> str:
+        with self.lock:
+            return self.inner.signature(name)
+
+    def read(self, name: str) -> Optional[DaySubmission]:
+        with self.lock:
+            return self.inner.read(name)
+
+    def summary(self, name: str) -> Optional[DaySummary]:
+        with self.lock:
+            return self.inner.summary(name)
+
+    def write(self, name: str, day: DaySubmission):
+        with self.lock:
+            self.inner.write(name, day)
+
+    def delete(self, name: str):
+        with self.lock:
+            self.inner.delete(name)
+
+    def progress_ids(self) -> List[str]:
+        with self.lock:
+            return self.inner.progress_ids()
+
+    def load_progress(self, exercise_id: str) -> Optional[Dict]:
+        with self.lock:
+            return self.inner.load_progress(exercise_id)
+
+    def save_progress(self, exercise_id: str, progress: Dict):
+        with self.lock:
+            self.inner.save_progress(exercise_id, progress)
+
+    def progress_events(self, exercise_id: str, after: int = 0) -> List[Dict]:
+        with self.lock:
+            return self.inner.progress_events(exercise_id, after)
+
+    def append_progress_events(self, exercise_id: str, events: List[Dict]):
+        with self.lock:
+            self.inner.append_progress_events(exercise_id, events)
+
+    def delete_progress(self, exercise_id: str):
+        with self.lock:
+            self.inner.delete_progress(exercise_id)
+
+    @contextlib.contextmanager
+    def bulk(self) -> Iterator["Storage"]:
+        with self.lock, self.inner.bulk():
+            yield self
+
+    def draft_codec(self) -> Optional[DraftCodec]:
+        return self.inner.draft_codec()
+
+    def close(self):
+        with self.lock:
+            self.inner.close()
+
+
+BACKENDS = {
+    YamlStorage.backend: YamlStorage,
+    SqliteStorage.backend: SqliteStorage,
+    JsonlStorage.backend: JsonlStorage,
+    EncryptedStorage.backend: EncryptedStorage,
+}
+
+
+def configured_backend(root: str = ".") -> str:
+    """Backend named in storage.json, yaml when there is none"""
+    try:
+        with open(os.path.join(root, STORAGE_FILE), 'r') as f:
+            backend = json.load(f).get("backend", DEFAULT_BACKEND)
+    except FileNotFoundError:
+        return DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown storage backend {backend!r} in {STORAGE_FILE}")
+    return backend
+
+
+def open_storage(root: str = ".", backend: Optional[str] = None) -> Storage:
+    return BACKENDS[backend or configured_backend(root)](root)
+
+
+class ConvertResult:
+    def __init__(self, source: str, target: str):
+        self.source = source
+        self.target = target
+        self.days = 0
+        self.progress = 0
+        self.removed = 0
+
+
+def _renumbered_progress(source: Storage, exercise_id: str) -> Tuple[List[Dict], Optional[Dict]]:
+    """Events of an exercise numbered 1, 2, 3... and a snapshot of the state after the last one
+
+    A log may skip numbers, a sync used to take over the other side's
+    count, the target starts again from dense numbers.
+    """
+    progress = source.load_progress(exercise_id)
+    events = source.progress_events(exercise_id)
+    if progress is not None:
+        for event in events:
+            if event["seq"] > progress.get("seq", 0):
+                progress = apply_event(progress, event)
+        progress = dict(progress, seq=len(events))
+    return [dict(event, seq=seq) for seq, event in enumerate(events, 1)], progress
+
+
+def convert(root: str, target_backend: str) -> ConvertResult:
+    """Copy every day and all progress to another backend and switch to it
+
+    Days stream across one at a time. The target ends up mirroring the
+    source, so days it kept from an earlier conversion are removed. The
+    source is left as it was, the switch is only recorded in storage.json.
+    """
+    source_backend = configured_backend(root)
+    if target_backend == source_backend:
+        raise ValueError(f"already using the {target_backend} backend")
+
+    result = ConvertResult(source_backend, target_backend)
+    source = open_storage(root, source_backend)
+    try:
+        target = open_storage(root, target_backend)
+        try:
+            names = source.names()
+            with target.bulk():
+                for name in names:
+                    day = source.read(name)
+                    if day is not None:
+                        target.write(name, day)
+                        result.days += 1
+                exercise_ids = source.progress_ids()
+                for exercise_id in set(target.progress_ids()) - set(exercise_ids):
+                    target.delete_progress(exercise_id)
+                for exercise_id in exercise_ids:
+                    target.delete_progress(exercise_id)
+                    events, progress = _renumbered_progress(source, exercise_id)
+                    target.append_progress_events(exercise_id, events)
+                    if progress is not None:
+                        target.save_progress(exercise_id, progress)
+                    result.progress += 1
+                kept = set(names)
+                for name in target.names():
+                    if name not in kept:
+                        target.delete(name)
+                        result.removed += 1
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+    tmp_path = os.path.join(root, STORAGE_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({"backend": target_backend}, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, STORAGE_FILE))
+    return result
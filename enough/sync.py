@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Content-addressed sync of submissions and progress through a shared directory
+"""
+
+import os
+import shutil
+import hashlib
+from typing import Dict, List, Optional
+
+from .archive import PackedArchive
+from .jsonio import read_json, write_json
+from .models import DaySubmission, Session
+from .progress import LEGACY_PROGRESS_FILE, ProgressStore, ProgressTracker, write_progress_file
+from .storage import YamlStorage
+
+MANIFEST_FILE = ".manifest.json"
+SYNC_BASE_FILE = ".sync-base.json"
+
+
+def file_hash(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Content hashes of the day files in one submissions directory
+
+    Entries remember size and mtime, so refreshing only stats the files
+    and hashes the ones that actually changed since the last run. With
+    an archive, days only found packed in it are listed too, marked by
+    their packed date and time instead of an mtime.
+    """
+
+    def __init__(self, directory: str, archive_path: Optional[str] = None):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.entries: Dict[str, List] = read_json(self.path)
+        self.archive = PackedArchive.open(archive_path) if archive_path else None
+        # Days with no loose file, read from the archive
+        self.packed: set = set()
+
+    def refresh(self) -> "Manifest":
+        entries = {}
+        self.packed = set()
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith('.yaml') or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    known = self.entries.get(entry.name)
+                    if known and known[1] == stat.st_size and known[2] == stat.st_mtime_ns:
+                        entries[entry.name] = known
+                    else:
+                        entries[entry.name] = [file_hash(entry.path), stat.st_size, stat.st_mtime_ns]
+        if self.archive:
+            for name in self.archive.names():
+                if name in entries or not name.endswith('.yaml'):
+                    continue
+                marker = "packed:" + ":".join(str(part) for part in self.archive.date_time(name))
+                known = self.entries.get(name)
+                if known and known[1] == self.archive.size(name) and known[2] == marker:
+                    entries[name] = known
+                else:
+                    entries[name] = [hashlib.sha256(self.archive.read(name)).hexdigest(),
+                                     self.archive.size(name), marker]
+                self.packed.add(name)
+        self.entries = entries
+        return self
+
+    def read(self, filename: str) -> bytes:
+        if filename in self.packed:
+            return bytes(self.archive.read(filename))
+        with open(os.path.join(self.directory, filename), 'rb') as f:
+            return f.read()
+
+    def load(self, filename: str) -> Optional[DaySubmission]:
+        return DaySubmission.parse(self.read(filename))
+
+    def digest(self, filename: str) -> Optional[str]:
+        entry = self.entries.get(filename)
+        return entry[0] if entry else None
+
+    def record(self, filename: str, digest: str):
+        """A loose file was written, it now shadows any packed copy"""
+        stat = os.stat(os.path.join(self.directory, filename))
+        self.entries[filename] = [digest, stat.st_size, stat.st_mtime_ns]
+        self.packed.discard(filename)
+
+    def close(self):
+        if self.archive:
+            self.archive.close()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        write_json(self.path, self.entries)
+
+
+def merge_days(local: DaySubmission, remote: DaySubmission) -> DaySubmission:
+    """Merge two versions of the same day file stem by stem"""
+    submissions = {stem: list(completions) for stem, completions in local.submissions.items()}
+    for stem, completions in remote.submissions.items():
+        if stem not in submissions:
+            submissions[stem] = list(completions)
+        else:
+            seen = set(submissions[stem])
+            submissions[stem].extend(c for c in completions if c not in seen)
+
+    session = local.session or remote.session
+    if local.session and remote.session:
+        if set(local.submissions) == set(remote.submissions):
+            # The same session saved on both sides
+            duration = max(local.session.duration_minutes, remote.session.duration_minutes)
+        else:
+            # Two sessions answering different stems, the time spent adds up
+            duration = local.session.duration_minutes + remote.session.duration_minutes
+        session = Session(
+            min(local.session.started_at, remote.session.started_at),
+            max(local.session.ended_at, remote.session.ended_at),
+            duration
+        )
+
+    return DaySubmission(local.journal, local.date, local.week, local.day, session, submissions)
+
+
+def merge_progress(local: Dict, remote: Dict) -> Dict:
+    """Reconcile two progress documents of the same exercise"""
+    if not remote:
+        return local
+    if not local:
+        return remote
+
+    local_last = local.get("last_completed") or ""
+    remote_last = remote.get("last_completed") or ""
+    if local.get("start_date") != remote.get("start_date"):
+        # Different program runs, keep whichever was worked on most recently
+        return dict(remote if remote_last > local_last else local)
+
+    merged = dict(local)
+    position = max(
+        (local.get("current_week", 1), local.get("current_day", 1)),
+        (remote.get("current_week", 1), remote.get("current_day", 1))
+    )
+    merged["current_week"], merged["current_day"] = position
+    merged["last_completed"] = max(local_last, remote_last) or None
+    return merged
+
+
+class SyncResult:
+    def __init__(self):
+        self.pulled: List[str] = []
+        self.pushed: List[str] = []
+        self.merged: List[str] = []
+        self.conflicts: List[str] = []
+        self.progress_changed = False
+
+    def summary(self) -> str:
+        return (f"pulled {len(self.pulled)}, pushed {len(self.pushed)}, "
+                f"merged {len(self.merged)} day files")
+
+
+def _sync_progress(local_path: str, remote_path: str) -> bool:
+    """Merge the single global progress file of a side not migrated yet"""
+    local_progress = read_json(local_path)
+    remote_progress = read_json(remote_path)
+    progress = merge_progress(local_progress, remote_progress)
+    changed = False
+    if progress:
+        for path, current in ((local_path, local_progress), (remote_path, remote_progress)):
+            if current != progress:
+                write_progress_file(path, progress)
+                changed = True
+    return changed
+
+
+def _sync_trackers(local: ProgressTracker, remote: ProgressTracker) -> bool:
+    """Merge one exercise's progress, returns whether either side changed
+
+    Each side records the merged state as an event of its own log, so
+    its event numbers stay dense whatever the other side counted to.
+    """
+    def position(progress: Dict) -> Dict:
+        return {key: value for key, value in progress.items() if key != "seq"}
+
+    local_progress = position(local.progress) if local.seq else {}
+    remote_progress = position(remote.progress) if remote.seq else {}
+    progress = merge_progress(local_progress, remote_progress)
+    changed = False
+    if progress:
+        for tracker, current in ((local, local_progress), (remote, remote_progress)):
+            if current != progress:
+                tracker.synced(progress)
+                changed = True
+    return changed
+
+
+def _copy(filename: str, source: Manifest, target: Manifest):
+    """Write a day to the other side as a loose file, packed days are copied out of the archive"""
+    target_path = os.path.join(target.directory, filename)
+    if filename in source.packed:
+        tmp_path = target_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(source.read(filename))
+        os.replace(tmp_path, target_path)
+    else:
+        shutil.copy2(os.path.join(source.directory, filename), target_path)
+    target.record(filename, source.digest(filename))
+
+
+def sync(local_root: str, remote_root: str) -> SyncResult:
+    """Two-way sync of submissions/ and progress/ with remote_root
+
+    Days packed into submissions.zip on either side take part like loose
+    files, a day pulled or merged into a side where it is packed is
+    written as a loose file, which wins over the packed copy.
+    """
+    local = Manifest(os.path.join(local_root, "submissions"), os.path.join(local_root, "submissions.zip"))
+    remote = Manifest(os.path.join(remote_root, "submissions"), os.path.join(remote_root, "submissions.zip"))
+    try:
+        result = _sync_days(local, remote, os.path.abspath(remote_root))
+    finally:
+        local.close()
+        remote.close()
+
+    # Every exercise has its own progress, each one is merged on its own
+    stores = [ProgressStore(YamlStorage(root, archive=False), legacy_file=None) for root in (local_root, remote_root)]
+    for exercise_id in sorted(set(stores[0].exercise_ids()) | set(stores[1].exercise_ids())):
+        if _sync_trackers(stores[0].get(exercise_id), stores[1].get(exercise_id)):
+            result.progress_changed = True
+    # A side that has not been migrated yet still keeps one global file
+    legacy = [os.path.join(root, LEGACY_PROGRESS_FILE) for root in (local_root, remote_root)]
+    if any(os.path.exists(path) for path in legacy) and _sync_progress(*legacy):
+        result.progress_changed = True
+
+    return result
+
+
+def _sync_days(local: Manifest, remote: Manifest, remote_key: str) -> SyncResult:
+    local.refresh()
+    remote.refresh()
+    os.makedirs(remote.directory, exist_ok=True)
+    os.makedirs(local.directory, exist_ok=True)
+
+    # Hashes both sides agreed on at the end of the previous sync
+    base_path = os.path.join(local.directory, SYNC_BASE_FILE)
+    bases = read_json(base_path)
+    base = bases.get(remote_key, {})
+
+    result = SyncResult()
+    for filename in sorted(set(local.entries) | set(remote.entries)):
+        local_digest = local.digest(filename)
+        remote_digest = remote.digest(filename)
+        if local_digest == remote_digest:
+            continue
+        if local_digest is None or base.get(filename) == local_digest:
+            _copy(filename, remote, local)
+            result.pulled.append(filename)
+        elif remote_digest is None or base.get(filename) == remote_digest:
+            _copy(filename, local, remote)
+            result.pushed.append(filename)
+        else:
+            # Both sides changed the same day since the last sync
+            try:
+                merged = merge_days(local.load(filename), remote.load(filename))
+            except Exception as e:
+                print(f"❌ Could not merge {filename}: {e}")
+                result.conflicts.append(filename)
+                continue
+            local_path = os.path.join(local.directory, filename)
+            tmp_path = local_path + ".tmp"
+            merged.dump(tmp_path)
+            os.replace(tmp_path, local_path)
+            local.record(filename, file_hash(local_path))
+            _copy(filename, local, remote)
+            result.merged.append(filename)
+
+    local.save()
+    remote.save()
+    new_base = {name: entry[0] for name, entry in local.entries.items()}
+    for filename in result.conflicts:
+        # Keep the old base so the conflict is detected again next time
+        if filename in base:
+            new_base[filename] = base[filename]
+        else:
+            new_base.pop(filename, None)
+    bases[remote_key] = new_base
+    write_json(base_path, bases)
+    return result
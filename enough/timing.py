@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Columnar store of session timings and the statistics computed from it
+"""
+
+import os
+import json
+import calendar
+from array import array
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from .storage import Storage
+
+TIMING_META_FILE = ".timing.json"
+TIMING_DATA_FILE = ".timing.bin"
+TIMING_VERSION = 1
+
+# Upper bounds in minutes of the duration histogram, the last bucket is open
+DURATION_BINS = (5, 10, 15, 20, 30, 45, 60)
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+def _timestamp(value: str) -> int:
+    """Wall clock seconds of an ISO timestamp, time zones are ignored"""
+    return calendar.timegm(datetime.fromisoformat(value).timetuple())
+
+
+class TimingStore:
+    """One row per session, each field in its own typed array
+
+    Rows are keyed by day file name and every file's signature is kept,
+    so a refresh only reads the files that are new or changed since the
+    previous one. Statistics are single passes over the arrays.
+    """
+
+    def __init__(self, directory: str):
+        self.meta_path = os.path.join(directory, TIMING_META_FILE)
+        self.data_path = os.path.join(directory, TIMING_DATA_FILE)
+        self.exercises: List[str] = []
+        self.names: List[str] = []
+        self.signatures: Dict[str, str] = {}
+        self.exercise = array('H')
+        self.started = array('q')
+        self.ended = array('q')
+        self.duration = array('f')
+
+    def _columns(self) -> Tuple[array, ...]:
+        return (self.exercise, self.started, self.ended, self.duration)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def load(cls, directory: str) -> "TimingStore":
+        """Read the saved columns, an unreadable store starts out empty"""
+        store = cls(directory)
+        try:
+            with open(store.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get("version") != TIMING_VERSION:
+                return store
+            rows = len(meta["names"])
+            with open(store.data_path, 'rb') as f:
+                for column in store._columns():
+                    column.fromfile(f, rows)
+            store.exercises = meta["exercises"]
+            store.names = meta["names"]
+            store.signatures = meta["signatures"]
+        except (OSError, ValueError, KeyError, EOFError):
+            return cls(directory)
+        return store
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        tmp_path = self.data_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            for column in self._columns():
+                column.tofile(f)
+        os.replace(tmp_path, self.data_path)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": TIMING_VERSION, "exercises": self.exercises, "names": self.names,
+                                "signatures": self.signatures}, separators=(',', ':')))
+        os.replace(tmp_path, self.meta_path)
+
+    def _exercise_code(self, exercise_id: str) -> int:
+        try:
+            return self.exercises.index(exercise_id)
+        except ValueError:
+            self.exercises.append(exercise_id)
+            return len(self.exercises) - 1
+
+    def refresh(self, source: Storage) -> int:
+        """Bring the columns up to date with the day files, returns how many were read"""
+        current = {name: source.signature(name) for name in source.names()}
+        rows = {name: row for row, name in enumerate(self.names)}
+        drop = set(name for name in self.signatures if name not in current)
+        read = 0
+
+        for name, signature in current.items():
+            if self.signatures.get(name) == signature:
+                continue
+            read += 1
+            self.signatures[name] = signature
+            try:
+                day = source.summary(name)
+                session = day.session if day else None
+                values = (self._exercise_code(day.journal), _timestamp(session.started_at),
+                          _timestamp(session.ended_at), session.duration_minutes) if session else None
+            except Exception:
+                values = None
+            if values is None:
+                # Nothing to time, the signature still saves a re-read next time
+                drop.add(name)
+                continue
+
+            drop.discard(name)
+            row = rows.get(name)
+            if row is None:
+                rows[name] = len(self.names)
+                self.names.append(name)
+                for column, value in zip(self._columns(), values):
+                    column.append(value)
+            else:
+                for column, value in zip(self._columns(), values):
+                    column[row] = value
+
+        for name in drop:
+            if name not in current:
+                self.signatures.pop(name, None)
+        if any(name in rows for name in drop):
+            self._compact(set(rows[name] for name in drop if name in rows))
+        return read
+
+    def _compact(self, removed: set):
+        keep = [row for row in range(len(self.names)) if row not in removed]
+        self.names = [self.names[row] for row in keep]
+        self.exercise = array('H', (self.exercise[row] for row in keep))
+        self.started = array('q', (self.started[row] for row in keep))
+        self.ended = array('q', (self.ended[row] for row in keep))
+        self.duration = array('f', (self.duration[row] for row in keep))
+
+
+def duration_histogram(store: TimingStore) -> List[int]:
+    """Session counts per DURATION_BINS bucket, plus one for longer sessions"""
+    counts = [0] * (len(DURATION_BINS) + 1)
+    for minutes in store.duration:
+        for i, bound in enumerate(DURATION_BINS):
+            if minutes < bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def duration_summary(store: TimingStore) -> Dict[str, float]:
+    if not store.duration:
+        return {"mean": 0.0, "median": 0.0, "p90": 0.0, "longest": 0.0}
+    ordered = sorted(store.duration)
+    count = len(ordered)
+    return {
+        "mean": sum(ordered) / count,
+        "median": ordered[count // 2],
+        "p90": ordered[min(count - 1, int(count * 0.9))],
+        "longest": ordered[-1],
+    }
+
+
+def hour_histogram(store: TimingStore) -> List[int]:
+    """Sessions started in each hour of the day"""
+    counts = [0] * 24
+    for started in store.started:
+        counts[started % SECONDS_PER_DAY // 3600] += 1
+    return counts
+
+
+def weekday_histogram(store: TimingStore) -> List[int]:
+    """Sessions started on each weekday, Monday first"""
+    counts = [0] * 7
+    for started in store.started:
+        counts[(started // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7] += 1
+    return counts
+
+
+def exercise_trends(store: TimingStore, today: datetime, weeks: int = 8) -> Dict[str, List[Tuple[int, float]]]:
+    """Per exercise, (sessions, average minutes) of each of the last `weeks` weeks, oldest first"""
+    today_days = calendar.timegm(today.timetuple()) // SECONDS_PER_DAY
+    this_monday = today_days - (today_days + EPOCH_WEEKDAY) % 7
+    first_monday = this_monday - 7 * (weeks - 1)
+
+    counts = [[0] * weeks for _ in store.exercises]
+    minutes = [[0.0] * weeks for _ in store.exercises]
+    for code, started, duration in zip(store.exercise, store.started, store.duration):
+        offset = started // SECONDS_PER_DAY - first_monday
+        if 0 <= offset < 7 * weeks:
+            counts[code][offset // 7] += 1
+            minutes[code][offset // 7] += duration
+
+    trends = {}
+    for code, exercise_id in enumerate(store.exercises):
+        if any(counts[code]):
+            trends[exercise_id] = [(n, total / n if n else 0.0) for n, total in zip(counts[code], minutes[code])]
+    return trends
+
+
+def load_timing(submissions_dir: str, source: Storage) -> TimingStore:
+    """Load the store saved in submissions_dir and catch it up with the stored days"""
+    store = TimingStore.load(submissions_dir)
+    # The columns hold session times, a private backend keeps them in memory
+    if store.refresh(source) and not source.private:
+        store.save()
+    return store
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+ENOUGH - Nathaniel Branden Sentence Completion Journal
+Passphrase keys and the authenticated file format of the encrypted backend
+"""
+
+import io
+import os
+import hmac
+import json
+import base64
+import getpass
+import hashlib
+import struct
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+VAULT_DIR = "vault"
+VAULT_FILE = "vault.json"
+VAULT_VERSION = 1
+PASSPHRASE_ENV = "ENOUGH_PASSPHRASE"
+
+# scrypt at these costs takes about a tenth of a second and 32 MB, once per session
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+
+MAGIC = b"ENV1"
+# Plaintext per chunk, a day is nearly always one chunk
+CHUNK_SIZE = 64 * 1024
+NONCE_PREFIX_SIZE = 7
+# High bit of a chunk length marks the last chunk
+LAST_CHUNK = 0x80000000
+CHECK_LABEL = "check"
+CHECK_TEXT = b"enough"
+
+# Keys derived this session, by vault directory and salt
+_unlocked: Dict[Tuple[str, bytes], "VaultKeys"] = {}
+
+
+class VaultError(ValueError):
+    """The vault cannot be opened: no cryptography, a wrong passphrase or a damaged file"""
+
+
+def _aead():
+    try:
+        from cryptography.exceptions import InvalidTag
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError:
+        raise VaultError("the encrypted backend needs the cryptography package, "
+                         "install it with: pip install 'enough-journal[encryption]'") from None
+    return AESGCM, InvalidTag
+
+
+def derive_key(passphrase: str, salt: bytes, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> bytes:
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=32)
+
+
+class VaultKeys:
+    """Subkeys of the passphrase key: one encrypts, one names files"""
+
+    def __init__(self, master: bytes):
+        self.data = hmac.new(master, b"enough data", hashlib.sha256).digest()
+        self.names = hmac.new(master, b"enough names", hashlib.sha256).digest()
+
+
+class Cipher:
+    """AES-GCM over a chunked stream, every file gets a fresh random nonce prefix
+
+    A file is MAGIC, a 7 byte nonce prefix, then chunks of a 4 byte
+    length and the sealed bytes. A chunk's nonce is the prefix, its
+    index and a flag marking the last chunk, so chunks cannot be
+    reordered, dropped or cut off without failing to open. The label
+    (day name, exercise) is authenticated with every chunk, a file moved
+    to another name fails to open too.
+    """
+
+    def __init__(self, keys: VaultKeys):
+        aesgcm, self._invalid = _aead()
+        self.aead = aesgcm(keys.data)
+        self.name_key = keys.names
+
+    def file_id(self, kind: str, name: str) -> str:
+        """Stable file name that does not give away the day or exercise it holds"""
+        return hmac.new(self.name_key, f"{kind}:{name}".encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+    def seal_into(self, out: BinaryIO, label: str, data: bytes) -> int:
+        """Write data sealed to out, returns the bytes written"""
+        prefix = os.urandom(NONCE_PREFIX_SIZE)
+        out.write(MAGIC + prefix)
+        written = len(MAGIC) + len(prefix)
+        chunks = [data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE)] or [b""]
+        for index, chunk in enumerate(chunks):
+            last = index == len(chunks) - 1
+            sealed = self.aead.encrypt(prefix + struct.pack(">IB", index, last), chunk, label.encode("utf-8"))
+            out.write(struct.pack(">I", len(sealed) | (LAST_CHUNK if last else 0)) + sealed)
+            written += 4 + len(sealed)
+        return written
+
+    def open_from(self, f: BinaryIO, label: str) -> bytes:
+        header = f.read(len(MAGIC) + NONCE_PREFIX_SIZE)
+        if header[:len(MAGIC)] != MAGIC or len(header) != len(MAGIC) + NONCE_PREFIX_SIZE:
+            raise VaultError(f"{label}: not an encrypted journal file")
+        prefix = header[len(MAGIC):]
+        parts = []
+        index = 0
+        while True:
+            size = f.read(4)
+            if len(size) != 4:
+                raise VaultError(f"{label}: file is cut short")
+            word = struct.unpack(">I", size)[0]
+            last = bool(word & LAST_CHUNK)
+            sealed = f.read(word & ~LAST_CHUNK)
+            try:
+                # The flag is part of the nonce, flipping it fails authentication
+                parts.append(self.aead.decrypt(prefix + struct.pack(">IB", index, last), sealed,
+                                               label.encode("utf-8")))
+            except self._invalid:
+                raise VaultError(f"{label}: failed authentication, wrong key or tampered file") from None
+            if last:
+                return b"".join(parts)
+            index += 1
+
+    def seal(self, label: str, data: bytes) -> bytes:
+        out = io.BytesIO()
+        self.seal_into(out, label, data)
+        return out.getvalue()
+
+    def open(self, label: str, blob: bytes) -> bytes:
+        return self.open_from(io.BytesIO(blob), label)
+
+    def write_file(self, path: str, label: str, data: bytes) -> int:
+        """Seal data into path atomically, returns the file size"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            size = self.seal_into(f, label, data)
+        os.replace(tmp_path, path)
+        return size
+
+    def read_file(self, path: str, label: str) -> Optional[bytes]:
+        """Opened contents of path, None if it does not exist"""
+        try:
+            with open(path, 'rb') as f:
+                return self.open_from(f, label)
+        except FileNotFoundError:
+            return None
+
+
+class DraftCodec:
+    """Seals draft lines and hides what the draft file names say
+
+    The cipher is asked for when first needed, so a journal whose vault
+    does not exist yet creates it with the first draft, not at launch.
+    """
+
+    LABEL = "draft"
+
+    def __init__(self, cipher: Callable[[], Cipher]):
+        self.cipher = cipher
+
+    def file_name(self, exercise_id: str, date_str: str, stem: str) -> str:
+        return self.cipher().file_id(self.LABEL, f"{exercise_id}\0{date_str}\0{stem}")
+
+    def encode(self, line: str) -> str:
+        return base64.b64encode(self.cipher().seal(self.LABEL, line.encode("utf-8"))).decode("ascii")
+
+    def decode(self, line: str) -> str:
+        return self.cipher().open(self.LABEL, base64.b64decode(line)).decode("utf-8")
+
+
+def ask_passphrase(confirm: bool = False) -> str:
+    """$ENOUGH_PASSPHRASE, otherwise asked for on the terminal"""
+    passphrase = os.environ.get(PASSPHRASE_ENV)
+    if passphrase is None:
+        passphrase = getpass.getpass("Journal passphrase: ")
+        if confirm and getpass.getpass("Repeat the passphrase: ") != passphrase:
+            raise VaultError("the passphrases do not match")
+    if not passphrase:
+        raise VaultError("the passphrase cannot be empty")
+    return passphrase
+
+
+def unlock(directory: str) -> Cipher:
+    """Cipher of the vault in directory, which is created when there is none
+
+    The passphrase is asked for and scrypt runs once per vault per
+    process, later opens (a conversion, reports) reuse the key
+    held in memory.
+    """
+    # Without cryptography say so before asking for a passphrase
+    _aead()
+    path = os.path.join(directory, VAULT_FILE)
+    try:
+        with open(path, 'r') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        meta = None
+    except ValueError as e:
+        raise VaultError(f"{path} is damaged: {e}") from None
+
+    if meta is None:
+        salt = os.urandom(SALT_SIZE)
+        keys = VaultKeys(derive_key(ask_passphrase(confirm=True), salt))
+        cipher = Cipher(keys)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "version": VAULT_VERSION,
+                "kdf": {"name": "scrypt", "salt": base64.b64encode(salt).decode("ascii"),
+                        "n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P},
+                "check": base64.b64encode(cipher.seal(CHECK_LABEL, CHECK_TEXT)).decode("ascii")
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+        _unlocked[(os.path.abspath(directory), salt)] = keys
+        return cipher
+
+    if meta.get("version") != VAULT_VERSION or meta.get("kdf", {}).get("name") != "scrypt":
+        raise VaultError(f"{path}: unsupported vault version")
+    kdf = meta["kdf"]
+    salt = base64.b64decode(kdf["salt"])
+    cache_key = (os.path.abspath(directory), salt)
+    keys = _unlocked.get(cache_key)
+    if keys is None:
+        keys = VaultKeys(derive_key(ask_passphrase(), salt, kdf["n"], kdf["r"], kdf["p"]))
+    cipher = Cipher(keys)
+    try:
+        if cipher.open(CHECK_LABEL, base64.b64decode(meta["check"])) != CHECK_TEXT:
+            raise VaultError("wrong passphrase")
+    except VaultError:
+        raise VaultError("wrong passphrase for the encrypted journal") from None
+    _unlocked[cache_key] = keys
+    return cipher
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import cryptography  # noqa: F401
+except ImportError:
+    cryptography = None
+
+from enough import vault
+from enough.models import DaySubmission, Session
+from enough.progress import ProgressStore
+from enough.storage import YamlStorage, convert, day_name, open_storage
+from enough.sync import sync
+
+EXERCISE = "program"
+
+
+class ConvertTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.local = os.path.join(self.dir.name, "local")
+        self.remote = os.path.join(self.dir.name, "remote")
+        patcher = mock.patch.dict(os.environ, {vault.PASSPHRASE_ENV: "passphrase"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tracker(self, storage):
+        return ProgressStore(storage, legacy_file=None).get(EXERCISE)
+
+    def synced_journal(self):
+        """A local journal that synced with a remote one further along, then carried on"""
+        session = Session("2025-01-06T08:00:00", "2025-01-06T08:10:00", 10)
+        YamlStorage(self.local, archive=False).write(
+            day_name(EXERCISE, "20250106"), DaySubmission(EXERCISE, "20250106", 1, 1, session, {"a": ["x"]}))
+        self.tracker(YamlStorage(self.local, archive=False)).start("2025-01-06")
+        remote = self.tracker(YamlStorage(self.remote, archive=False))
+        remote.start("2025-01-06")
+        for week in range(2, 6):
+            remote.update_progress(week, 1)
+        sync(self.local, self.remote)
+        self.tracker(YamlStorage(self.local, archive=False)).update_progress(5, 2)
+
+    def check_reopened(self, backend):
+        storage = open_storage(self.local)
+        try:
+            self.assertEqual(storage.backend, backend)
+            self.assertEqual(storage.names(), [day_name(EXERCISE, "20250106")])
+            tracker = self.tracker(storage)
+            self.assertEqual((tracker.progress["current_week"], tracker.progress["current_day"]), (5, 2))
+            self.assertEqual([event["seq"] for event in tracker.history()], list(range(1, tracker.seq + 1)))
+            tracker.update_progress(5, 3)
+        finally:
+            storage.close()
+        storage = open_storage(self.local)
+        try:
+            self.assertEqual(self.tracker(storage).progress["current_day"], 3)
+        finally:
+            storage.close()
+
+    def sync_then_convert(self, backend):
+        self.synced_journal()
+        convert(self.local, backend)
+        self.check_reopened(backend)
+
+    def test_sync_then_convert_sqlite(self):
+        self.sync_then_convert("sqlite")
+
+    def test_sync_then_convert_jsonl(self):
+        self.sync_then_convert("jsonl")
+
+    @unittest.skipUnless(cryptography, "needs the cryptography package")
+    def test_sync_then_convert_encrypted(self):
+        self.sync_then_convert("encrypted")
+
+    def test_gaps_are_renumbered(self):
+        # A log written while sync still took over the other side's count
+        storage = YamlStorage(self.local, archive=False)
+        storage.append_progress_events(EXERCISE, [
+            {"seq": 1, "type": "started", "start_date": "2025-01-06", "start_week": 1},
+            {"seq": 8, "type": "advanced", "week": 4, "day": 2}])
+        storage.save_progress(EXERCISE, {"current_week": 4, "current_day": 1, "start_date": "2025-01-06",
+                                         "last_completed": None, "seq": 7})
+        convert(self.local, "sqlite")
+        storage = open_storage(self.local)
+        try:
+            self.assertEqual([event["seq"] for event in storage.progress_events(EXERCISE)], [1, 2])
+            self.assertEqual(storage.load_progress(EXERCISE)["seq"], 2)
+            tracker = self.tracker(storage)
+            self.assertEqual((tracker.progress["current_week"], tracker.progress["current_day"]), (4, 2))
+        finally:
+            storage.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from datetime import date
+
+from enough.models import Exercise, SchemaError, load_catalog
+from enough.schedule import REFLECTION, STEM, Schedule
+
+
+def program(weeks, schedule=None):
+    data = {"name": "Program", "type": "branden", "total_weeks": len(weeks),
+            "weeks": [{"week": number, "stems": stems} for number, stems in enumerate(weeks, 1)]}
+    if schedule is not None:
+        data["schedule"] = schedule
+    return Exercise.from_dict(data)
+
+
+class ScheduleTest(unittest.TestCase):
+    def test_bundled_program_asks_every_stem(self):
+        exercise = load_catalog(None).program
+        schedule = Schedule(exercise, date(2025, 1, 6))
+        for number, week in exercise.weeks.items():
+            scheduled = {entry.stem for entry in schedule.entries if entry.week == number and entry.kind == STEM}
+            self.assertEqual(scheduled, set(week.stems), f"week {number}")
+
+    def test_default_pattern_follows_stem_count(self):
+        exercise = program([["a", "b", "c", "d", "e", "f"], ["g", "h"]])
+        self.assertEqual(exercise.pattern, [STEM] * 6 + [REFLECTION])
+        schedule = Schedule(exercise, date(2025, 1, 6))
+        self.assertEqual([entry.stem for entry in schedule.entries[:7]], ["a", "b", "c", "d", "e", "f", None])
+        self.assertEqual(schedule.at(date(2025, 1, 12)).kind, REFLECTION)
+        self.assertEqual(schedule.at(date(2025, 1, 13)).stem, "g")
+
+    def test_start_mid_week(self):
+        schedule = Schedule(program([["a", "b", "c"]]), date(2025, 1, 8))
+        self.assertEqual(schedule.entries[0].stem, "c")
+        self.assertIsNone(schedule.at(date(2025, 1, 7)))
+
+    def test_pattern_too_short_for_week(self):
+        with self.assertRaises(SchemaError):
+            program([["a", "b", "c"]], {"pattern": [STEM, STEM, REFLECTION, "rest", "rest", "rest", "rest"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from enough.models import DaySubmission, Session
+from enough.storage import JSONL_FILE, JsonlStorage, YamlStorage, configured_backend, convert, day_name, open_storage
+
+EXERCISE = "program"
+
+
+def day(date, stem):
+    session = Session(f"{date[:4]}-{date[4:6]}-{date[6:]}T08:00:00", f"{date[:4]}-{date[4:6]}-{date[6:]}T08:10:00",
+                      10)
+    return DaySubmission(EXERCISE, date, 1, 1, session, {stem: ["one", "two"]})
+
+
+class ConvertTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.root = self.dir.name
+        storage = YamlStorage(self.root, archive=False)
+        self.days = {day_name(EXERCISE, date): day(date, stem)
+                     for date, stem in (("20250106", "a"), ("20250107", "b"), ("20250110", "c"))}
+        for name, value in self.days.items():
+            storage.write(name, value)
+        storage.save_progress(EXERCISE, {"current_week": 1, "current_day": 2, "seq": 1})
+        storage.append_progress_events(EXERCISE, [{"seq": 1, "type": "advanced", "week": 1, "day": 2},
+                                                  {"seq": 2, "type": "advanced", "week": 1, "day": 3}])
+
+    def contents(self):
+        storage = open_storage(self.root)
+        try:
+            return ({name: storage.read(name).to_dict() for name in storage.names()},
+                    storage.load_progress(EXERCISE), storage.progress_events(EXERCISE))
+        finally:
+            storage.close()
+
+    def test_round_trip(self):
+        expected = ({name: value.to_dict() for name, value in self.days.items()},
+                    {"current_week": 1, "current_day": 3, "seq": 2},
+                    [{"seq": 1, "type": "advanced", "week": 1, "day": 2},
+                     {"seq": 2, "type": "advanced", "week": 1, "day": 3}])
+        for backend in ("sqlite", "jsonl", "yaml"):
+            result = convert(self.root, backend)
+            self.assertEqual(configured_backend(self.root), backend)
+            self.assertEqual(result.days, 3)
+            self.assertEqual(self.contents(), expected, backend)
+
+    def test_removed_days_follow_the_source(self):
+        convert(self.root, "sqlite")
+        convert(self.root, "yaml")
+        os.remove(os.path.join(self.root, "submissions", day_name(EXERCISE, "20250107")))
+        self.assertEqual(convert(self.root, "sqlite").removed, 1)
+        self.assertEqual(len(self.contents()[0]), 2)
+
+
+class JsonlStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, JSONL_FILE)
+        storage = JsonlStorage(self.dir.name)
+        storage.write(day_name(EXERCISE, "20250106"), day("20250106", "a"))
+        storage.close()
+
+    def test_torn_tail_kept_until_write(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'{"kind":"day","na')
+        size = os.path.getsize(self.path)
+        storage = JsonlStorage(self.dir.name)
+        self.assertEqual(storage.names(), [day_name(EXERCISE, "20250106")])
+        storage.close()
+        self.assertEqual(os.path.getsize(self.path), size)
+
+        storage = JsonlStorage(self.dir.name)
+        storage.write(day_name(EXERCISE, "20250107"), day("20250107", "b"))
+        storage.close()
+        storage = JsonlStorage(self.dir.name)
+        self.assertEqual(len(storage.names()), 2)
+        self.assertEqual(storage.read(day_name(EXERCISE, "20250107")).submissions, {"b": ["one", "two"]})
+        storage.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from enough.models import DaySubmission, Session
+from enough.progress import ProgressStore
+from enough.storage import YamlStorage, day_name
+from enough.sync import merge_days, sync
+
+EXERCISE = "program"
+
+
+def day(date, submissions, minutes):
+    session = Session(f"{date[:4]}-{date[4:6]}-{date[6:]}T08:00:00", f"{date[:4]}-{date[4:6]}-{date[6:]}T08:10:00",
+                      minutes)
+    return DaySubmission(EXERCISE, date, 1, 1, session, submissions)
+
+
+def progress(root):
+    return ProgressStore(YamlStorage(root, archive=False), legacy_file=None)
+
+
+class MergeDaysTest(unittest.TestCase):
+    def test_same_stems_keep_longest_session(self):
+        merged = merge_days(day("20250106", {"a": ["x"]}, 10), day("20250106", {"a": ["y"]}, 5))
+        self.assertEqual(merged.submissions, {"a": ["x", "y"]})
+        self.assertEqual(merged.session.duration_minutes, 10)
+
+    def test_different_stems_add_up(self):
+        merged = merge_days(day("20250106", {"a": ["x"]}, 10), day("20250106", {"b": ["y"]}, 5))
+        self.assertEqual(set(merged.submissions), {"a", "b"})
+        self.assertEqual(merged.session.duration_minutes, 15)
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.local = os.path.join(self.dir.name, "local")
+        self.remote = os.path.join(self.dir.name, "remote")
+
+    def write(self, root, date, submissions, minutes=10):
+        YamlStorage(root, archive=False).write(day_name(EXERCISE, date), day(date, submissions, minutes))
+
+    def read(self, root, date):
+        return YamlStorage(root, archive=False).read(day_name(EXERCISE, date))
+
+    def test_days_both_ways_and_merged(self):
+        self.write(self.local, "20250106", {"a": ["x"]})
+        self.write(self.remote, "20250107", {"b": ["y"]})
+        result = sync(self.local, self.remote)
+        self.assertEqual((len(result.pushed), len(result.pulled)), (1, 1))
+        self.assertEqual(self.read(self.remote, "20250106").submissions, {"a": ["x"]})
+
+        self.write(self.local, "20250108", {"c": ["x"]})
+        self.write(self.remote, "20250108", {"d": ["y"]}, 5)
+        result = sync(self.local, self.remote)
+        self.assertEqual(len(result.merged), 1)
+        for root in (self.local, self.remote):
+            merged = self.read(root, "20250108")
+            self.assertEqual(merged.submissions, {"c": ["x"], "d": ["y"]})
+            self.assertEqual(merged.session.duration_minutes, 15)
+        self.assertFalse(sync(self.local, self.remote).merged)
+
+    def test_progress_event_numbers_stay_dense(self):
+        local = progress(self.local).get(EXERCISE)
+        local.start("2025-01-06")
+        remote = progress(self.remote).get(EXERCISE)
+        remote.start("2025-01-06")
+        for week in range(2, 6):
+            remote.update_progress(week, 1)
+
+        self.assertTrue(sync(self.local, self.remote).progress_changed)
+        for root in (self.local, self.remote):
+            tracker = progress(root).get(EXERCISE)
+            self.assertEqual(tracker.progress["current_week"], 5)
+            self.assertEqual([event["seq"] for event in tracker.history()],
+                             list(range(1, tracker.seq + 1)))
+        self.assertFalse(sync(self.local, self.remote).progress_changed)
+
+        local = progress(self.local).get(EXERCISE)
+        local.update_progress(6, 1)
+        self.assertEqual(local.seq, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
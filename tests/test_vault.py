@@ -0,0 +1,105 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import cryptography  # noqa: F401
+except ImportError:
+    cryptography = None
+
+from enough import vault
+from enough.progress import PROGRESS_LOG_EXTENSION
+from enough.vault import Cipher, VaultError, VaultKeys
+
+
+@unittest.skipUnless(cryptography, "needs the cryptography package")
+class CipherTest(unittest.TestCase):
+    def setUp(self):
+        self.cipher = Cipher(VaultKeys(os.urandom(32)))
+
+    def test_seal_open(self):
+        for data in (b"", b"a day", os.urandom(vault.CHUNK_SIZE * 2 + 5)):
+            self.assertEqual(self.cipher.open("day:x", self.cipher.seal("day:x", data)), data)
+
+    def test_wrong_key(self):
+        blob = self.cipher.seal("day:x", b"a day")
+        with self.assertRaises(VaultError):
+            Cipher(VaultKeys(os.urandom(32))).open("day:x", blob)
+
+    def test_wrong_label(self):
+        blob = self.cipher.seal("day:x", b"a day")
+        with self.assertRaises(VaultError):
+            self.cipher.open("day:y", blob)
+
+    def test_truncated(self):
+        # Cut after the first of three chunks, and inside a chunk
+        blob = self.cipher.seal("day:x", os.urandom(vault.CHUNK_SIZE * 2 + 5))
+        first = len(vault.MAGIC) + vault.NONCE_PREFIX_SIZE + 4 + vault.CHUNK_SIZE + 16
+        for size in (first, first + 10, len(blob) - 1):
+            with self.assertRaises(VaultError):
+                self.cipher.open("day:x", blob[:size])
+
+    def test_last_flag(self):
+        # Marking the first chunk as the last one must not open as a shorter file
+        out = io.BytesIO()
+        self.cipher.seal_into(out, "day:x", os.urandom(vault.CHUNK_SIZE + 5))
+        blob = bytearray(out.getvalue())
+        blob[len(vault.MAGIC) + vault.NONCE_PREFIX_SIZE] |= 0x80
+        with self.assertRaises(VaultError):
+            self.cipher.open("day:x", bytes(blob))
+
+
+@unittest.skipUnless(cryptography, "needs the cryptography package")
+class ProgressEventsTest(unittest.TestCase):
+    def setUp(self):
+        from enough.storage import EncryptedStorage
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        patcher = mock.patch.dict(os.environ, {vault.PASSPHRASE_ENV: "passphrase"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = EncryptedStorage(self.root.name)
+        self.storage.append_progress_events("x", [{"seq": seq, "type": "t"} for seq in (1, 2, 3)])
+        self.path = self.storage._path("progress", "x", PROGRESS_LOG_EXTENSION)
+        with open(self.path, 'rb') as f:
+            self.lines = f.read().split(b"\n")[:-1]
+
+    def rewrite(self, lines, tail=b"\n"):
+        with open(self.path, 'wb') as f:
+            f.write(b"\n".join(lines) + tail)
+
+    def seqs(self):
+        return [event["seq"] for event in self.storage.progress_events("x")]
+
+    def test_round_trip(self):
+        self.assertEqual(self.seqs(), [1, 2, 3])
+        self.assertEqual([event["seq"] for event in self.storage.progress_events("x", 2)], [3])
+
+    def test_torn_last_line(self):
+        self.rewrite(self.lines, b"\n" + self.lines[0][:10])
+        self.assertEqual(self.seqs(), [1, 2, 3])
+        self.storage.append_progress_events("x", [{"seq": 4, "type": "t"}])
+        self.assertEqual(self.seqs(), [1, 2, 3, 4])
+
+    def test_gaps(self):
+        self.rewrite([self.lines[0], self.lines[2]])
+        self.assertEqual(self.seqs(), [1, 3])
+
+    def test_reordered_replayed(self):
+        first, second, third = self.lines
+        for lines in ([second, first, third], [first, second, second, third]):
+            self.rewrite(lines)
+            with self.assertRaises(VaultError):
+                self.storage.progress_events("x")
+
+    def test_moved_seq(self):
+        # The seq in clear is bound to the sealed event
+        self.rewrite([self.lines[0], b"2:" + self.lines[2].partition(b":")[2]])
+        with self.assertRaises(VaultError):
+            self.storage.progress_events("x")
+
+
+if __name__ == "__main__":
+    unittest.main()